@@ -1,4 +1,11 @@
+from .early_stopping import MedianStoppingRule
+from .failure_registry import FailureRegistry
 from .node_chain_parameter_space import NodeChainParameterSpace
 from .nodelist_generator import NodeListGenerator
+from .optimizer_manager import OptimizerManager
 from .optimizer_pool import OptimizerPool
-from .performance_graphic import PerformanceGraphic
\ No newline at end of file
+from .pareto_front import ParetoFront
+from .performance_graphic import PerformanceGraphic
+from .racing import Race
+from .resources import ResourcePlanner
+from .time_budget import TimeBudget
\ No newline at end of file
@@ -18,7 +18,7 @@ HOME = os.path.expanduser("~")
 def create_parser():
     parser = ArgumentParser(description="Launch the optimization of the given task using the given backend",
                             usage="%(prog)s -c CONFIG [-h | --list-optimizer | --list-tasks]\n"
-                                  "\t%(prog)s -c CONFIG -t TASK [-b BACKEND] [-r RESULT]")
+                                  "\t%(prog)s -c CONFIG -t TASK [-b BACKEND] [-r RESULT] [--resume]")
     parser.add_argument("-c", "--config", type=str, help="The name of the pySPACEcenter configuration to load",
                         default="config.yaml")
     parser.add_argument("-t", "--task", type=FileType("rb"),
@@ -28,6 +28,9 @@ def create_parser():
     parser.add_argument("-b", "--backend", type=str, default="serial",
                         help='The backend to use for testing in pySPACE. '
                              'Possible values: "serial", "mcore", "mpi", "loadl". Default: "serial"')
+    parser.add_argument("--resume", action="store_true", default=False,
+                        help="Resume an interrupted optimization stored in the result path, skipping all "
+                             "node chains that have been optimized completely")
     parser.add_argument("--list-optimizer", action="store_true", default=False,
                         help="List all available optimizers and quit")
     parser.add_argument("--list-tasks", action="store_true", default=False,
@@ -79,6 +82,8 @@ def main(args=None):
             task = task_from_yaml(arguments.task)
             if arguments.result is not None:
                 task.base_result_dir = os.path.abspath(arguments.result)
+            if arguments.resume:
+                task["resume"] = True
 
             result = os.path.join(task.base_result_dir, "best.yaml")
             logger.info("Best result will be stored as: %s" % result)
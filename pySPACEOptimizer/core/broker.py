@@ -0,0 +1,366 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import itertools
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from collections import deque
+from multiprocessing.managers import BaseManager
+
+try:
+    # noinspection PyCompatibility
+    from cPickle import loads, dumps, HIGHEST_PROTOCOL
+except ImportError:
+    from pickle import loads, dumps, HIGHEST_PROTOCOL
+
+from pySPACEOptimizer.utils import ignore_interrupts
+
+BROKER = None
+
+
+def parse_address(address):
+    """
+    Parses an address in the format "host:port".
+
+    :rtype: (str, int)
+    """
+    host, _, port = address.rpartition(":")
+    return host, int(port)
+
+
+class WorkerLost(Exception):
+    pass
+
+
+class Broker(object):
+    # Returned to the workers as soon as the broker is closed and all jobs have been handed out
+    STOP = "stop"
+
+    def __init__(self, lease_timeout=60, max_attempts=3):
+        """
+        Creates a new broker handing out jobs to workers on any host.
+        A worker leases a job and has to renew the lease with a heartbeat until it completes the job.
+        If a lease expires, the worker is considered lost and the job is handed out again, until it has
+        been tried `max_attempts` times. Jobs and results are pickled strings, the broker never unpickles them.
+
+        :param lease_timeout: The seconds after which a job is handed out again if the worker didn't send a heartbeat
+        :type lease_timeout: float
+        :param max_attempts: The maximal number of workers to hand out a single job to
+        :type max_attempts: int
+        :return: A new broker without any jobs
+        :rtype: Broker
+        """
+        self.__lease_timeout = lease_timeout
+        self.__max_attempts = max_attempts
+        self.__jobs = {}
+        self.__attempts = {}
+        self.__queue = deque()
+        self.__leases = {}
+        self.__workers = {}
+        self.__results = []
+        self.__closed = False
+        self.__lock = threading.Lock()
+        self.__logger = logging.getLogger("%s.%s" % (self.__class__.__module__, self.__class__.__name__))
+
+    def __expire(self):
+        # Hand out the jobs of all lost workers again
+        now = time.time()
+        for job_id, (worker, expiry) in list(self.__leases.items()):
+            if expiry >= now:
+                continue
+            del self.__leases[job_id]
+            self.__workers.pop(worker, None)
+            if self.__attempts[job_id] >= self.__max_attempts:
+                self.__logger.warning("Job %s failed on %d workers. Giving up" % (job_id, self.__attempts[job_id]))
+                del self.__jobs[job_id]
+                self.__results.append((job_id, False, dumps(WorkerLost("Worker '%s' has been lost" % worker),
+                                                            HIGHEST_PROTOCOL)))
+            else:
+                self.__logger.warning("Worker '%s' has been lost. Handing out job %s again" % (worker, job_id))
+                self.__queue.appendleft(job_id)
+
+    def submit(self, job_id, job):
+        with self.__lock:
+            self.__jobs[job_id] = job
+            self.__attempts[job_id] = 0
+            self.__queue.append(job_id)
+
+    def lease(self, worker):
+        """
+        Hands out the next job to the `worker`.
+
+        :param worker: A unique name of the worker
+        :type worker: str
+        :return: The id and the pickled job, None if there is no job at the moment or `STOP`
+        :rtype: (int, str) | None | str
+        """
+        with self.__lock:
+            self.__expire()
+            self.__workers[worker] = time.time()
+            if not self.__queue:
+                return self.STOP if self.__closed else None
+            job_id = self.__queue.popleft()
+            self.__attempts[job_id] += 1
+            self.__leases[job_id] = (worker, time.time() + self.__lease_timeout)
+            return job_id, self.__jobs[job_id]
+
+    def heartbeat(self, worker):
+        # Renew the leases of all jobs of the worker
+        with self.__lock:
+            now = time.time()
+            self.__workers[worker] = now
+            for job_id, (owner, _) in list(self.__leases.items()):
+                if owner == worker:
+                    self.__leases[job_id] = (worker, now + self.__lease_timeout)
+
+    def complete(self, worker, job_id, success, result):
+        """
+        Stores the pickled `result` of the job with the given `job_id`.
+        Results of jobs that have already been completed by another worker are ignored.
+        """
+        with self.__lock:
+            self.__workers[worker] = time.time()
+            self.__leases.pop(job_id, None)
+            if job_id in self.__jobs:
+                del self.__jobs[job_id]
+                if job_id in self.__queue:
+                    self.__queue.remove(job_id)
+                self.__results.append((job_id, success, result))
+
+    def results(self):
+        """
+        Returns and removes the results of all completed jobs.
+
+        :return: The id, the success and the pickled result of every completed job
+        :rtype: list[(int, bool, str)]
+        """
+        with self.__lock:
+            self.__expire()
+            results, self.__results = self.__results, []
+            return results
+
+    def workers(self):
+        """
+        Returns the number of workers that have been seen during the last lease timeout.
+
+        :rtype: int
+        """
+        with self.__lock:
+            now = time.time()
+            return len([worker for worker, seen in self.__workers.items() if seen + self.__lease_timeout >= now])
+
+    def lease_timeout(self):
+        return self.__lease_timeout
+
+    def close(self):
+        with self.__lock:
+            self.__closed = True
+
+
+def _create_broker(lease_timeout, max_attempts):
+    global BROKER
+    # The broker has to survive an interrupt until the optimization has been cancelled
+    ignore_interrupts()
+    BROKER = Broker(lease_timeout=lease_timeout, max_attempts=max_attempts)
+
+
+def _get_broker():
+    return BROKER
+
+
+class BrokerManager(BaseManager):
+    pass
+
+
+BrokerManager.register("Broker", callable=_get_broker)
+
+
+class BrokerResult(object):
+
+    def __init__(self, callback=None):
+        self.__callback = callback
+        self.__event = threading.Event()
+        self.__success = None
+        self.__value = None
+
+    def _set(self, success, value):
+        self.__success = success
+        self.__value = value
+        if success and self.__callback is not None:
+            self.__callback(value)
+        self.__event.set()
+
+    def ready(self):
+        return self.__event.is_set()
+
+    def successful(self):
+        assert self.ready()
+        return self.__success
+
+    def wait(self, timeout=None):
+        self.__event.wait(timeout)
+
+    def get(self, timeout=None):
+        self.wait(timeout)
+        if not self.ready():
+            raise multiprocessing.TimeoutError()
+        if self.__success:
+            return self.__value
+        raise self.__value
+
+
+class BrokerPool(object):
+    """
+    Drop in replacement for the `OptimizerPool` evaluating the jobs on the workers connected to a broker.
+    The broker is started in it's own process listening on the given address, the workers are started
+    independently on any host using `run_worker`.
+    """
+    # Seconds between two requests for the results of the broker
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, address, authkey, processes=None, lease_timeout=60, max_attempts=3):
+        """
+        :param address: The host and the port to listen on for workers
+        :type address: (str, int)
+        :param authkey: The secret the workers need to connect to the broker
+        :type authkey: str
+        :param processes: The number of jobs to run in parallel or None to use the number of connected workers
+        :type processes: int
+        """
+        self.__logger = logging.getLogger("%s.%s" % (self.__class__.__module__, self.__class__.__name__))
+        self.__manager = BrokerManager(address=address, authkey=authkey)
+        self.__manager.start(initializer=_create_broker, initargs=(lease_timeout, max_attempts))
+        self.__logger.info("Broker listening on %s:%d" % self.__manager.address)
+        self.__broker = self.__manager.Broker()
+        self.__processes = processes
+        self.__results = {}
+        self.__job_ids = itertools.count()
+        self.__running = True
+        self.__collector = threading.Thread(target=self.__collect, name="BrokerResultCollector")
+        self.__collector.daemon = True
+        self.__collector.start()
+
+    @property
+    def address(self):
+        return self.__manager.address
+
+    @property
+    def processes(self):
+        if self.__processes is not None:
+            return self.__processes
+        return max(self.__broker.workers(), 1)
+
+    # noinspection PyBroadException
+    def __collect(self):
+        try:
+            while self.__running:
+                for job_id, success, result in self.__broker.results():
+                    try:
+                        value = loads(result)
+                    except Exception as e:
+                        # e.g. the result can't be unpickled in this process
+                        success, value = False, e
+                    self.__results.pop(job_id)._set(success, value)
+                time.sleep(self.POLL_INTERVAL)
+        except Exception as e:
+            self.__logger.exception("Error collecting the results of the broker:")
+            # Nobody else sets the outstanding results anymore
+            for job_id in list(self.__results.keys()):
+                self.__results.pop(job_id)._set(False, e)
+
+    def apply_async(self, func, args=None, kwds=None, callback=None):
+        job_id = next(self.__job_ids)
+        result = BrokerResult(callback=callback)
+        if not self.__collector.is_alive():
+            result._set(False, WorkerLost("The results of the broker aren't collected anymore"))
+            return result
+        self.__results[job_id] = result
+        job = dumps((func, args if args is not None else (), kwds if kwds is not None else {}), HIGHEST_PROTOCOL)
+        self.__broker.submit(job_id, job)
+        return result
+
+    def apply(self, func, args=None, kwds=None):
+        return self.apply_async(func, args=args, kwds=kwds).get()
+
+    def close(self):
+        if self.__broker is not None:
+            self.__broker.close()
+
+    def join(self):
+        while self.__running and self.__results and self.__collector.is_alive():
+            time.sleep(self.POLL_INTERVAL)
+        self.terminate()
+
+    def terminate(self):
+        if self.__broker is None:
+            return
+        self.__running = False
+        self.__collector.join()
+        # Drop the proxy, otherwise every forked process tries to reconnect to the stopped broker
+        self.__broker = None
+        self.__manager.shutdown()
+
+
+def _send_heartbeats(broker, worker, interval, stopped):
+    try:
+        while not stopped.wait(interval):
+            broker.heartbeat(worker)
+    except (EOFError, IOError):
+        # The broker has been stopped
+        pass
+
+
+# noinspection PyBroadException
+def run_worker(address, authkey, poll_interval=1):
+    """
+    Connects to the broker at `address` and evaluates jobs until the broker is closed or can't be reached.
+
+    :param address: The host and the port of the broker
+    :type address: (str, int)
+    :param authkey: The secret to connect to the broker
+    :type authkey: str
+    :param poll_interval: The seconds to wait before asking for a new job if there are no jobs
+    :type poll_interval: float
+    """
+    logger = logging.getLogger("pySPACEOptimizer.worker")
+    # Proxies inside of the jobs connect to the managers of the optimizer using this key
+    multiprocessing.current_process().authkey = authkey
+    manager = BrokerManager(address=address, authkey=authkey)
+    manager.connect()
+    broker = manager.Broker()
+    worker = "%s:%d" % (socket.gethostname(), os.getpid())
+    stopped = threading.Event()
+    # Send three heartbeats per lease timeout
+    heartbeat = threading.Thread(target=_send_heartbeats, args=(broker, worker, broker.lease_timeout() / 3.0,
+                                                                stopped))
+    heartbeat.daemon = True
+    heartbeat.start()
+    logger.info("Worker '%s' connected to broker %s:%d" % ((worker,) + tuple(address)))
+    try:
+        while True:
+            job = broker.lease(worker)
+            if job == Broker.STOP:
+                break
+            elif job is None:
+                time.sleep(poll_interval)
+                continue
+            job_id, job = job
+            try:
+                func, args, kwds = loads(job)
+                result = (True, func(*args, **kwds))
+            except Exception as e:
+                logger.exception("Error evaluating job %s:" % job_id)
+                result = (False, e)
+            try:
+                success, result = result[0], dumps(result[1], HIGHEST_PROTOCOL)
+            except Exception as e:
+                success, result = False, dumps(Exception("Result can't be pickled: %r" % e), HIGHEST_PROTOCOL)
+            broker.complete(worker, job_id, success, result)
+    except (EOFError, IOError):
+        logger.info("Broker can't be reached anymore")
+    finally:
+        stopped.set()
+    logger.info("Worker '%s' stopped" % worker)
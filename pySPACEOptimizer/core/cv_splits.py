@@ -0,0 +1,113 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import io
+import os
+
+import numpy
+
+from pySPACEOptimizer.utils import atomic_write
+
+
+class CrossValidationSplits(object):
+    """
+    Assigns the samples of every data set to the folds of a stratified cross validation.
+
+    The folds are computed only once per task and stored as compact index files inside the result
+    dir of the task, so every trial of every node chain is evaluated on exactly the same splits
+    and the losses of different node chains are directly comparable.
+    """
+    SPLIT_DIR = "cv_splits"
+
+    def __init__(self, result_dir, splits=5, seed=0):
+        """
+        :param result_dir: The result dir of the task to store the index files in
+        :type result_dir: str
+        :param splits: The number of folds of the cross validation
+        :type splits: int
+        :param seed: The seed of the random assignment of the samples to the folds
+        :type seed: int
+        :return: New cross validation splits loading the index files of the task
+        :rtype: CrossValidationSplits
+        """
+        if not isinstance(splits, int) or splits < 2:
+            raise ValueError("The number of splits '{splits}' is not a number greater than 1".format(splits=splits))
+        self.__split_dir = os.path.join(result_dir, self.SPLIT_DIR)
+        self.__splits = splits
+        self.__seed = seed
+        self.__folds = {}
+
+    @property
+    def splits(self):
+        return self.__splits
+
+    @staticmethod
+    def stratified_folds(labels, splits, seed):
+        """
+        Assigns every sample to one of the `splits` folds, so that every class is distributed evenly over all folds.
+
+        :param labels: The label of every sample
+        :type labels: list[object] | numpy.ndarray
+        :param splits: The number of folds
+        :type splits: int
+        :param seed: The seed of the random assignment
+        :type seed: int
+        :return: The fold of every sample
+        :rtype: numpy.ndarray
+        """
+        labels = numpy.asarray(labels)
+        random = numpy.random.RandomState(seed)
+        folds = numpy.empty(len(labels), dtype=numpy.int16)
+        offset = 0
+        for label in numpy.unique(labels):
+            indices = numpy.flatnonzero(labels == label)
+            random.shuffle(indices)
+            # Continue with the next fold for the next class to keep the sizes of the folds even
+            folds[indices] = (numpy.arange(len(indices)) + offset) % splits
+            offset += len(indices)
+        return folds
+
+    def __file_path(self, key):
+        return os.path.join(self.__split_dir, "%s.npz" % key)
+
+    def __load(self, key, samples):
+        file_path = self.__file_path(key)
+        if not os.path.isfile(file_path):
+            return None
+        with numpy.load(file_path) as index_file:
+            if int(index_file["splits"]) != self.__splits or int(index_file["seed"]) != self.__seed or \
+                    len(index_file["folds"]) != samples:
+                # Computed for another configuration or another version of the data set
+                return None
+            return index_file["folds"]
+
+    def __store(self, key, folds):
+        if not os.path.isdir(self.__split_dir):
+            try:
+                os.makedirs(self.__split_dir)
+            except OSError:
+                # Created by another worker in the meantime
+                pass
+        index_file = io.BytesIO()
+        numpy.savez_compressed(index_file, folds=folds, splits=self.__splits, seed=self.__seed)
+        atomic_write(self.__file_path(key), index_file.getvalue())
+
+    def folds(self, key, labels):
+        """
+        Returns the fold of every sample of the data set identified by `key`.
+        The folds are loaded from the index file of the data set or computed and stored on the first call.
+
+        :param key: The name of the data set, unique inside the task
+        :type key: str
+        :param labels: The label of every sample of the data set
+        :type labels: list[object] | numpy.ndarray
+        :return: The fold of every sample
+        :rtype: numpy.ndarray
+        """
+        folds = self.__folds.get(key, None)
+        if folds is None or len(folds) != len(labels):
+            folds = self.__load(key, len(labels))
+            if folds is None:
+                folds = self.stratified_folds(labels, self.__splits, self.__seed)
+                self.__store(key, folds)
+            self.__folds[key] = folds
+        return folds
@@ -0,0 +1,89 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+from collections import defaultdict
+
+import numpy
+
+
+class MedianStoppingRule(object):
+
+    def __init__(self, min_trials=5):
+        """
+        Creates a new median stopping rule.
+        A running evaluation is stopped, if the mean of it's intermediate losses is worse
+        than the median of the running means all completed evaluations of the same node chain
+        had at the same progress point. Node chains are compared only to themselves, as the
+        losses of different node chains may differ by far.
+
+        :param min_trials: The minimal number of completed evaluations of a node chain
+                           before any evaluation of it is stopped
+        :type min_trials: int
+        :return: A new median stopping rule without any completed evaluations
+        :rtype: MedianStoppingRule
+        """
+        self.__min_trials = min_trials
+        self.__running_means = defaultdict(lambda: defaultdict(list))
+        self.__final_losses = defaultdict(list)
+        self.__lock = threading.Lock()
+
+    def should_stop(self, chain_id, losses):
+        """
+        Returns whether an evaluation of the node chain with the given intermediate `losses` should be stopped.
+
+        :param chain_id: The id of the evaluated node chain
+        :type chain_id: str
+        :param losses: The intermediate losses of the evaluation, one for each progress point reached
+        :type losses: list[float]
+        :rtype: bool
+        """
+        step = len(losses)
+        with self.__lock:
+            running_means = list(self.__running_means[chain_id][step])
+        if step == 0 or len(running_means) < self.__min_trials:
+            return False
+        return numpy.mean(losses) > numpy.median(running_means)
+
+    def complete(self, chain_id, losses):
+        """
+        Adds the intermediate `losses` of a completed evaluation of the node chain to the rule.
+
+        :param chain_id: The id of the evaluated node chain
+        :type chain_id: str
+        :param losses: The intermediate losses of the evaluation, one for each progress point
+        :type losses: list[float]
+        """
+        running_means = numpy.cumsum(losses) / numpy.arange(1, len(losses) + 1)
+        with self.__lock:
+            for step, running_mean in enumerate(running_means, start=1):
+                self.__running_means[chain_id][step].append(float(running_mean))
+            self.__final_losses[chain_id].append(float(running_means[-1]))
+
+    def estimated_loss(self, chain_id, losses):
+        """
+        Estimates the loss a stopped evaluation of the node chain would have had at the end.
+        The estimate is the median final loss of the completed evaluations shifted by the distance
+        of the intermediate `losses` to the median at the progress point of stopping, so it is
+        always worse than the median of the completed evaluations.
+
+        :param chain_id: The id of the stopped node chain
+        :type chain_id: str
+        :param losses: The intermediate losses of the stopped evaluation
+        :type losses: list[float]
+        :rtype: float
+        """
+        with self.__lock:
+            running_means = list(self.__running_means[chain_id][len(losses)])
+            final_losses = list(self.__final_losses[chain_id])
+        if not running_means or not final_losses:
+            return float(numpy.mean(losses))
+        return float(numpy.median(final_losses) + numpy.mean(losses) - numpy.median(running_means))
+
+    def completed(self, chain_id, step=1):
+        """
+        Returns the number of completed evaluations of the node chain that reached the given progress `step`.
+
+        :rtype: int
+        """
+        with self.__lock:
+            return len(self.__running_means[chain_id][step])
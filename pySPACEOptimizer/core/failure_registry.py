@@ -0,0 +1,105 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import division
+
+import threading
+from collections import defaultdict
+
+
+class FailureRegistry(object):
+
+    def __init__(self, min_evaluations=10, max_failure_rate=1.0, protected_nodes=None):
+        """
+        Creates a new registry tracking the failures of nodes and node chains during an optimization run.
+        A node is blacklisted, if it has been evaluated at least `min_evaluations` times in at least two
+        different node chains and the rate of failed evaluations reached `max_failure_rate`.
+        A node chain is pruned, if it contains a blacklisted node or if it's own failure rate reached
+        `max_failure_rate` after `min_evaluations` evaluations.
+
+        :param min_evaluations: The minimal number of evaluations before a node or node chain is pruned
+        :type min_evaluations: int
+        :param max_failure_rate: The rate of failed evaluations at which nodes and node chains are pruned
+        :type max_failure_rate: float
+        :param protected_nodes: Nodes that are never blacklisted, e.g. the source and the sink node
+        :type protected_nodes: set[str]
+        :return: A new empty failure registry
+        :rtype: FailureRegistry
+        """
+        self.__min_evaluations = min_evaluations
+        self.__max_failure_rate = max_failure_rate
+        self.__protected_nodes = set(protected_nodes) if protected_nodes is not None else set()
+        self.__node_evaluations = defaultdict(int)
+        self.__node_failures = defaultdict(int)
+        self.__node_chains = defaultdict(set)
+        self.__chain_evaluations = defaultdict(int)
+        self.__chain_failures = defaultdict(int)
+        self.__blacklist = set()
+        self.__lock = threading.Lock()
+
+    def __exceeded(self, evaluations, failures):
+        return evaluations >= self.__min_evaluations and failures / evaluations >= self.__max_failure_rate
+
+    def record(self, chain, nodes, failed):
+        """
+        Records the result of one evaluation of the node chain `chain` consisting of the given `nodes`.
+
+        :param chain: A unique identifier of the evaluated node chain
+        :type chain: str
+        :param nodes: The names of all nodes contained in the node chain
+        :type nodes: list[str]
+        :param failed: Whether the evaluation failed
+        :type failed: bool
+        :return: The names of the nodes that have been blacklisted due to this evaluation
+        :rtype: list[str]
+        """
+        blacklisted = []
+        with self.__lock:
+            self.__chain_evaluations[chain] += 1
+            if failed:
+                self.__chain_failures[chain] += 1
+            for node in nodes:
+                self.__node_evaluations[node] += 1
+                self.__node_chains[node].add(chain)
+                if failed:
+                    self.__node_failures[node] += 1
+                if node not in self.__blacklist and node not in self.__protected_nodes and \
+                        len(self.__node_chains[node]) > 1 and \
+                        self.__exceeded(self.__node_evaluations[node], self.__node_failures[node]):
+                    self.__blacklist.add(node)
+                    blacklisted.append(node)
+        return blacklisted
+
+    def is_pruned(self, chain, nodes):
+        """
+        Returns whether the node chain `chain` consisting of the given `nodes` should not be evaluated anymore.
+
+        :param chain: A unique identifier of the node chain
+        :type chain: str
+        :param nodes: The names of all nodes contained in the node chain
+        :type nodes: list[str]
+        :rtype: bool
+        """
+        with self.__lock:
+            if any([node in self.__blacklist for node in nodes]):
+                return True
+            return self.__exceeded(self.__chain_evaluations[chain], self.__chain_failures[chain])
+
+    def blacklisted_nodes(self):
+        """
+        Returns the names of all nodes blacklisted so far.
+
+        :rtype: list[str]
+        """
+        with self.__lock:
+            return sorted(self.__blacklist)
+
+    def failure_rate(self, node):
+        """
+        Returns the rate of failed evaluations of all node chains containing the given `node`.
+
+        :rtype: float
+        """
+        with self.__lock:
+            if not self.__node_evaluations[node]:
+                return 0.0
+            return self.__node_failures[node] / self.__node_evaluations[node]
@@ -0,0 +1,162 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import copy
+import logging
+import os
+
+import numpy
+from pySPACE.environments.chains.node_chain import BenchmarkNodeChain
+from pySPACE.missions.nodes import DEFAULT_NODE_MAPPING
+from pySPACE.resources.dataset_defs.base import BaseDataset
+
+from pySPACEOptimizer.framework.base_task import data_set_dirs
+
+
+class InProcessNotSupported(Exception):
+    """
+    Raised if a node chain or it's results can't be handled without executing a pySPACE operation.
+    """
+    pass
+
+
+class InProcessEvaluator(object):
+    """
+    Evaluates node chains directly inside the current process.
+
+    Instead of creating a pySPACE operation, writing the results to a `results.csv` and parsing it again,
+    the nodes are instantiated with the parameters of the trial and benchmarked on data sets, which are
+    loaded only once per process. The metrics are collected from the result data set of the sink node.
+    """
+
+    def __init__(self, splits=None):
+        """
+        :param splits: The cross validation splits to evaluate unsplit data sets on,
+                       or None to evaluate every data set as it is
+        :type splits: CrossValidationSplits
+        :return: A new evaluator without any loaded data sets
+        :rtype: InProcessEvaluator
+        """
+        self.__data_sets = {}
+        self.__splits = splits
+        self.__logger = logging.getLogger("%s.%s" % (self.__class__.__module__, self.__class__.__name__))
+
+    def data_set(self, data_set_dir):
+        """
+        Returns the data set stored in `data_set_dir`, loading it only on the first call.
+        Data sets are identified by their real path, so the folds linking to a data set share it.
+
+        :rtype: BaseDataset
+        """
+        data_set_dir = os.path.realpath(data_set_dir)
+        data_set = self.__data_sets.get(data_set_dir, None)
+        if data_set is None:
+            self.__logger.debug("Loading data set '%s'" % data_set_dir)
+            data_set = BaseDataset.load(data_set_dir)
+            if self.__splits is not None:
+                data_set = self.split(data_set_dir, data_set)
+            self.__data_sets[data_set_dir] = data_set
+        return data_set
+
+    def add_data_set(self, data_set_dir, data_set):
+        # Use an already loaded data set
+        self.__data_sets[os.path.realpath(data_set_dir)] = data_set
+
+    def split(self, data_set_dir, data_set):
+        """
+        Returns a data set containing the samples of the unsplit `data_set` split into the cross validation
+        splits of the task. The samples are not copied, only their assignment to the splits is created.
+        Data sets, which have already been split, are returned unchanged.
+
+        :rtype: BaseDataset
+        """
+        if data_set.meta_data.get("splits", 1) > 1:
+            self.__logger.debug("Data set '%s' has already been split" % data_set_dir)
+            return data_set
+        samples = data_set.get_data(0, 0, "test")
+        folds = self.__splits.folds(os.path.basename(data_set_dir), [label for _, label in samples])
+        split_data_set = copy.copy(data_set)
+        split_data_set.data = {}
+        split_data_set.meta_data = dict(data_set.meta_data, splits=self.__splits.splits)
+        for split in range(self.__splits.splits):
+            for (sample, label), train in zip(samples, numpy.not_equal(folds, split)):
+                split_data_set.add_sample(sample, label, train=bool(train), split=split, run=0)
+        return split_data_set
+
+    def preload(self, input_path):
+        """
+        Loads all data sets of the `input_path`. If this is done before the workers are forked,
+        all workers share the same pages of memory with the data sets instead of loading a copy each.
+
+        :param input_path: The input path of a node chain, relative to the pySPACE storage or absolute
+        :type input_path: str
+        :return: The number of data sets loaded
+        :rtype: int
+        """
+        directories = data_set_dirs(input_path)
+        for data_set_dir in directories:
+            self.data_set(data_set_dir)
+        return len(directories)
+
+    @staticmethod
+    def create_node_chain(node_chain):
+        """
+        Instantiates the nodes of the `node_chain` specification.
+
+        :param node_chain: The specification of every node as returned by `NodeChainParameterSpace.node_chain`
+        :type node_chain: list[dict[str, object]]
+        :rtype: BenchmarkNodeChain
+        """
+        nodes = []
+        for node_spec in node_chain:
+            parameters = {}
+            for parameter, value in node_spec.get("parameters", {}).items():
+                if isinstance(value, basestring) and value.startswith("${"):
+                    raise InProcessNotSupported("Parameter '%s' of node '%s' has no value" % (
+                        parameter, node_spec["node"]))
+                if isinstance(value, basestring) and value.startswith("eval(") and value.endswith(")"):
+                    # Same as the node chain factory of pySPACE
+                    value = eval(value[5:-1])
+                parameters[parameter] = value
+            nodes.append(DEFAULT_NODE_MAPPING[node_spec["node"]](**parameters))
+        return BenchmarkNodeChain(nodes)
+
+    @staticmethod
+    def collect_metrics(result_data_set, summary):
+        """
+        Adds the values of all metrics contained in the `result_data_set` of a sink node to the `summary`.
+
+        :param result_data_set: The result of benchmarking a node chain
+        :type result_data_set: BaseDataset
+        :param summary: The values of every metric
+        :type summary: dict[str, list[object]]
+        """
+        data = getattr(result_data_set, "data", None)
+        if not isinstance(data, dict) or not data:
+            raise InProcessNotSupported("Sink node did not return any performance results")
+        for key in sorted(data.keys()):
+            for sample in data[key]:
+                if isinstance(sample, tuple):
+                    # Samples are stored together with their label
+                    sample = sample[0]
+                if not hasattr(sample, "items"):
+                    raise InProcessNotSupported("Results of type '%s' are not supported" % type(sample).__name__)
+                for metric, value in sample.items():
+                    summary.setdefault(metric, []).append(value)
+
+    def evaluate(self, node_chain, input_path):
+        """
+        Benchmarks the `node_chain` on every data set of the `input_path` and returns the values of all metrics.
+
+        :param node_chain: The specification of every node with the values of the parameters to evaluate
+        :type node_chain: list[dict[str, object]]
+        :param input_path: The input path to process
+        :type input_path: str
+        :return: The values of all metrics for every data set and split, which may be empty if no data set was found
+        :rtype: dict[str, list[object]]
+        """
+        summary = {}
+        for data_set_dir in data_set_dirs(input_path):
+            flow = self.create_node_chain(node_chain)
+            result_data_set = flow.benchmark(input_collection=self.data_set(data_set_dir), run=0)
+            self.collect_metrics(result_data_set, summary)
+        return summary
@@ -1,6 +1,7 @@
 #!/bin/env python
 # -*- coding: utf-8 -*-
 import copy
+import hashlib
 import logging
 import logging.handlers
 import os
@@ -46,9 +47,21 @@ class NodeChainParameterSpace(object):
         self.configuration = configuration
         self._logger = None
         self._error_logger = None
+        self._chain_id = None
+        self._static_specs = None
         # Create the pipeline dir
         if not os.path.isdir(self.base_result_dir):
-            os.makedirs(self.base_result_dir)
+            legacy_result_dir = self.__legacy_result_dir()
+            if os.path.isdir(legacy_result_dir):
+                # Keep the trials of node chains optimized before the ids have been stable
+                os.rename(legacy_result_dir, self.base_result_dir)
+            else:
+                os.makedirs(self.base_result_dir)
+
+    def __legacy_result_dir(self):
+        # The result dir used to be named after the (process dependent) hash of the node chain
+        legacy_hash = hash("".join([unicode(hash(node)) for node in self.nodes]) + self._input_path)
+        return os.path.join(self.configuration.base_result_dir, str(legacy_hash).replace("-", "_"))
 
     def log_pipeline(self):
         # Log the pipeline
@@ -89,40 +102,107 @@ class NodeChainParameterSpace(object):
             space.update(node.parameter_space())
         return space
 
-    def operation_spec(self, parameter_settings=None):
+    def default_setting(self):
         """
-        Return the pipeline as an operation specification usable for pySPACE execution.
+        Returns a parameter setting using the default value of every parameter of the pipeline.
 
-        :param parameter_settings: The ranges to let pySPACE select the values for the parameters for.
-        :type parameter_settings: list[dict[str, object]]
-        :return: The pipeline specification as a dictionary
-        :rtype: dict[str, str]
+        :return: The default value of every parameter in the parameter space of this pipeline
+        :rtype: dict[str, object]
         """
-        if parameter_settings is None:
-            parameter_settings = []
+        setting = {}
+        for node in self._nodes:
+            setting.update(node.default_setting())
+        return setting
 
-        node_chain = [node.as_dictionary() for node in self._nodes]
-        operation_spec = {
-            "type": "node_chain",
-            "input_path": self._input_path,
-            "node_chain": node_chain,
-            "parameter_settings": parameter_settings
-        }
+    def node_chain(self, parameter_setting=None):
+        """
+        Returns the specification of every node of the pipeline, where the variable of every parameter
+        is replaced by it's value in the given `parameter_setting`.
+
+        :param parameter_setting: The values of the parameters of the pipeline
+        :type parameter_setting: dict[str, object]
+        :return: The node chain as a list of node specifications
+        :rtype: list[dict[str, object]]
+        """
+        if parameter_setting is None:
+            parameter_setting = {}
+        node_chain = []
+        for node in self._nodes:
+            node_spec = node.as_dictionary()
+            for parameter, value in node_spec.get("parameters", {}).items():
+                if isinstance(value, basestring) and value.startswith("${") and value.endswith("}") and \
+                        value[2:-1] in parameter_setting:
+                    node_spec["parameters"][parameter] = parameter_setting[value[2:-1]]
+            node_chain.append(node_spec)
+        return node_chain
+
+    @staticmethod
+    def __render(spec):
         # Due to bad pySPACE YAML-Parsing, we need to modify the output of the yaml dumper for correct format
-        dump = yaml.dump(operation_spec, Dumper=Dumper, default_flow_style=False, indent=4)
+        dump = yaml.dump(spec, Dumper=Dumper, default_flow_style=False, indent=4)
         lines = []
         for line in dump.split("\n"):
             if line.startswith(" ") or line.startswith("-"):
                 lines.append("    " + line)
-            else:
+            elif line:
                 lines.append(line)
-        operation_spec["base_file"] = "\n".join(lines)
+        return "\n".join(lines)
+
+    def operation_spec(self, parameter_settings=None, input_path=None):
+        """
+        Return the pipeline as an operation specification usable for pySPACE execution.
+        The node chain is rendered only once per input path, only the parameter settings are rendered per call.
+
+        :param parameter_settings: The ranges to let pySPACE select the values for the parameters for.
+        :type parameter_settings: list[dict[str, object]]
+        :param input_path: The input path to process instead of the input path of the task.
+        :type input_path: str
+        :return: The pipeline specification as a dictionary
+        :rtype: dict[str, str]
+        """
+        if parameter_settings is None:
+            parameter_settings = []
+        if input_path is None:
+            input_path = self._input_path
+
+        if getattr(self, "_static_specs", None) is None:
+            self._static_specs = {}
+        if input_path not in self._static_specs:
+            static_spec = {
+                "type": "node_chain",
+                "input_path": input_path,
+                "node_chain": [node.as_dictionary() for node in self._nodes],
+            }
+            self._static_specs[input_path] = (static_spec, self.__render(static_spec))
+        static_spec, static_file = self._static_specs[input_path]
+        operation_spec = copy.deepcopy(static_spec)
+        operation_spec["parameter_settings"] = parameter_settings
+        operation_spec["base_file"] = "\n".join([static_file,
+                                                 self.__render({"parameter_settings": parameter_settings}), ""])
         return operation_spec
 
+    @property
+    def chain_id(self):
+        """
+        The id of the node chain, which is the same in every process and every run of the optimization,
+        as it only depends on the names of the nodes and the input path.
+
+        :rtype: str
+        """
+        # Node chains pickled by older versions don't have an id yet
+        if getattr(self, "_chain_id", None) is None:
+            content = "\0".join([node.name for node in self.nodes] + [self._input_path])
+            self._chain_id = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        return self._chain_id
+
     @property
     def base_result_dir(self):
-        pipeline_hash = str(hash(self)).replace("-", "_")
-        return os.path.join(self.configuration.base_result_dir, pipeline_hash)
+        return os.path.join(self.configuration.base_result_dir, self.chain_id)
+
+    @property
+    def scratch_result_dir(self):
+        # The dir of the current process to store the transient outputs of the trials in
+        return os.path.join(self.configuration.scratch_result_dir, self.chain_id)
 
     @property
     def logger(self):
@@ -142,7 +222,17 @@ class NodeChainParameterSpace(object):
                 level=logging.WARNING)
         return self._error_logger
 
-    def create_operation(self, parameter_settings=None):
+    def close_loggers(self):
+        # Remove and close the log files of the node chain, they are opened again as soon as they are used
+        for logger in [self._logger, self._error_logger]:
+            if logger is not None:
+                for handler in [handler for handler in logger.handlers if handler.get_name() == logger.name]:
+                    logger.removeHandler(handler)
+                    handler.close()
+        self._logger = None
+        self._error_logger = None
+
+    def create_operation(self, parameter_settings=None, input_path=None):
         """
         Create an operation from this node chain and the given parameter settings.
 
@@ -151,10 +241,15 @@ class NodeChainParameterSpace(object):
 
         :param parameter_settings: The ranges to let pySPACE select the values for the parameters for.
         :type parameter_settings: list[dict[str, object]]
+        :param input_path: The input path to process instead of the input path of the task.
+        :type input_path: str
         :return: An operation that can be executed using the execute method.
         """
-        return pySPACE.create_operation(self.operation_spec(parameter_settings=parameter_settings),
-                                        base_result_dir=self.base_result_dir)
+        if not os.path.isdir(self.scratch_result_dir):
+            os.makedirs(self.scratch_result_dir)
+        return pySPACE.create_operation(self.operation_spec(parameter_settings=parameter_settings,
+                                                            input_path=input_path),
+                                        base_result_dir=self.scratch_result_dir)
 
     @staticmethod
     def execute(operation, backend):
@@ -173,18 +268,16 @@ class NodeChainParameterSpace(object):
                 pySPACE.run_operation(backend, operation)
 
     def __eq__(self, other):
-        return hash(self) == hash(other)
+        return isinstance(other, NodeChainParameterSpace) and self.chain_id == other.chain_id
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
-        # Hash all nodes and concat them to a string
-        s = "".join([unicode(hash(node)) for node in self.nodes])
-        # Also append the input_path as it is important for performance
-        s += self._input_path
-        # Hash the resulting string
-        return hash(s)
+        return hash(self.chain_id)
 
     def __repr__(self):
-        return "{cls!s}<{hash!s:>20s}>".format(cls=self.__class__.__name__, hash=hash(self))
+        return "{cls!s}<{chain_id!s}>".format(cls=self.__class__.__name__, chain_id=self.chain_id)
 
     def __str__(self):
         return self.name
@@ -193,4 +286,6 @@ class NodeChainParameterSpace(object):
         new_dict = copy.copy(self.__dict__)
         new_dict["_logger"] = None
         new_dict["_error_logger"] = None
+        # Rendered again by every process
+        new_dict["_static_specs"] = None
         return new_dict
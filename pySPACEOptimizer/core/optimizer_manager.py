@@ -0,0 +1,23 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+from multiprocessing.managers import SyncManager
+
+from pySPACEOptimizer.core.early_stopping import MedianStoppingRule
+from pySPACEOptimizer.core.failure_registry import FailureRegistry
+from pySPACEOptimizer.core.resources import ResourcePlanner
+from pySPACEOptimizer.core.time_budget import TimeBudget
+
+
+class OptimizerManager(SyncManager):
+    """
+    Manager process hosting the services shared between the optimizer and all of it's workers.
+    Besides the objects of the default `SyncManager` this manager creates proxies for
+    the services of the optimization run.
+    """
+    pass
+
+
+OptimizerManager.register("MedianStoppingRule", MedianStoppingRule)
+OptimizerManager.register("FailureRegistry", FailureRegistry)
+OptimizerManager.register("ResourcePlanner", ResourcePlanner)
+OptimizerManager.register("TimeBudget", TimeBudget)
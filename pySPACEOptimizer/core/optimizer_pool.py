@@ -1,5 +1,35 @@
+import multiprocessing
+import os
+import signal
 import threading
-from multiprocessing.pool import Pool, Process, RUN, debug, CLOSE, TERMINATE
+import time
+from multiprocessing.pool import Pool, Process, RUN, debug, CLOSE, TERMINATE, worker
+
+from pySPACEOptimizer.core.resources import current_rss
+from pySPACEOptimizer.utils import ignore_interrupts
+
+
+# noinspection PyUnusedLocal
+def _terminate_worker(signum, frame):
+    # Terminate the processes of running pySPACE operations together with the worker
+    children = multiprocessing.active_children()
+    for child in children:
+        child.terminate()
+    for child in children:
+        child.join(timeout=1)
+    os._exit(128 + signum)
+
+
+def _init_worker(initializer, initargs):
+    """
+    Initializes a worker of an optimizer pool. Interrupts are handled by the optimizer, which
+    cancels the optimization, so the worker ignores them. On termination the worker terminates
+    all processes it started before exiting.
+    """
+    ignore_interrupts()
+    signal.signal(signal.SIGTERM, _terminate_worker)
+    if initializer is not None:
+        initializer(*initargs)
 
 
 class NoDaemonProcess(Process):
@@ -13,6 +43,35 @@ class NoDaemonProcess(Process):
     daemon = property(_get_daemon, _set_daemon)
 
 
+class RecyclingQueue(object):
+    """
+    Wraps the task queue of a pool worker and lets the worker exit instead of taking
+    the next task, if it's memory grew too much or exceeded the memory ceiling.
+    The pool then replaces the worker with a fresh one.
+    """
+
+    def __init__(self, queue, max_memory=None, max_memory_growth=None):
+        self.__queue = queue
+        self.__max_memory = max_memory
+        self.__max_memory_growth = max_memory_growth
+        self.__baseline = None
+
+    def __getattr__(self, item):
+        return getattr(self.__queue, item)
+
+    def get(self):
+        rss = current_rss()
+        if self.__baseline is None:
+            self.__baseline = rss
+        elif self.__max_memory_growth is not None and rss - self.__baseline > self.__max_memory_growth:
+            debug('worker grew by %d bytes -- recycling' % (rss - self.__baseline))
+            return None
+        elif self.__max_memory is not None and rss > self.__max_memory:
+            debug('worker uses %d bytes -- recycling' % rss)
+            return None
+        return self.__queue.get()
+
+
 # We sub-class multiprocessing.pool.Pool instead of multiprocessing.Pool
 # because the latter is only a wrapper function, not a proper class.
 # noinspection PyAbstractClass
@@ -21,15 +80,42 @@ class OptimizerPool(Pool):
 
     DEFAULT_TIMEOUT = 1e100
 
-    def __init__(self, processes=None, initializer=None, initargs=None):
+    def __init__(self, processes=None, initializer=None, initargs=None, maxtasksperchild=None, max_memory=None,
+                 max_memory_growth=None):
+        """
+        Creates a new pool of workers, where each worker is replaced after `maxtasksperchild` tasks
+        or as soon as it's memory exceeded `max_memory` bytes or grew by more than `max_memory_growth`
+        bytes since it took it's first task.
+        """
         if initargs is None:
             initargs = ()
-        super(OptimizerPool, self).__init__(processes=processes, initializer=initializer, initargs=initargs,
-            maxtasksperchild=10)
-
-    #        signal.signal(signal.SIGTERM, self._handle_signal)
-    #        signal.signal(signal.SIGINT, self._handle_signal)
-    #        signal.signal(signal.SIGQUIT, self._handle_signal)
+        # The limits are needed by the first call of _repopulate_pool
+        self._max_memory = max_memory
+        self._max_memory_growth = max_memory_growth
+        super(OptimizerPool, self).__init__(processes=processes, initializer=_init_worker,
+                                            initargs=(initializer, initargs), maxtasksperchild=maxtasksperchild)
+
+    @property
+    def processes(self):
+        return self._processes
+
+    def _repopulate_pool(self):
+        # Same as multiprocessing.pool.Pool._repopulate_pool,
+        # but the workers get a queue checking their memory
+        for _ in range(self._processes - len(self._pool)):
+            if self._max_memory is not None or self._max_memory_growth is not None:
+                inqueue = RecyclingQueue(self._inqueue, max_memory=self._max_memory,
+                                         max_memory_growth=self._max_memory_growth)
+            else:
+                inqueue = self._inqueue
+            w = self.Process(target=worker,
+                             args=(inqueue, self._outqueue, self._initializer, self._initargs,
+                                   self._maxtasksperchild))
+            self._pool.append(w)
+            w.name = w.name.replace('Process', 'PoolWorker')
+            w.daemon = True
+            w.start()
+            debug('added worker')
 
     def apply(self, func, args=None, kwds=None):
         assert self._state == RUN
@@ -58,6 +144,18 @@ class OptimizerPool(Pool):
         for p in self._pool:
             p.join(timeout=self.DEFAULT_TIMEOUT)
 
+    @staticmethod
+    def _help_stuff_finish(inqueue, task_handler, size):
+        # Same as multiprocessing.pool.Pool._help_stuff_finish, but a worker killed by a signal
+        # while waiting for a task never releases the lock of the queue, so don't wait for it forever
+        debug('removing tasks from inqueue until task handler finished')
+        if not inqueue._rlock.acquire(timeout=1):
+            debug('lock of inqueue is held by a killed worker')
+            return
+        while task_handler.is_alive() and inqueue._reader.poll():
+            inqueue._reader.recv()
+            time.sleep(0)
+
     @classmethod
     def _terminate_pool(cls, task_queue, in_queue, out_queue, pool,
                         worker_handler, task_handler, result_handler, cache):
@@ -104,7 +202,3 @@ class OptimizerPool(Pool):
                     # worker has not yet exited
                     debug('cleaning up worker %d' % p.pid)
                     p.join()
-
-    def _handle_signal(self, *_):
-        self.terminate()
-        self.join()
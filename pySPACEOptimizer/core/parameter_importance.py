@@ -0,0 +1,57 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import numpy
+
+
+def _bin_indices(values, bins):
+    # Discrete values are their own bins, continuous values are binned by their quantiles
+    unique, indices = numpy.unique(values, return_inverse=True)
+    if len(unique) <= bins:
+        return indices
+    edges = numpy.percentile(values, numpy.linspace(0, 100, bins + 1)[1:-1])
+    return numpy.searchsorted(edges, values, side="right")
+
+
+def parameter_importance(values, losses, bins=10):
+    """
+    Estimates the importance of every parameter as the fraction of the variance of the losses,
+    which is explained by the main effect of the parameter alone, similar to a first order fANOVA.
+    The values of each parameter are grouped into bins and the variance of the mean losses of the bins,
+    corrected for the variance expected by chance, is compared to the total variance of the losses.
+
+    Infinite losses of failed evaluations are replaced by a loss worse than the worst finite loss,
+    so parameters causing failures are important as well.
+
+    :param values: The values of every parameter of every evaluation
+    :type values: dict[str, list[float] | numpy.ndarray]
+    :param losses: The loss of every evaluation
+    :type losses: list[float] | numpy.ndarray
+    :param bins: The maximal number of bins to group the values of a parameter into
+    :type bins: int
+    :return: The importance of every parameter between 0 (no effect) and 1 (explains all variance)
+    :rtype: dict[str, float]
+    """
+    losses = numpy.asarray(losses, dtype=numpy.float64)
+    finite = numpy.isfinite(losses)
+    if not finite.any():
+        return {name: 0.0 for name in values}
+    worst, best = losses[finite].max(), losses[finite].min()
+    spread = worst - best if worst > best else max(abs(worst), 1.0)
+    losses = numpy.where(finite, losses, worst + spread)
+    deviations = losses - losses.mean()
+    total = numpy.dot(deviations, deviations)
+    if total <= 0:
+        return {name: 0.0 for name in values}
+    importance = {}
+    for name, parameter_values in values.items():
+        indices = _bin_indices(numpy.asarray(parameter_values, dtype=numpy.float64), bins)
+        counts = numpy.bincount(indices)
+        sums = numpy.bincount(indices, weights=deviations)
+        used = counts > 0
+        # Sum of the squared deviations of the bin means weighted by the size of the bins
+        between = numpy.sum(sums[used] ** 2 / counts[used])
+        # Remove the variance explained by chance with few evaluations per bin (epsilon squared)
+        groups = numpy.count_nonzero(used)
+        within = (total - between) / (len(losses) - groups) if len(losses) > groups else 0.0
+        importance[name] = float(max(between - (groups - 1) * within, 0.0) / total)
+    return importance
@@ -0,0 +1,87 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import copy
+
+import numpy
+
+
+class ParameterMemo(object):
+    """
+    Remembers the results of the parameter settings evaluated for a single node chain.
+
+    Suggestion algorithms like TPE often suggest exactly the same setting again, if the parameter space
+    consists mostly of choices and quantized values. Instead of evaluating the same setting again,
+    the result is answered from the memo. For noisy metrics, a setting may be evaluated a few times
+    before it is answered with the mean loss of these evaluations.
+    """
+
+    def __init__(self, resamples=0):
+        """
+        :param resamples: The number of additional evaluations of a setting before it is answered from the memo
+        :type resamples: int
+        :return: A new empty memo
+        :rtype: ParameterMemo
+        """
+        self.__resamples = max(resamples, 0)
+        self.__results = {}
+        self.__lookups = 0
+        self.__duplicates = 0
+
+    @staticmethod
+    def key(parameter_setting):
+        """
+        Returns the key of the `parameter_setting` inside the memo.
+
+        :param parameter_setting: The values of the parameters
+        :type parameter_setting: dict[str, object]
+        :rtype: tuple
+        """
+        return tuple(sorted(parameter_setting.items()))
+
+    @staticmethod
+    def is_complete(result):
+        """
+        Returns whether the `result` is the loss of a complete evaluation and may be answered from the memo.
+        Failed, stopped or cancelled evaluations are evaluated again.
+
+        :rtype: bool
+        """
+        return result.get("status", None) == "ok" and not result.get("duplicate", False) and \
+            not any(result.get(flag, False) for flag in ("stopped", "eliminated", "cancelled"))
+
+    def record(self, parameter_setting, result):
+        """
+        Records the `result` of evaluating the `parameter_setting`, incomplete evaluations are ignored.
+        """
+        if self.is_complete(result):
+            self.__results.setdefault(self.key(parameter_setting), []).append(result)
+
+    def lookup(self, parameter_setting):
+        """
+        Returns the result of an already evaluated `parameter_setting` with the mean loss of all it's evaluations
+        or None if the setting has to be evaluated, because it's new or the resample budget isn't exhausted.
+
+        :rtype: dict[str, object] | None
+        """
+        self.__lookups += 1
+        results = self.__results.get(self.key(parameter_setting), [])
+        if len(results) <= self.__resamples:
+            return None
+        self.__duplicates += 1
+        result = copy.deepcopy(results[-1])
+        result["loss"] = float(numpy.mean([evaluated["loss"] for evaluated in results]))
+        result["duplicate"] = True
+        return result
+
+    @property
+    def duplicates(self):
+        return self.__duplicates
+
+    @property
+    def duplicate_rate(self):
+        """
+        The fraction of all lookups answered from the memo.
+
+        :rtype: float
+        """
+        return self.__duplicates / float(self.__lookups) if self.__lookups else 0.0
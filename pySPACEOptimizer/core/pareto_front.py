@@ -0,0 +1,92 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+
+
+class ParetoFront(object):
+
+    def __init__(self, objectives):
+        """
+        Creates a new, empty pareto front over the given `objectives`.
+        Every objective is minimized, so a member dominates another member if it is
+        at least as good in every objective and strictly better in at least one.
+
+        :param objectives: The names of the objectives spanning the front
+        :type objectives: list[str]
+        :return: A new empty pareto front
+        :rtype: ParetoFront
+        """
+        self.__objectives = list(objectives)
+        self.__members = []
+        self.__lock = threading.Lock()
+
+    @property
+    def objectives(self):
+        return self.__objectives
+
+    @staticmethod
+    def dominates(values, other_values):
+        """
+        Returns whether the objective vector `values` dominates `other_values`.
+
+        :type values: tuple[float]
+        :type other_values: tuple[float]
+        :rtype: bool
+        """
+        return all([value <= other for value, other in zip(values, other_values)]) and \
+            any([value < other for value, other in zip(values, other_values)])
+
+    def add(self, values, pipeline, parameters):
+        """
+        Adds the evaluation of `pipeline` with `parameters` to the front, if it is not dominated.
+        All members dominated by the new evaluation are removed from the front.
+
+        :param values: The value of every objective, either as a tuple in the order of `objectives`
+                       or as a dictionary containing every objective as a key
+        :type values: tuple[float] | dict[str, float]
+        :param pipeline: The node chain that has been evaluated
+        :type pipeline: NodeChainParameterSpace
+        :param parameters: The parameters the node chain has been evaluated with
+        :type parameters: dict[str, object]
+        :return: True if the front changed, False otherwise
+        :rtype: bool
+        """
+        if isinstance(values, dict):
+            values = [values[objective] for objective in self.__objectives]
+        values = tuple([float(value) for value in values])
+        if not all([value < float("inf") for value in values]):
+            # Failed evaluations are never part of the front
+            return False
+        with self.__lock:
+            for member_values, _, _ in self.__members:
+                if member_values == values or self.dominates(member_values, values):
+                    return False
+            self.__members = [member for member in self.__members if not self.dominates(values, member[0])]
+            self.__members.append((values, pipeline, parameters))
+            self.__members.sort(key=lambda member: member[0])
+            return True
+
+    def as_dictionaries(self):
+        """
+        Returns the members of the front as dictionaries mapping each objective to it's value.
+        The node chain and the parameters of each member are stored as "pipeline" and "parameters".
+
+        :rtype: list[dict[str, object]]
+        """
+        with self.__lock:
+            members = list(self.__members)
+        result = []
+        for values, pipeline, parameters in members:
+            member = dict(zip(self.__objectives, values))
+            member["pipeline"] = pipeline
+            member["parameters"] = parameters
+            result.append(member)
+        return result
+
+    def __iter__(self):
+        with self.__lock:
+            members = list(self.__members)
+        return iter(members)
+
+    def __len__(self):
+        return len(self.__members)
@@ -0,0 +1,100 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import division
+
+import math
+
+import numpy
+from scipy import stats
+
+
+class Race(object):
+
+    def __init__(self, alpha=0.05, min_folds=2):
+        """
+        Creates a new race between the evaluations of a single node chain.
+        The race keeps the per fold losses of the best fully evaluated configuration
+        and eliminates every new configuration that is significantly worse on the
+        folds evaluated so far.
+
+        :param alpha: The significance level of the one sided paired t-test
+        :type alpha: float
+        :param min_folds: The minimal number of folds to evaluate before a configuration may be eliminated
+        :type min_folds: int
+        :return: A new race without any best configuration
+        :rtype: Race
+        """
+        self.__alpha = alpha
+        self.__min_folds = max(min_folds, 2)
+        self.__best_losses = None
+
+    @property
+    def best_losses(self):
+        return self.__best_losses
+
+    @property
+    def best_loss(self):
+        if self.__best_losses is None:
+            return float("inf")
+        return float(numpy.mean(self.__best_losses))
+
+    def observe(self, result):
+        """
+        Updates the race with the `result` of a finished evaluation.
+        Only evaluations that have been evaluated on all folds can become the new best.
+
+        :param result: The result dictionary of the evaluation as returned by the objective function
+        :type result: dict[str, object]
+        """
+        fold_losses = result.get("fold_losses", None)
+        if result.get("status", None) != "ok" or result.get("eliminated", False) or \
+                result.get("stopped", False) or not fold_losses:
+            return
+        if self.__best_losses is not None and len(fold_losses) != len(self.__best_losses):
+            return
+        if numpy.mean(fold_losses) < self.best_loss:
+            self.__best_losses = numpy.asarray(fold_losses, dtype=float)
+
+    def p_value(self, fold_losses):
+        """
+        Returns the p-value of the hypothesis that the configuration with the given `fold_losses`
+        is not worse than the best configuration on the same folds.
+
+        :param fold_losses: The losses of the configuration on the first folds
+        :type fold_losses: list[float]
+        :rtype: float
+        """
+        differences = numpy.asarray(fold_losses, dtype=float) - self.__best_losses[:len(fold_losses)]
+        mean = numpy.mean(differences)
+        deviation = numpy.std(differences, ddof=1)
+        if not numpy.isfinite(mean) or deviation == 0:
+            # No variation between the folds, the direction of the difference decides
+            return 0.0 if mean > 0 else 1.0
+        t = mean / (deviation / math.sqrt(len(differences)))
+        return float(stats.t.sf(t, len(differences) - 1))
+
+    def eliminate(self, fold_losses):
+        """
+        Returns whether the configuration with the given `fold_losses` can't beat the best configuration.
+
+        :param fold_losses: The losses of the configuration on the first folds
+        :type fold_losses: list[float]
+        :rtype: bool
+        """
+        if self.__best_losses is None or len(fold_losses) < self.__min_folds or \
+                len(fold_losses) >= len(self.__best_losses):
+            return False
+        return self.p_value(fold_losses) < self.__alpha
+
+    def estimated_loss(self, fold_losses):
+        """
+        Estimates the loss an eliminated configuration would have had on all folds.
+        The estimate is the mean loss of the best configuration shifted by the mean
+        paired difference on the evaluated folds, so it is always worse than the best.
+
+        :param fold_losses: The losses of the configuration on the first folds
+        :type fold_losses: list[float]
+        :rtype: float
+        """
+        differences = numpy.asarray(fold_losses, dtype=float) - self.__best_losses[:len(fold_losses)]
+        return self.best_loss + float(numpy.mean(differences))
@@ -0,0 +1,370 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import errno
+import glob
+import logging
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import threading
+from multiprocessing.util import Finalize
+
+MEGABYTE = 1024 * 1024
+
+# The environment variables limiting the threads of the common BLAS and OpenMP implementations
+THREAD_VARIABLES = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS",
+                    "NUMEXPR_NUM_THREADS"]
+
+
+def available_memory():
+    """
+    Returns the memory available for new processes in bytes.
+
+    :return: The available memory or None if it can't be determined on this platform
+    :rtype: int | None
+    """
+    try:
+        with open("/proc/meminfo", "r") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except IOError:
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of a single process in bytes, which is the maximum of the
+    current process and all of it's terminated child processes, e.g. the processes of a backend.
+
+    :rtype: int
+    """
+    rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+              resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports kilobytes, OS X bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def current_rss():
+    """
+    Returns the current resident set size of this process in bytes.
+
+    :rtype: int
+    """
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, ValueError, IndexError):
+        # Fall back to the peak, which is an upper bound of the current size
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+
+def available_cpus():
+    """
+    Returns the ids of all cpus the current process may run on.
+
+    :rtype: list[int]
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    try:
+        import psutil
+        return sorted(psutil.Process().cpu_affinity())
+    except (ImportError, AttributeError):
+        return list(range(multiprocessing.cpu_count()))
+
+
+def parse_cpu_list(cpu_list):
+    """
+    Parses a cpu list in the format of the linux kernel, e.g. "0-3,8,10-11".
+
+    :rtype: list[int]
+    """
+    cpus = []
+    for part in cpu_list.strip().split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            cpus.extend(range(int(first), int(last) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+
+def numa_nodes():
+    """
+    Returns the cpus of every NUMA node of the machine.
+
+    :return: A list containing the ids of the cpus of each NUMA node or an empty list if the topology is unknown
+    :rtype: list[list[int]]
+    """
+    nodes = []
+    node_dirs = glob.glob("/sys/devices/system/node/node[0-9]*")
+    for node_dir in sorted(node_dirs, key=lambda node: int(re.search(r"(\d+)$", node).group(1))):
+        try:
+            with open(os.path.join(node_dir, "cpulist"), "r") as cpu_list:
+                cpus = parse_cpu_list(cpu_list.read())
+        except IOError:
+            continue
+        if cpus:
+            nodes.append(cpus)
+    return nodes
+
+
+def cpu_sets(workers, cpus=None, nodes=None):
+    """
+    Splits the `cpus` into one set of consecutive cpus for each worker.
+    If the `nodes` are given, the workers are distributed round robin over the nodes
+    and every worker only gets cpus of it's own node. If there are more workers than
+    cpus, the cpus are shared between the workers.
+
+    :param workers: The number of workers
+    :type workers: int
+    :param cpus: The cpus to distribute, defaults to all available cpus
+    :type cpus: list[int]
+    :param nodes: The cpus of the NUMA nodes of the machine
+    :type nodes: list[list[int]]
+    :return: The cpu set of each worker
+    :rtype: list[list[int]]
+    """
+    cpus = cpus if cpus is not None else available_cpus()
+    if nodes:
+        nodes = [[cpu for cpu in node if cpu in cpus] for node in nodes]
+        nodes = [node for node in nodes if node]
+    if not nodes:
+        nodes = [cpus]
+    sets = [None] * workers
+    for index, node in enumerate(nodes):
+        node_workers = list(range(index, workers, len(nodes)))
+        for position, worker in enumerate(node_workers):
+            if len(node_workers) >= len(node):
+                sets[worker] = [node[position % len(node)]]
+            else:
+                first = position * len(node) // len(node_workers)
+                last = (position + 1) * len(node) // len(node_workers)
+                sets[worker] = node[first:last]
+    return sets
+
+
+def worker_resources(workers, threads=None, pin=False, numa=False):
+    """
+    Calculates the resources of each worker of an optimizer pool.
+
+    :param workers: The number of workers of the pool
+    :type workers: int
+    :param threads: The number of BLAS and OpenMP threads per worker, "auto" to use the cores of the worker
+                    or None to keep the default
+    :type threads: int | str | None
+    :param pin: Whether to pin each worker to it's own set of cpus
+    :type pin: bool
+    :param numa: Whether the set of cpus of each worker should be located on a single NUMA node
+    :type numa: bool
+    :return: The cpu set, or None if not pinned, and the number of threads of each worker
+             or None if the workers keep the default resources
+    :rtype: list[(list[int] | None, int | None)] | None
+    """
+    if threads is None and not pin:
+        return None
+    cpus = available_cpus()
+    if pin:
+        sets = cpu_sets(workers, cpus=cpus, nodes=numa_nodes() if numa else None)
+    else:
+        sets = [None] * workers
+    if threads == "auto":
+        threads = [len(cpu_set) if cpu_set is not None else max(len(cpus) // workers, 1) for cpu_set in sets]
+    else:
+        threads = [threads] * workers
+    return list(zip(sets, threads))
+
+
+def set_cpu_affinity(cpus):
+    """
+    Pins the current process to the given `cpus`.
+
+    :return: Whether the affinity could be set on this platform
+    :rtype: bool
+    """
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+        return True
+    try:
+        import psutil
+        psutil.Process().cpu_affinity(list(cpus))
+        return True
+    except (ImportError, AttributeError):
+        return False
+
+
+def limit_threads(threads):
+    """
+    Limits the number of threads used by BLAS and OpenMP in the current process and all of it's children.
+    The environment only affects libraries that are loaded afterwards, libraries that have already been
+    loaded are limited using threadpoolctl if it is installed.
+    """
+    for variable in THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads)
+    except ImportError:
+        pass
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as error:
+        # The process exists, but belongs to another user
+        return error.errno == errno.EPERM
+    return True
+
+
+def _release_slot(slots, index, pid):
+    with slots.get_lock():
+        if slots[index] == pid:
+            slots[index] = 0
+
+
+def init_worker(slots, resources):
+    """
+    Initializes a worker of an optimizer pool with the resources calculated by `worker_resources`.
+    Every worker takes a free slot, so workers that replace a finished worker reuse the resources of it's slot.
+
+    :param slots: The pid of the worker owning each slot or 0 if the slot is free
+    :type slots: multiprocessing.Array
+    :param resources: The cpu set and the number of threads of each worker
+    :type resources: list[(list[int] | None, int | None)]
+    """
+    logger = logging.getLogger("pySPACEOptimizer.worker")
+    pid = os.getpid()
+    with slots.get_lock():
+        # The slot of a worker that died without releasing it is free as well
+        free = [index for index, owner in enumerate(slots) if owner == 0 or not _is_running(owner)]
+        index = free[0] if free else pid % len(slots)
+        slots[index] = pid
+    if not free:
+        logger.warning("No free resources for worker %d. Sharing the resources of slot %d" % (pid, index))
+    # Release the slot as soon as the worker exits
+    Finalize(None, _release_slot, args=(slots, index, pid), exitpriority=0)
+    cpus, threads = resources[index % len(resources)]
+    if cpus is not None and not set_cpu_affinity(cpus):
+        logger.warning("Pinning workers to cpus is not supported on this platform")
+    if threads is not None:
+        limit_threads(threads)
+    logger.debug("Worker %d: cpus %s, threads %s" % (pid, cpus, threads))
+
+
+class ResourcePlanner(object):
+
+    def __init__(self, cores=None, memory=None, max_backend_processes=1, memory_fraction=0.8, min_free_memory=None):
+        """
+        Creates a new planner sharing the cores and the memory of the machine between the node chains
+        optimized in parallel and the processes each of them may start inside of it's backend.
+        Every started node chain gets an equal share of all cores, but not more backend processes than
+        `max_backend_processes`. As soon as the peak memory of a single process is known, the number of
+        processes is also limited by the memory, so heavy trials reduce the parallelism at runtime.
+
+        :param cores: The number of cores to use, defaults to all cores of the machine
+        :type cores: int
+        :param memory: The memory to use in bytes, defaults to the available memory of the machine
+        :type memory: int
+        :param max_backend_processes: The maximal number of processes the backend of a node chain can use
+        :type max_backend_processes: int
+        :param memory_fraction: The fraction of the memory that may be used by the evaluations
+        :type memory_fraction: float
+        :param min_free_memory: The free memory in bytes that has to be left when starting another node chain
+        :type min_free_memory: int
+        :return: A new resource planner without any started node chains
+        :rtype: ResourcePlanner
+        """
+        self.__cores = max(cores if cores is not None else multiprocessing.cpu_count(), 1)
+        memory = memory if memory is not None else available_memory()
+        self.__memory = memory * memory_fraction if memory else None
+        self.__max_backend_processes = max(max_backend_processes, 1)
+        self.__min_free_memory = min_free_memory
+        self.__rss = None
+        self.__running = {}
+        self.__waiting = set()
+        self.__lock = threading.Lock()
+
+    def __slots(self):
+        # The number of processes that fit onto the machine
+        if self.__rss is None or self.__memory is None:
+            return self.__cores
+        return max(min(int(self.__memory // self.__rss), self.__cores), 1)
+
+    def max_chains(self):
+        """
+        Returns the maximal number of node chains that can be optimized in parallel.
+
+        :rtype: int
+        """
+        with self.__lock:
+            return self.__slots()
+
+    def observe(self, rss):
+        """
+        Records the peak resident set size of a single process during an evaluation.
+
+        :param rss: The peak resident set size in bytes
+        :type rss: int
+        """
+        with self.__lock:
+            self.__rss = max(self.__rss or 0, rss)
+
+    def __memory_left(self):
+        # Whether the free memory of the machine suffices for another process
+        if not self.__min_free_memory:
+            return True
+        free_memory = available_memory()
+        return free_memory is None or free_memory - (self.__rss or 0) >= self.__min_free_memory
+
+    def start_chain(self, chain):
+        """
+        Tries to start the node chain `chain` using a single process.
+        A node chain is only started if there are enough cores and memory left
+        and the free memory of the machine doesn't drop below the minimum.
+        The first node chain is always started.
+
+        :param chain: A unique identifier of the node chain
+        :type chain: str
+        :return: Whether the node chain has been started or has to wait
+        :rtype: bool
+        """
+        with self.__lock:
+            if self.__running and (sum(self.__running.values()) + 1 > self.__slots() or not self.__memory_left()):
+                self.__waiting.add(chain)
+                return False
+            self.__waiting.discard(chain)
+            self.__running[chain] = 1
+            return True
+
+    def finish_chain(self, chain):
+        with self.__lock:
+            self.__running.pop(chain, None)
+            self.__waiting.discard(chain)
+
+    def backend_processes(self, chain):
+        """
+        Returns the number of processes the backend of the started node chain `chain` should use
+        for the next evaluation. The share of the node chain depends on the number of running
+        and waiting node chains and grows as soon as fewer node chains are left.
+
+        :param chain: A unique identifier of a started node chain
+        :type chain: str
+        :rtype: int
+        """
+        with self.__lock:
+            slots = self.__slots()
+            others = sum([processes for other, processes in self.__running.items() if other != chain])
+            share = slots // max(len(self.__running) + len(self.__waiting), 1)
+            processes = max(min(self.__max_backend_processes, share, slots - others), 1)
+            if chain in self.__running:
+                self.__running[chain] = processes
+            return processes
@@ -0,0 +1,176 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+import os
+import shutil
+import tarfile
+import threading
+import uuid
+from multiprocessing.util import Finalize
+
+try:
+    # noinspection PyCompatibility
+    from Queue import Queue
+except ImportError:
+    # noinspection PyCompatibility
+    from queue import Queue
+
+
+class ResultCleaner(object):
+    """
+    Removes the result dirs of evaluated trials in the background.
+
+    A result dir is moved to a trash dir inside the same result dir, which is a cheap rename on the
+    same file system, and the trash is deleted by a fixed number of background threads afterwards.
+    Optionally the outputs of the best trials are compressed before they are deleted.
+    """
+    TRASH_DIR = ".trash"
+    ARCHIVE_SUFFIX = ".tar.gz"
+    # Number of result dirs per thread, which may wait for their deletion before discarding blocks
+    QUEUED_PER_THREAD = 4
+
+    def __init__(self, result_dir, threads=2):
+        """
+        :param result_dir: The dir containing all result dirs to remove
+        :type result_dir: str
+        :param threads: The number of result dirs to delete at the same time
+        :type threads: int
+        :return: A new cleaner with running background threads
+        :rtype: ResultCleaner
+        """
+        self.__trash_dir = os.path.join(result_dir, self.TRASH_DIR)
+        if not os.path.isdir(self.__trash_dir):
+            try:
+                os.makedirs(self.__trash_dir)
+            except OSError:
+                # Created by another worker in the meantime
+                pass
+        self.__queue = Queue(maxsize=max(threads, 1) * self.QUEUED_PER_THREAD)
+        self.__pid = os.getpid()
+        self.__logger = logging.getLogger("%s.%s" % (self.__class__.__module__, self.__class__.__name__))
+        for index in range(max(threads, 1)):
+            thread = threading.Thread(target=self.__work, name="ResultCleaner-%d" % index)
+            thread.daemon = True
+            thread.start()
+        # The daemon threads die with the process, e.g. a recycled worker, so wait for them when exiting
+        Finalize(None, self.__queue.join, exitpriority=10)
+
+    @property
+    def pid(self):
+        """
+        The id of the process running the background threads, which don't survive a fork.
+
+        :rtype: int
+        """
+        return self.__pid
+
+    @classmethod
+    def sweep(cls, result_dir):
+        """
+        Deletes all result dirs left in the trash of the `result_dir`, e.g. by workers that
+        have been terminated before their background threads finished.
+        """
+        shutil.rmtree(os.path.join(result_dir, cls.TRASH_DIR), ignore_errors=True)
+
+    @classmethod
+    def archived_losses(cls, archive_dir):
+        """
+        Returns the losses and the paths of all archives in the `archive_dir` sorted by their loss.
+
+        :rtype: list[(float, str)]
+        """
+        if not os.path.isdir(archive_dir):
+            return []
+        archives = []
+        for file_name in os.listdir(archive_dir):
+            if file_name.endswith(cls.ARCHIVE_SUFFIX):
+                try:
+                    loss = float(file_name.rsplit("_", 1)[0])
+                except ValueError:
+                    continue
+                archives.append((loss, os.path.join(archive_dir, file_name)))
+        return sorted(archives)
+
+    @classmethod
+    def should_archive(cls, archive_dir, loss, keep):
+        """
+        Returns whether a trial with the given `loss` belongs to the `keep` best trials archived in `archive_dir`.
+
+        :rtype: bool
+        """
+        if keep < 1 or loss != loss or loss == float("inf"):
+            return False
+        losses = [archived_loss for archived_loss, _ in cls.archived_losses(archive_dir)]
+        return len(losses) < keep or loss < losses[keep - 1]
+
+    def discard(self, result_paths, archive_dir=None, loss=None, keep=0):
+        """
+        Moves the `result_paths` of a single trial to the trash and deletes them in the background.
+        If the trial belongs to the `keep` best trials, it's results are compressed into the `archive_dir` first.
+
+        :param result_paths: The result dirs of the trial
+        :type result_paths: list[str]
+        :param archive_dir: The dir containing the archives of the best trials
+        :type archive_dir: str
+        :param loss: The loss of the trial
+        :type loss: float
+        :param keep: The number of archives of the best trials to keep
+        :type keep: int
+        """
+        trash_paths = []
+        for result_path in result_paths:
+            if not os.path.exists(result_path):
+                continue
+            trash_path = os.path.join(self.__trash_dir, uuid.uuid4().hex)
+            try:
+                os.rename(result_path, trash_path)
+            except OSError:
+                # Not on the same file system, delete it where it is
+                trash_path = result_path
+            trash_paths.append(trash_path)
+        if archive_dir is not None and loss is not None and self.should_archive(archive_dir, loss, keep):
+            archive_path = os.path.join(archive_dir, "%r_%s%s" % (loss, uuid.uuid4().hex, self.ARCHIVE_SUFFIX))
+        else:
+            archive_path = None
+        if trash_paths:
+            # Blocks if the threads can't keep up
+            self.__queue.put((trash_paths, archive_path, keep))
+
+    def wait(self):
+        # Wait until all discarded result dirs have been deleted
+        self.__queue.join()
+
+    # noinspection PyBroadException
+    def __archive(self, trash_paths, archive_path, keep):
+        archive_dir = os.path.dirname(archive_path)
+        if not os.path.isdir(archive_dir):
+            try:
+                os.makedirs(archive_dir)
+            except OSError:
+                pass
+        temporary_path = archive_path + ".tmp"
+        with tarfile.open(temporary_path, "w:gz") as archive:
+            for index, trash_path in enumerate(trash_paths):
+                archive.add(trash_path, arcname=str(index))
+        os.rename(temporary_path, archive_path)
+        # Remove the archives that are not among the best anymore
+        for _, path in self.archived_losses(archive_dir)[keep:]:
+            try:
+                os.unlink(path)
+            except OSError:
+                # Removed by another worker
+                pass
+
+    # noinspection PyBroadException
+    def __work(self):
+        while True:
+            trash_paths, archive_path, keep = self.__queue.get()
+            try:
+                if archive_path is not None:
+                    self.__archive(trash_paths, archive_path, keep)
+            except Exception:
+                self.__logger.exception("Error archiving the results of a trial:")
+            finally:
+                for trash_path in trash_paths:
+                    shutil.rmtree(trash_path, ignore_errors=True)
+                self.__queue.task_done()
@@ -0,0 +1,53 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import csv
+import sys
+
+import numpy
+
+
+def _open_csv(file_path):
+    # The csv module of python 2 needs a binary file, the one of python 3 a text file
+    if sys.version_info[0] < 3:
+        return open(file_path, "rb")
+    return open(file_path, "r", newline="")
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        # e.g. empty cells or text like the name of a class
+        return float("nan")
+
+
+def read_metrics(result_file, metrics):
+    """
+    Reads only the columns of the given `metrics` from the `result_file` of a pySPACE operation.
+
+    The file is streamed row by row and all other columns are skipped, so even the results of
+    large cross validations with hundreds of columns are parsed with little memory and time.
+    Values, which aren't numbers, are returned as NaN, so the caller has to reject them where needed.
+
+    :param result_file: The path of the `results.csv` to read
+    :type result_file: str
+    :param metrics: The names of the metrics to read in one pass
+    :type metrics: list[str]
+    :return: The values of every metric contained in the result file, metrics missing in the file are left out
+    :rtype: dict[str, numpy.ndarray]
+    """
+    with _open_csv(result_file) as csv_file:
+        reader = csv.reader(csv_file)
+        try:
+            header = next(reader)
+        except StopIteration:
+            return {}
+        columns = dict((metric, header.index(metric)) for metric in set(metrics) if metric in header)
+        values = dict((metric, []) for metric in columns)
+        for row in reader:
+            if not row:
+                continue
+            for metric, column in columns.items():
+                values[metric].append(_to_float(row[column]) if column < len(row) else float("nan"))
+    return dict((metric, numpy.asarray(metric_values, dtype=numpy.float64))
+                for metric, metric_values in values.items())
@@ -0,0 +1,136 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+import yaml
+
+from pySPACEOptimizer.utils import atomic_write
+
+try:
+    from yaml import CLoader as Loader, CDumper as Dumper
+except ImportError:
+    from yaml import Loader, Dumper
+
+
+class RunManifest(object):
+    FILE_NAME = "manifest.yaml"
+
+    def __init__(self, result_dir, load=True):
+        """
+        Creates the manifest of an optimization run stored inside the `result_dir` of the task.
+        The manifest records every node chain of the run, the number of evaluations reported for it
+        and the best result found so far, so an interrupted run can be resumed without reading the
+        trials of every node chain.
+
+        :param result_dir: The result dir of the task
+        :type result_dir: str
+        :param load: Whether to load the manifest of a previous run or to start with an empty manifest
+        :type load: bool
+        :return: The manifest loaded from the result dir or a new empty manifest
+        :rtype: RunManifest
+        """
+        self.__file_path = os.path.join(result_dir, self.FILE_NAME)
+        self.__lock = threading.Lock()
+        self.__chains = {}
+        self.__best = None
+        self.__started = time.time()
+        if load and os.path.isfile(self.__file_path):
+            with open(self.__file_path, "rb") as manifest_file:
+                manifest = yaml.load(manifest_file, Loader=Loader) or {}
+            self.__chains = manifest.get("chains", {})
+            self.__best = manifest.get("best", None)
+            self.__started = manifest.get("started", self.__started)
+
+    @property
+    def file_path(self):
+        return self.__file_path
+
+    @property
+    def best(self):
+        """
+        The best result of the run as a dictionary containing the loss, the id of the node chain and the parameters.
+
+        :rtype: dict[str, object] | None
+        """
+        return self.__best
+
+    def register_chain(self, chain_id, name, evaluations):
+        """
+        Adds the node chain with the given `chain_id` to the run, if it is not already part of it.
+
+        :param chain_id: The stable id of the node chain
+        :type chain_id: str
+        :param name: The name of the node chain
+        :type name: str
+        :param evaluations: The number of evaluations to do for the node chain
+        :type evaluations: int
+        """
+        with self.__lock:
+            if chain_id not in self.__chains:
+                self.__chains[chain_id] = {"name": name, "evaluations": evaluations, "reported": []}
+            else:
+                self.__chains[chain_id]["evaluations"] = evaluations
+
+    def record(self, chain_id, id_, loss=None, parameters=None, duplicate=False):
+        """
+        Records that the evaluation `id_` of the node chain `chain_id` has been reported.
+        If a `loss` and `parameters` are given and the loss is better than the best loss,
+        the evaluation becomes the new best result. A `duplicate` evaluation has been answered
+        from the results of an earlier evaluation of the same parameters.
+
+        :return: Whether the manifest changed significantly and should be stored,
+                 i.e. the node chain is complete or the best result changed
+        :rtype: bool
+        """
+        with self.__lock:
+            chain = self.__chains[chain_id]
+            if id_ not in chain["reported"]:
+                chain["reported"].append(id_)
+            duplicates = chain.setdefault("duplicates", [])
+            if duplicate and id_ not in duplicates:
+                duplicates.append(id_)
+            changed = len(chain["reported"]) >= chain["evaluations"]
+            if parameters is not None and loss is not None and \
+                    (self.__best is None or loss <= self.__best["loss"]):
+                self.__best = {"loss": float(loss), "chain": chain_id, "parameters": dict(parameters)}
+                changed = True
+            return changed
+
+    @property
+    def duplicate_rate(self):
+        """
+        The fraction of all reported evaluations, which have been answered from the results of earlier evaluations.
+
+        :rtype: float
+        """
+        with self.__lock:
+            reported = sum([len(chain["reported"]) for chain in self.__chains.values()])
+            duplicates = sum([len(chain.get("duplicates", [])) for chain in self.__chains.values()])
+        return duplicates / float(reported) if reported else 0.0
+
+    def is_complete(self, chain_id):
+        """
+        Returns whether all evaluations of the node chain `chain_id` have been reported.
+
+        :rtype: bool
+        """
+        with self.__lock:
+            chain = self.__chains.get(chain_id, None)
+            return chain is not None and len(chain["reported"]) >= chain["evaluations"]
+
+    def store(self):
+        with self.__lock:
+            chains = {chain_id: {"name": chain["name"],
+                                 "evaluations": chain["evaluations"],
+                                 "reported": sorted(chain["reported"]),
+                                 "duplicates": sorted(chain.get("duplicates", [])),
+                                 "complete": len(chain["reported"]) >= chain["evaluations"]}
+                      for chain_id, chain in self.__chains.items()}
+            reported = sum([len(chain["reported"]) for chain in chains.values()])
+            duplicates = sum([len(chain["duplicates"]) for chain in chains.values()])
+            data = yaml.dump({"started": self.__started, "updated": time.time(), "best": self.__best,
+                              "duplicate_rate": duplicates / float(reported) if reported else 0.0,
+                              "chains": chains}, Dumper=Dumper, default_flow_style=False, encoding="utf-8")
+        atomic_write(self.__file_path, data)
@@ -0,0 +1,105 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import division
+
+import math
+import threading
+import time
+
+
+class TimeBudget(object):
+
+    def __init__(self, budget, parallel_chains=1):
+        """
+        Creates a new wall clock budget for a whole optimization run.
+        The remaining time is shared between the node chains dynamically: A running node chain may
+        use it's share of the time until the deadline, where the time is shared between the running
+        node chains and all waves of node chains still waiting to be started. Whenever queued node
+        chains are started or skipped, the share of all running node chains grows.
+
+        :param budget: The wall clock time in seconds available for the whole optimization
+        :type budget: float
+        :param parallel_chains: The number of node chains optimized in parallel
+        :type parallel_chains: int
+        :return: A new budget, which starts as soon as `start` is called
+        :rtype: TimeBudget
+        """
+        self.__budget = budget
+        self.__parallel_chains = max(parallel_chains, 1)
+        self.__deadline = None
+        self.__queued = 0
+        self.__started = {}
+        self.__lock = threading.Lock()
+
+    def start(self):
+        # Start the clock
+        with self.__lock:
+            self.__deadline = time.time() + self.__budget
+
+    def add_chain(self):
+        # Register a queued node chain
+        with self.__lock:
+            self.__queued += 1
+
+    def start_chain(self, chain):
+        """
+        Marks the node chain `chain` as started.
+
+        :param chain: A unique identifier of the node chain
+        :type chain: str
+        :return: Whether the node chain may be started at all or the budget has already expired
+        :rtype: bool
+        """
+        with self.__lock:
+            self.__queued = max(self.__queued - 1, 0)
+            self.__started[chain] = time.time()
+        return not self.expired()
+
+    def finish_chain(self, chain):
+        with self.__lock:
+            self.__started.pop(chain, None)
+
+    def remaining(self):
+        """
+        Returns the remaining time of the whole budget in seconds.
+
+        :rtype: float
+        """
+        if self.__deadline is None:
+            return float(self.__budget)
+        return max(self.__deadline - time.time(), 0.0)
+
+    def expired(self, expected_time=0.0):
+        """
+        Returns whether the whole budget will be expired after `expected_time` seconds.
+
+        :rtype: bool
+        """
+        return self.remaining() <= expected_time
+
+    def chain_deadline(self, chain):
+        """
+        Returns the point in time until the node chain `chain` may start new evaluations.
+
+        :param chain: A unique identifier of a started node chain
+        :type chain: str
+        :rtype: float
+        """
+        with self.__lock:
+            if self.__deadline is None:
+                return float("inf")
+            start = self.__started.get(chain, time.time())
+            waves = 1 + int(math.ceil(self.__queued / self.__parallel_chains))
+            return min(start + (self.__deadline - start) / waves, self.__deadline)
+
+    def may_continue(self, chain, expected_time=0.0):
+        """
+        Returns whether the node chain `chain` may start an evaluation expected to take `expected_time` seconds.
+
+        :param chain: A unique identifier of a started node chain
+        :type chain: str
+        :param expected_time: The expected duration of the next evaluation in seconds
+        :type expected_time: float
+        :rtype: bool
+        """
+        return time.time() + expected_time < self.chain_deadline(chain)
@@ -0,0 +1,55 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import multiprocessing
+import os
+import sys
+from argparse import ArgumentParser
+
+import pySPACE
+from pySPACEOptimizer.core.__main__ import init_logging
+from pySPACEOptimizer.core.broker import parse_address, run_worker
+
+
+def create_parser():
+    parser = ArgumentParser(description="Start workers evaluating the trials handed out by the broker of an "
+                                        "optimization running on another host")
+    parser.add_argument("-c", "--config", type=str, help="The name of the pySPACEcenter configuration to load",
+                        default="config.yaml")
+    parser.add_argument("--broker", type=str, required=True,
+                        help="The address of the broker in the format HOST:PORT")
+    parser.add_argument("--authkey", type=str, default=os.environ.get("PYSPACE_OPTIMIZER_AUTHKEY", None),
+                        help="The authentication key of the broker. "
+                             "Default: The environment variable PYSPACE_OPTIMIZER_AUTHKEY")
+    parser.add_argument("-p", "--processes", type=int, default=multiprocessing.cpu_count(),
+                        help="The number of workers to start on this host. Default: The number of cores")
+    return parser
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    parser = create_parser()
+    arguments = parser.parse_args(args)
+    if not arguments.authkey:
+        parser.error("The authentication key of the broker is missing")
+
+    # Load the configuration, the storage has to be the same as on the host of the optimizer
+    old_stdout = sys.stdout
+    try:
+        sys.stdout = open(os.devnull, "wb")
+        pySPACE.load_configuration(arguments.config)
+    finally:
+        sys.stdout = old_stdout
+    init_logging()
+
+    address = parse_address(arguments.broker)
+    workers = [multiprocessing.Process(target=run_worker, args=(address, arguments.authkey))
+               for _ in range(arguments.processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,29 @@
 #!/bin/env python
 # -*- coding: utf-8 -*-
 import abc
+import contextlib
 import logging
+import multiprocessing
 import os
+import shutil
+import signal
+import socket
 import sys
 import threading
-from multiprocessing import Manager
+
+import yaml
 
 from pySPACE.tools.progressbar import ProgressBar, Percentage, Bar, ETA
 from pySPACEOptimizer.core.node_chain_parameter_space import NodeChainParameterSpace
 from pySPACEOptimizer.core.nodelist_generator import NodeListGenerator
+from pySPACEOptimizer.core.optimizer_manager import OptimizerManager
+from pySPACEOptimizer.core.optimizer_pool import OptimizerPool
+from pySPACEOptimizer.core.pareto_front import ParetoFront
 from pySPACEOptimizer.core.performance_graphic import PerformanceGraphic
+from pySPACEOptimizer.core.resources import MEGABYTE, init_worker, worker_resources
+from pySPACEOptimizer.core.result_cleaner import ResultCleaner
+from pySPACEOptimizer.core.run_manifest import RunManifest
+from pySPACEOptimizer.utils import ignore_interrupts
 
 __all__ = ["PySPACEOptimizer", "NoPipelineFound"]
 
@@ -51,13 +64,33 @@ class PySPACEOptimizer(object):
             while True:
                 result = self.__optimizer.queue.get()
                 if result != self.SENTINEL_VALUE:
-                    id_, loss, pipeline, parameters = result
+                    id_, loss, pipeline, parameters, trial_result = result
                     self.__optimizer.logger.debug("Checking result of pipeline '%s':\nLoss: %s, Parameters: %s",
                                                   pipeline, loss, parameters)
-                    if loss <= self.__optimizer.best[0]:
+                    stopped = trial_result is not None and trial_result.get("stopped", False)
+                    if parameters is None:
+                        # A skipped evaluation, only update the progress
+                        pass
+                    elif stopped:
+                        # The loss of a stopped evaluation is only an intermediate loss
+                        pass
+                    elif loss <= self.__optimizer.best[0]:
                         self.__optimizer.best = [loss, pipeline, parameters]
-                        self.__optimizer.store_best_result(best_pipeline=pipeline,
-                                                           best_parameters=parameters)
+                        if self.__optimizer.pareto_front is None:
+                            self.__optimizer.store_best_result(best_pipeline=pipeline,
+                                                               best_parameters=parameters)
+                    if parameters is not None:
+                        # Skipped evaluations are not recorded, a resumed run tries them again
+                        duplicate = trial_result is not None and trial_result.get("duplicate", False)
+                        if self.__optimizer.manifest.record(pipeline.chain_id, id_,
+                                                            loss=loss if not stopped else None,
+                                                            parameters=parameters if not stopped else None,
+                                                            duplicate=duplicate):
+                            self.__optimizer.manifest.store()
+                    if self.__optimizer.pareto_front is not None and trial_result is not None and \
+                            not trial_result.get("stopped", False):
+                        if self.__optimizer.pareto_front.add(trial_result, pipeline, parameters):
+                            self.__optimizer.store_pareto_front()
                     # Update the progress bar
                     self.__progress_bar.update(self.__progress_bar.currval + 1)
                     # Update the performance graphic
@@ -83,15 +116,64 @@ class PySPACEOptimizer(object):
             self.__best_result_file = "%s_best.yaml" % task["data_set_path"]
         self.__logger = logging.getLogger("pySPACEOptimizer.optimizer.{optimizer}".format(optimizer=self))
         self.__pipelines = []
+        # Node chains dropped after the generation, e.g. by the smoke test, are never generated again
+        self.__generated = False
+        if task["broker"] is not None:
+            # Workers on other hosts need to reach the shared services
+            self.__manager = OptimizerManager(address=(socket.getfqdn(), 0), authkey=task["broker_authkey"])
+        else:
+            self.__manager = OptimizerManager()
+        # The shared services have to survive an interrupt until the optimization has been cancelled
+        self.__manager.start(initializer=ignore_interrupts)
+        self.__cancelled = self.__manager.Event()
+        min_free_memory = task["min_free_memory"] * MEGABYTE if task["min_free_memory"] else None
+        if task["max_parallel_pipelines"] == "auto":
+            # Only the multicore backend starts processes on this machine, when evaluating
+            # data set by data set, it doesn't have anything to process in parallel
+            if backend != "mcore" or task["racing"] or task["median_stopping"]:
+                max_backend_processes = 1
+            else:
+                max_backend_processes = len(task.data_sets)
+            self.__resource_planner = self.__manager.ResourcePlanner(max_backend_processes=max_backend_processes,
+                                                                     min_free_memory=min_free_memory)
+            self.logger.info("Optimizing up to %d node chains in parallel" % self.__resource_planner.max_chains())
+        elif min_free_memory is not None:
+            # Only use the planner to delay the start of node chains if the memory runs low
+            cores = task["max_parallel_pipelines"] if task["max_parallel_pipelines"] is not None else \
+                multiprocessing.cpu_count()
+            self.__resource_planner = self.__manager.ResourcePlanner(cores=cores, min_free_memory=min_free_memory)
+        else:
+            self.__resource_planner = None
         # Calculate the queue size as beeing large enough
         # to store the results of all evaluations
         # of all pipelines beein processed in parallel
-        max_size = task["max_parallel_pipelines"] if task["max_parallel_pipelines"] is not None else 1
+        max_size = self.parallel_pipelines if self.parallel_pipelines is not None else 1
         max_size *= task["evaluations_per_pass"] * task["passes"]
-        self.__queue = Manager().Queue(maxsize=max_size)
+        self.__queue = self.__manager.Queue(maxsize=max_size)
+        if task["median_stopping"]:
+            self.__early_stopping = self.__manager.MedianStoppingRule(min_trials=task["median_stopping_min_trials"])
+        else:
+            self.__early_stopping = None
+        if task["prune_failures"]:
+            self.__failure_registry = self.__manager.FailureRegistry(
+                min_evaluations=task["failure_min_evaluations"],
+                max_failure_rate=task["max_failure_rate"],
+                protected_nodes=task.required_nodes)
+        else:
+            self.__failure_registry = None
+        if task["time_budget"] is not None:
+            parallel_chains = self.parallel_pipelines if self.parallel_pipelines is not None else \
+                multiprocessing.cpu_count()
+            self.__time_budget = self.__manager.TimeBudget(budget=task["time_budget"],
+                                                           parallel_chains=parallel_chains)
+        else:
+            self.__time_budget = None
         self.__performance_graphic = PerformanceGraphic(file_path=os.path.join(task.base_result_dir, "performance.pdf"))
         self.__queue_reader = PySPACEOptimizer.QueueReader(task, self)
         self.__best = [float("inf"), None, None]
+        # Without resuming, the manifest of a previous run in the same result dir is replaced
+        self.__manifest = RunManifest(task.base_result_dir, load=task["resume"])
+        self.__pareto_front = ParetoFront(task.objectives) if task["multi_objective"] else None
 
     @property
     def logger(self):
@@ -101,6 +183,65 @@ class PySPACEOptimizer(object):
     def queue(self):
         return self.__queue
 
+    @property
+    def early_stopping(self):
+        """
+        The median stopping rule shared between all workers or None if no early stopping is used.
+
+        :rtype: MedianStoppingRule | None
+        """
+        return self.__early_stopping
+
+    @property
+    def failure_registry(self):
+        """
+        The registry of failing nodes and node chains shared between all workers
+        or None if failing node chains should not be pruned.
+
+        :rtype: FailureRegistry | None
+        """
+        return self.__failure_registry
+
+    @property
+    def cancelled(self):
+        """
+        The event shared between all workers, which is set as soon as the optimization has been cancelled.
+        Workers don't start any new evaluations after the event has been set.
+
+        :rtype: threading.Event
+        """
+        return self.__cancelled
+
+    @property
+    def resource_planner(self):
+        """
+        The planner sharing the cores and the memory between all workers
+        or None if the number of parallel node chains is fixed.
+
+        :rtype: ResourcePlanner | None
+        """
+        return self.__resource_planner
+
+    @property
+    def parallel_pipelines(self):
+        """
+        The number of node chains to optimize in parallel or None to use one node chain per core.
+
+        :rtype: int | None
+        """
+        if self._task["max_parallel_pipelines"] == "auto":
+            return self.__resource_planner.max_chains()
+        return self._task["max_parallel_pipelines"]
+
+    @property
+    def time_budget(self):
+        """
+        The wall clock budget of the optimization shared between all workers or None if there is no budget.
+
+        :rtype: TimeBudget | None
+        """
+        return self.__time_budget
+
     @property
     def best(self):
         return self.__best
@@ -109,6 +250,24 @@ class PySPACEOptimizer(object):
     def best(self, best_values):
         self.__best = best_values
 
+    @property
+    def manifest(self):
+        """
+        The manifest recording the progress of every node chain to resume an interrupted optimization.
+
+        :rtype: RunManifest
+        """
+        return self.__manifest
+
+    @property
+    def pareto_front(self):
+        """
+        The front of all non-dominated evaluations if the task is a multi-objective task.
+
+        :rtype: ParetoFront | None
+        """
+        return self.__pareto_front
+
     def performance_graphic_add(self, pipeline, id_, loss):
         self.__performance_graphic.add(pipeline, id_, loss)
 
@@ -122,19 +281,132 @@ class PySPACEOptimizer(object):
             # Write the result to the object
             best_result_file.write(operation_spec["base_file"])
 
+    def store_pareto_front(self):
+        """
+        Stores all non-dominated evaluations instead of a single best result.
+        Each member is written as a separate YAML document containing it's objectives,
+        the name of the node chain and the operation specification to reproduce it.
+        """
+        documents = []
+        for member in self.__pareto_front.as_dictionaries():
+            pipeline = member.pop("pipeline")
+            parameters = member.pop("parameters")
+            member["pipeline"] = pipeline.name
+            member["operation"] = pipeline.operation_spec(parameter_settings=[parameters])["base_file"]
+            documents.append(member)
+        with open(self.__best_result_file, "wb") as best_result_file:
+            yaml.safe_dump_all(documents, best_result_file, default_flow_style=False)
+
+    def _create_pool(self, processes=None):
+        """
+        Creates the pool of workers optimizing the node chains. Depending on the task each worker
+        is pinned to it's own set of cpus and the threads of BLAS and OpenMP are limited.
+        Workers are recycled after a number of tasks or if they use too much memory.
+
+        :param processes: The number of workers or None to use one worker per core
+        :type processes: int
+        :rtype: OptimizerPool
+        """
+        recycling = {
+            "maxtasksperchild": self._task["max_tasks_per_worker"],
+            "max_memory": self._task["max_worker_memory"] * MEGABYTE if self._task["max_worker_memory"] else None,
+            "max_memory_growth": self._task["max_worker_memory_growth"] * MEGABYTE
+            if self._task["max_worker_memory_growth"] else None,
+        }
+        workers = processes if processes is not None else multiprocessing.cpu_count()
+        resources = worker_resources(workers, threads=self._task["worker_threads"], pin=self._task["pin_workers"],
+                                     numa=self._task["numa_placement"])
+        if resources is None:
+            return OptimizerPool(processes=processes, **recycling)
+        for index, (cpus, threads) in enumerate(resources):
+            self.logger.info("Worker %d: cpus %s, BLAS/OpenMP threads %s" % (
+                index, ",".join([str(cpu) for cpu in cpus]) if cpus is not None else "all",
+                threads if threads is not None else "default"))
+        return OptimizerPool(processes=processes, initializer=init_worker,
+                             initargs=(multiprocessing.Array("i", len(resources)), resources), **recycling)
+
+    def __cancel(self, pool, finished, signum):
+        # Runs in it's own thread, because the signal may interrupt the main thread inside a call to the manager
+        self.logger.warn("Received signal %d. Cancelling the optimization" % signum)
+        self.__cancelled.set()
+        if not finished.wait(self._task["cancel_timeout"]):
+            self.logger.warn("Evaluations still running after %s seconds. Terminating the workers" %
+                             self._task["cancel_timeout"])
+            pool.terminate()
+
+    @contextlib.contextmanager
+    def _cancellable(self, pool):
+        """
+        Cancels the optimization on SIGINT or SIGTERM while the workers of the `pool` optimize the node chains.
+        The workers don't start any new evaluations and store their trials, evaluations still running after
+        the cancel timeout of the task are terminated. A second signal terminates all workers immediately.
+
+        :param pool: The pool of workers to terminate
+        :type pool: OptimizerPool | BrokerPool
+        """
+        if threading.current_thread().name != "MainThread":
+            # Signal handlers can only be installed by the main thread
+            yield
+            return
+        finished = threading.Event()
+        cancelling = []
+
+        # noinspection PyUnusedLocal
+        def handle_signal(signum, frame):
+            if cancelling:
+                self.logger.warn("Received signal %d again. Terminating the workers" % signum)
+                target, args = pool.terminate, ()
+            else:
+                target, args = self.__cancel, (pool, finished, signum)
+            thread = threading.Thread(target=target, args=args, name="Cancellation")
+            thread.daemon = True
+            thread.start()
+            cancelling.append(thread)
+
+        old_handlers = {signum: signal.signal(signum, handle_signal) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            yield
+        finally:
+            finished.set()
+            for signum, handler in old_handlers.items():
+                signal.signal(signum, handler)
+            for thread in cancelling:
+                thread.join()
+
     def _generate_node_chain_parameter_spaces(self):
-        if not self.__pipelines:
+        if not self.__generated:
+            evaluations = self._task["evaluations_per_pass"] * self._task["passes"]
             for name, node_list in NodeListGenerator(self._task):
                 self.logger.debug("Testing NodeChainParameterSpace: %s", node_list)
                 pipeline = NodeChainParameterSpace(name=name, configuration=self._task,
                                                    node_list=[self.create_node(node) for node in node_list])
+                self.__manifest.register_chain(pipeline.chain_id, name=str(pipeline), evaluations=evaluations)
+                if self._task["resume"]:
+                    best = self.__manifest.best
+                    if best is not None and best["chain"] == pipeline.chain_id and best["loss"] <= self.best[0]:
+                        # Restore the best result of the interrupted run
+                        self.best = [best["loss"], pipeline, best["parameters"]]
+                    if self.__manifest.is_complete(pipeline.chain_id):
+                        self.logger.info("Node chain '%s' has already been optimized. Skipping" % pipeline)
+                        continue
                 self.__pipelines.append(pipeline)
                 self.__queue_reader.set_number_of_pipelines(len(self.__pipelines))
                 yield pipeline
+            self.__generated = True
         else:
             for pipeline in self.__pipelines:
                 yield pipeline
 
+    def _drop_node_chain_parameter_spaces(self, pipelines):
+        """
+        Removes the given `pipelines` from the node chains to optimize.
+
+        :param pipelines: The node chains that should not be optimized
+        :type pipelines: list[NodeChainParameterSpace]
+        """
+        self.__pipelines = [pipeline for pipeline in self.__pipelines if pipeline not in pipelines]
+        self.__queue_reader.set_number_of_pipelines(len(self.__pipelines))
+
     @abc.abstractmethod
     def create_node(self, node_name):
         """
@@ -151,11 +423,24 @@ class PySPACEOptimizer(object):
     def do_optimization(self):
         self.__performance_graphic.start()
         self.__queue_reader.start()
+        if self.__time_budget is not None:
+            self.__time_budget.start()
         try:
             self.optimize()
+            if self.__cancelled.is_set():
+                self.logger.warn("Optimization has been cancelled. Continue it using the option '--resume'")
         finally:
             self.__queue_reader.stop()
             self.__queue_reader.join()
+            self.__manifest.store()
+            if self.__manifest.duplicate_rate > 0:
+                self.logger.info("%.1f%% of the evaluations repeated already evaluated parameters" %
+                                 (100 * self.__manifest.duplicate_rate))
+            # Delete the result dirs the workers didn't delete before they exited
+            ResultCleaner.sweep(self._task.base_result_dir)
+            if self._task["scratch_dir"] is not None:
+                shutil.rmtree(self._task["scratch_dir"], ignore_errors=True)
+            self.__manager.shutdown()
             self.__performance_graphic.stop()
             self.__performance_graphic.join()
         return self.best
@@ -6,6 +6,7 @@ import glob
 import logging
 import os
 import pprint
+import uuid
 
 import pySPACE
 from pySPACE.missions.nodes import DEFAULT_NODE_MAPPING
@@ -13,7 +14,7 @@ from pySPACE.resources.dataset_defs.base import BaseDataset
 
 from pySPACEOptimizer.framework.node_parameter_space import NodeParameterSpace
 
-__all__ = ["Task", "is_source_node", "is_splitter_node", "is_sink_node", "get_node_type"]
+__all__ = ["Task", "is_source_node", "is_splitter_node", "is_sink_node", "get_node_type", "data_set_dirs"]
 
 
 def get_node_type(node_name):
@@ -36,13 +37,42 @@ def is_sink_node(node_name):
     return is_node_type(node_name, "sink")
 
 
+def storage_path(input_path):
+    if not os.path.isabs(input_path):
+        # we need to have an absolute path here, assume it's relative to the storage location
+        return os.path.join(pySPACE.configuration.storage, input_path)
+    else:
+        return input_path
+
+
+def data_set_dirs(input_path):
+    """
+    Returns the directories of all data sets contained in the `input_path`.
+
+    :param input_path: An input path of pySPACE, relative to the pySPACE storage or absolute
+    :type input_path: str
+    :rtype: list[str]
+    """
+    pattern = os.path.join(storage_path(input_path), "*", "")
+    return sorted([os.path.dirname(data_set) for data_set in glob.glob(pattern)])
+
+
 class Task(dict):
 
     def __init__(self, name, input_path, evaluations_per_pass, metric, optimizer="PySPACEOptimizer",
                  max_pipeline_length=3, max_eval_time=0, passes=1, source_node=None, is_performance_metric=False,
                  sink_node="PerformanceSinkNode", whitelist=None, blacklist=None, forced_nodes=None, node_weights=None,
                  parameter_ranges=None, window_size=None, max_loss=float("inf"), check_after=100,
-                 max_parallel_pipelines=None, **kwargs):
+                 max_parallel_pipelines=None, multi_objective=False, time_metrics=None,
+                 racing=False, racing_alpha=0.05, racing_min_folds=2, median_stopping=False,
+                 median_stopping_min_trials=5, prune_failures=True, failure_min_evaluations=10,
+                 max_failure_rate=1.0, smoke_test=False, time_budget=None, time_budget_policy="finish",
+                 worker_threads=None, pin_workers=False, numa_placement=False, max_tasks_per_worker=None,
+                 max_worker_memory=None, max_worker_memory_growth=1024, min_free_memory=None, scheduling="chain",
+                 broker=None, broker_authkey=None, lease_timeout=60, resume=False, cancel_timeout=60,
+                 cleanup_threads=2, keep_best_outputs=0, scratch_dir=None, in_process=False, cv_splits=None, cv_seed=0,
+                 memoize_trials=False, memo_resamples=0, grid_search=False, freeze_parameters=False,
+                 freeze_min_trials=20, freeze_interval=10, freeze_threshold=0.01, **kwargs):
 
         self._logger = logging.getLogger("%s.%s" % (self.__class__.__module__, self.__class__.__name__))
 
@@ -71,6 +101,38 @@ class Task(dict):
         if window_size is None:
             window_size = evaluations_per_pass
 
+        if max_parallel_pipelines is not None and max_parallel_pipelines != "auto" and \
+                (not isinstance(max_parallel_pipelines, int) or max_parallel_pipelines < 1):
+            raise ValueError("The number of parallel pipelines '{number}' is neither a positive number "
+                             "nor 'auto'".format(number=max_parallel_pipelines))
+
+        if time_budget_policy not in ("finish", "cancel"):
+            raise ValueError("The time budget policy '{policy}' is neither 'finish' nor 'cancel'".format(
+                policy=time_budget_policy))
+
+        if worker_threads is not None and worker_threads != "auto" and \
+                (not isinstance(worker_threads, int) or worker_threads < 1):
+            raise ValueError("The number of worker threads '{number}' is neither a positive number "
+                             "nor 'auto'".format(number=worker_threads))
+
+        if scheduling not in ("chain", "trial"):
+            raise ValueError("The scheduling '{scheduling}' is neither 'chain' nor 'trial'".format(
+                scheduling=scheduling))
+
+        if broker is not None and not broker_authkey:
+            raise ValueError("The broker '{broker}' needs an authentication key".format(broker=broker))
+
+        if cv_splits is not None and (not isinstance(cv_splits, int) or cv_splits < 2):
+            raise ValueError("The number of cross validation splits '{splits}' is not a number "
+                             "greater than 1".format(splits=cv_splits))
+
+        if cv_splits is not None and not in_process:
+            raise ValueError("Cross validation splits are only used when evaluating the node chains in process")
+
+        if time_metrics is None:
+            time_metrics = {"train_time": "Time (Training)",
+                            "inference_time": "Time (Classification)"}
+
         super(Task, self).__init__({
             "name": name,
             "passes": passes,
@@ -93,6 +155,60 @@ class Task(dict):
             "max_parallel_pipelines": max_parallel_pipelines,
             "metric": metric,
             "is_performance_metric": is_performance_metric,
+            "multi_objective": multi_objective,
+            "time_metrics": dict(time_metrics),
+            "racing": racing,
+            "racing_alpha": racing_alpha,
+            "racing_min_folds": racing_min_folds,
+            "median_stopping": median_stopping,
+            "median_stopping_min_trials": median_stopping_min_trials,
+            "prune_failures": prune_failures,
+            "failure_min_evaluations": failure_min_evaluations,
+            "max_failure_rate": max_failure_rate,
+            "smoke_test": smoke_test,
+            "time_budget": time_budget,
+            "time_budget_policy": time_budget_policy,
+            "worker_threads": worker_threads,
+            "pin_workers": pin_workers,
+            "numa_placement": numa_placement,
+            # Memory sizes are given in megabytes
+            "max_tasks_per_worker": max_tasks_per_worker,
+            "max_worker_memory": max_worker_memory,
+            "max_worker_memory_growth": max_worker_memory_growth,
+            "min_free_memory": min_free_memory,
+            "scheduling": scheduling,
+            "broker": broker,
+            "broker_authkey": broker_authkey,
+            "lease_timeout": lease_timeout,
+            "resume": resume,
+            # Seconds to wait for running evaluations after the optimization has been cancelled
+            "cancel_timeout": cancel_timeout,
+            # Number of threads of each worker deleting the result dirs of the trials in the background
+            "cleanup_threads": cleanup_threads,
+            # Number of the best trials of each node chain to keep the outputs of as compressed archive
+            "keep_best_outputs": keep_best_outputs,
+            # Every run gets it's own dir for the transient outputs of the trials inside the scratch dir
+            "scratch_dir": os.path.join(scratch_dir, "%s_%s" % (name, uuid.uuid4().hex[:8]))
+            if scratch_dir is not None else None,
+            # Evaluate the node chains inside the workers instead of executing pySPACE operations
+            "in_process": in_process,
+            # Number of stratified cross validation splits computed once for all trials evaluated in process,
+            # None evaluates the data sets as they are
+            "cv_splits": cv_splits,
+            "cv_seed": cv_seed,
+            # Answer parameter settings suggested again from the earlier results of the same node chain,
+            # after evaluating them `memo_resamples` additional times for noisy metrics
+            "memoize_trials": memoize_trials,
+            "memo_resamples": memo_resamples,
+            # Evaluate every configuration of node chains with fewer configurations than evaluations
+            # instead of sampling them and stop these node chains as soon as all configurations are evaluated
+            "grid_search": grid_search,
+            # Freeze the parameters explaining less than `freeze_threshold` of the variance of the losses
+            # at their best value, estimated after `freeze_min_trials` and then every `freeze_interval` trials
+            "freeze_parameters": freeze_parameters,
+            "freeze_min_trials": freeze_min_trials,
+            "freeze_interval": freeze_interval,
+            "freeze_threshold": freeze_threshold,
         })
         super(Task, self).update(kwargs)
 
@@ -199,26 +315,62 @@ class Task(dict):
                 nodes_by_input_type[input_type].append(node_name)
         return nodes_by_input_type
 
+    @property
+    def data_set_dir(self):
+        return storage_path(self["data_set_path"])
+
+    @property
+    def data_sets(self):
+        """
+        Returns the directories of all data sets contained in the input of this task.
+
+        :rtype: list[str]
+        """
+        return data_set_dirs(self.data_set_dir)
+
     @property
     def data_set_type(self):
         # Determinate the type of the data set
-        if not os.path.isabs(self["data_set_path"]):
-            # we need to have an absolute path here, assume it's relative to the storage location
-            data_set_dir = os.path.join(pySPACE.configuration.storage, self["data_set_path"])
-        else:
-            data_set_dir = self["data_set_path"]
-        data_set_dir = os.path.join(data_set_dir, "*", "")
         old_data_set_type = None
-        for file_ in glob.glob(data_set_dir):
+        for file_ in self.data_sets:
             data_set_type = BaseDataset.load_meta_data(file_)["type"]
             if old_data_set_type is not None and data_set_type != old_data_set_type:
                 raise TypeError("Inconsistent Data sets found: {old_type} != {new_type}".format(
                     old_type=old_data_set_type, new_type=data_set_type))
             old_data_set_type = data_set_type
         if old_data_set_type is None:
-            raise AttributeError("No data sets found at '{dir}'".format(dir=data_set_dir))
+            raise AttributeError("No data sets found at '{dir}'".format(dir=self.data_set_dir))
         return old_data_set_type.title().replace("_", "")
 
+    @property
+    def fold_input_paths(self):
+        """
+        Returns one input path for every data set contained in the input of this task.
+        Each of these input paths is a summary containing exactly one data set, so that
+        a node chain can be evaluated data set by data set. The summaries are created
+        inside the result dir of the task and link to the original data sets.
+
+        :return: The input paths of all folds relative to the pySPACE storage
+        :rtype: list[str]
+        """
+        fold_dir = os.path.join(self.base_result_dir, "folds")
+        input_paths = []
+        for data_set in self.data_sets:
+            name = os.path.basename(data_set)
+            summary_dir = os.path.join(fold_dir, name)
+            link = os.path.join(summary_dir, name)
+            try:
+                if not os.path.isdir(summary_dir):
+                    os.makedirs(summary_dir)
+                if not os.path.islink(link):
+                    os.symlink(data_set, link)
+            except OSError:
+                # Created by another process in the mean time
+                if not os.path.islink(link):
+                    raise
+            input_paths.append(os.path.relpath(summary_dir, pySPACE.configuration.storage))
+        return input_paths
+
     def weighted_nodes_by_input_type(self):
         weighted_nodes = {}
         for input_type, nodes in self.nodes_by_input_type.items():
@@ -248,8 +400,25 @@ class Task(dict):
         result = self["parameter_ranges"].get(node.name, {})
         if "metric" in node.parameters:
             result["metric"] = [self["metric"]]
+        if self["multi_objective"] and "measure_times" in node.parameters:
+            result["measure_times"] = [True]
         return result
 
+    @property
+    def objectives(self):
+        """
+        Returns the names of all objectives to minimize.
+        The loss is always the first objective, in multi-objective mode
+        it is followed by the names of the time metrics.
+
+        :return: The names of all objectives
+        :rtype: list[str]
+        """
+        objectives = ["loss"]
+        if self["multi_objective"]:
+            objectives.extend(sorted(self["time_metrics"].keys()))
+        return objectives
+
     @property
     def base_result_dir(self):
         return self["result_dir"]
@@ -257,3 +426,15 @@ class Task(dict):
     @base_result_dir.setter
     def base_result_dir(self, result_dir):
         self["result_dir"] = result_dir
+
+    @property
+    def scratch_result_dir(self):
+        """
+        Returns the dir of the current process to store the transient outputs of the trials in.
+        Without a scratch dir, e.g. a tmpfs or a local disk, the outputs are stored in the result dir of the task.
+
+        :rtype: str
+        """
+        if self["scratch_dir"] is None:
+            return self.base_result_dir
+        return os.path.join(self["scratch_dir"], "worker_%d" % os.getpid())
@@ -3,7 +3,8 @@ import inspect
 
 from pySPACE.missions import nodes
 from pySPACE.missions.nodes.decorators import PARAMETER_ATTRIBUTE, PARAMETER_TYPES, ChoiceParameter, NormalParameter, \
-    QNormalParameter, BooleanParameter, NoOptimizationParameter, ParameterDecorator
+    QNormalParameter, BooleanParameter, NoOptimizationParameter, ParameterDecorator, LogNormalParameter, \
+    UniformParameter, LogUniformParameter
 
 
 class NodeParameterSpace(object):
@@ -116,6 +117,64 @@ class NodeParameterSpace(object):
         return {self._make_parameter_name(parameter): parameter for parameter in values
                 if not isinstance(parameter, NoOptimizationParameter)}
 
+    def default_setting(self):
+        """
+        Returns a value for every parameter in the parameter space of this node.
+        Values given by the task are preferred, followed by the default values of the node's
+        __init__ method. All other parameters get a representative value of their distribution.
+
+        :return: A dictionary mapping the unique name of each parameter to it's value
+        :rtype: dict[str, object]
+        """
+        defaults = {}
+        # Walk the MRO in reverse, so that the defaults of sub classes win
+        for class_ in reversed(inspect.getmro(self.class_)):
+            if class_ != object and hasattr(class_, "__init__"):
+                argspec = inspect.getargspec(class_.__init__)
+                if argspec.defaults is not None:
+                    defaults.update(zip(argspec.args[-len(argspec.defaults):], argspec.defaults))
+        task_values = {self._make_parameter_name(parameter): parameter for parameter in self._values}
+        decorators = NodeParameterSpace.parameter_space(self)
+        setting = {}
+        for name in self.parameter_space().keys():
+            if name in task_values:
+                setting[name] = self._representative_value(task_values[name])
+            else:
+                parameter = decorators.get(name, None)
+                parameter_name = parameter.parameter_name if parameter is not None else None
+                if parameter_name in defaults:
+                    setting[name] = defaults[parameter_name]
+                elif parameter is not None:
+                    setting[name] = self._representative_value(parameter)
+        return setting
+
+    @staticmethod
+    def _representative_value(parameter):
+        """
+        Returns a representative value of the distribution of the given `parameter`.
+
+        :param parameter: The parameter to get the value for
+        :type parameter: ParameterDecorator
+        :return: The first choice of a choice or the center of any other distribution
+        :rtype: object
+        """
+        if isinstance(parameter, ChoiceParameter):
+            return parameter.choices[0]
+        elif isinstance(parameter, LogNormalParameter):
+            value = parameter.scale
+        elif isinstance(parameter, NormalParameter):
+            value = parameter.mu
+        elif isinstance(parameter, LogUniformParameter):
+            value = (parameter.min * parameter.max) ** 0.5
+        elif isinstance(parameter, UniformParameter):
+            value = (parameter.min + parameter.max) / 2.0
+        else:
+            return None
+        q = getattr(parameter, "q", None)
+        if q:
+            value = round(value / q) * q
+        return value
+
     def as_dictionary(self):
         """
         Returns the specification as a dictionary usable for pySPACE execution.
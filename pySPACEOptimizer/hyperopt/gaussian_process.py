@@ -0,0 +1,208 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import math
+
+import numpy
+from hyperopt import base, rand, JOB_STATE_DONE
+from scipy.linalg import cho_factor, cho_solve, solve_triangular
+from scipy.spatial.distance import cdist
+from scipy.stats import norm
+
+from pySPACE.missions.nodes.decorators import ChoiceParameter, LogNormalParameter, NormalParameter, \
+    LogUniformParameter, QLogUniformParameter, UniformParameter
+from pySPACEOptimizer.framework.node_parameter_space import NodeParameterSpace
+
+
+class _ChoiceDimension(object):
+    # A choice is encoded one-hot, the hyperopt value is the index of the choice
+
+    def __init__(self, choices):
+        self.width = choices
+
+    def encode(self, value):
+        encoded = numpy.zeros(self.width)
+        encoded[int(value)] = 1
+        return encoded
+
+    @staticmethod
+    def decode(encoded):
+        return int(numpy.argmax(encoded))
+
+
+class _ContinuousDimension(object):
+    # A distribution is encoded inside the unit interval of it's (log) range
+
+    def __init__(self, low, high, log=False, q=None):
+        self.width = 1
+        self.low = low
+        self.high = high
+        self.log = log
+        self.q = q
+
+    def encode(self, value):
+        value = math.log(value) if self.log else value
+        return numpy.clip([(value - self.low) / (self.high - self.low)], 0, 1)
+
+    def decode(self, encoded):
+        value = self.low + float(encoded[0]) * (self.high - self.low)
+        if self.log:
+            value = math.exp(value)
+        if self.q:
+            value = round(value / self.q) * self.q
+        return value
+
+
+def _dimension(parameter):
+    # Same distributions as created by the HyperoptNodeParameterSpace,
+    # unbounded distributions are limited to three standard deviations
+    q = getattr(parameter, "q", None)
+    if isinstance(parameter, ChoiceParameter):
+        return _ChoiceDimension(len(parameter.choices))
+    elif isinstance(parameter, LogNormalParameter):
+        return _ContinuousDimension(math.log(parameter.scale) - 3 * parameter.shape,
+                                    math.log(parameter.scale) + 3 * parameter.shape, log=True, q=q)
+    elif isinstance(parameter, NormalParameter):
+        return _ContinuousDimension(parameter.mu - 3 * parameter.sigma, parameter.mu + 3 * parameter.sigma, q=q)
+    elif isinstance(parameter, QLogUniformParameter):
+        return _ContinuousDimension(math.log(parameter.min - parameter.q / 2.0),
+                                    math.log(parameter.max + parameter.q / 2.0), log=True, q=q)
+    elif isinstance(parameter, LogUniformParameter):
+        return _ContinuousDimension(math.log(parameter.min), math.log(parameter.max), log=True)
+    elif isinstance(parameter, UniformParameter):
+        return _ContinuousDimension(parameter.min, parameter.max, q=q)
+    return None
+
+
+def _matern52(first, second, length_scale):
+    distances = cdist(first, second) * (math.sqrt(5) / length_scale)
+    return (1 + distances + distances ** 2 / 3.0) * numpy.exp(-distances)
+
+
+class GaussianProcess(object):
+    """
+    Bayesian optimization suggesting the parameters maximizing the expected improvement of a Gaussian process.
+
+    All parameters are encoded into the unit hypercube, choices one-hot. The length scale of the Matérn 5/2
+    kernel is selected by the marginal likelihood from a fixed set of length scales. The expected improvement
+    of a large number of random and local candidates is evaluated vectorized. Batches of trials, i.e.
+    several new trials or trials still being evaluated by other workers, are proposed using a constant liar,
+    so parallel workers evaluate different parameters. The first trials are suggested randomly.
+    """
+    LENGTH_SCALES = numpy.logspace(-1.5, 0.5, 9)
+    NOISE = 1e-4
+
+    def __init__(self, pipeline, startup_trials=10, candidates=2000, local_candidates=500):
+        """
+        :param pipeline: The node chain to suggest the parameters of
+        :type pipeline: NodeChainParameterSpace
+        :param startup_trials: The number of trials to suggest randomly before modelling the losses
+        :type startup_trials: int
+        :param candidates: The number of random candidates to evaluate the acquisition function for
+        :type candidates: int
+        :param local_candidates: The number of candidates close to the best observations
+        :type local_candidates: int
+        :rtype: GaussianProcess
+        """
+        self.__dimensions = {}
+        for node in pipeline.nodes:
+            for name, parameter in NodeParameterSpace.parameter_space(node).items():
+                dimension = _dimension(parameter)
+                if dimension is not None:
+                    self.__dimensions[name] = dimension
+        self.__names = sorted(self.__dimensions.keys())
+        self.__startup_trials = startup_trials
+        self.__candidates = candidates
+        self.__local_candidates = local_candidates
+
+    def __encode(self, vals):
+        encoded = []
+        for name in self.__names:
+            values = vals.get(name, [])
+            if len(values) != 1:
+                return None
+            encoded.append(self.__dimensions[name].encode(values[0]))
+        return numpy.concatenate(encoded) if encoded else numpy.zeros(0)
+
+    def __decode(self, encoded):
+        vals = {}
+        offset = 0
+        for name in self.__names:
+            dimension = self.__dimensions[name]
+            vals[name] = dimension.decode(encoded[offset:offset + dimension.width])
+            offset += dimension.width
+        return vals
+
+    def __observations(self, trials):
+        # The encoded parameters and losses of the evaluated trials and the parameters of the running trials
+        points, losses, pending = [], [], []
+        for trial in trials:
+            encoded = self.__encode(trial["misc"]["vals"])
+            if encoded is None:
+                continue
+            if trial["state"] == JOB_STATE_DONE:
+                if "loss" in trial["result"]:
+                    points.append(encoded)
+                    losses.append(trial["result"]["loss"])
+            elif trial["state"] in (base.JOB_STATE_NEW, base.JOB_STATE_RUNNING):
+                pending.append(encoded)
+        return points, losses, pending
+
+    @staticmethod
+    def __fit(points, targets, length_scale):
+        covariance = _matern52(points, points, length_scale) + GaussianProcess.NOISE * numpy.eye(len(points))
+        factor = cho_factor(covariance, lower=True)
+        alpha = cho_solve(factor, targets)
+        log_likelihood = -0.5 * numpy.dot(targets, alpha) - numpy.sum(numpy.log(numpy.diag(factor[0])))
+        return factor, alpha, log_likelihood
+
+    def __candidates_around(self, points, best, random):
+        width = points.shape[1]
+        samples = random.uniform(size=(self.__candidates, width))
+        local = points[best] + random.normal(scale=0.05, size=(self.__local_candidates, width))
+        return numpy.vstack([samples, numpy.clip(local, 0, 1)])
+
+    def __propose(self, points, targets, length_scale, random):
+        factor, alpha, _ = self.__fit(points, targets, length_scale)
+        best = int(numpy.argmin(targets))
+        candidates = self.__candidates_around(points, best, random)
+        cross = _matern52(candidates, points, length_scale)
+        mean = numpy.dot(cross, alpha)
+        v = solve_triangular(factor[0], cross.T, lower=True)
+        deviation = numpy.sqrt(numpy.maximum(1 + self.NOISE - numpy.sum(v ** 2, axis=0), 1e-12))
+        improvement = targets[best] - mean
+        expected_improvement = improvement * norm.cdf(improvement / deviation) + \
+            deviation * norm.pdf(improvement / deviation)
+        return candidates[numpy.argmax(expected_improvement)]
+
+    def suggest(self, new_ids, domain, trials, seed):
+        """
+        Suggests new trials. Same signature as the suggestion algorithms of hyperopt.
+        """
+        # The random suggestion creates valid documents for all parameters of the domain
+        new_trials = rand.suggest(new_ids, domain, trials, seed)
+        if new_trials is base.StopExperiment or not self.__names:
+            return new_trials
+        points, losses, pending = self.__observations(trials.trials)
+        losses = numpy.asarray(losses, dtype=numpy.float64)
+        finite = numpy.isfinite(losses)
+        if numpy.count_nonzero(finite) < max(self.__startup_trials, 2):
+            return new_trials
+        # Failed evaluations get the worst loss
+        losses = numpy.where(finite, losses, losses[finite].max())
+        targets = (losses - losses.mean()) / (losses.std() or 1.0)
+        points = numpy.asarray(points)
+        # Select the length scale with the highest marginal likelihood
+        length_scale = max(self.LENGTH_SCALES, key=lambda scale: self.__fit(points, targets, scale)[2])
+        # The trials evaluated by other workers and the new trials pretend to have the best loss (constant liar)
+        liar = targets.min()
+        if pending:
+            points = numpy.vstack([points, pending])
+            targets = numpy.append(targets, numpy.repeat(liar, len(pending)))
+        random = numpy.random.RandomState(seed)
+        for trial in new_trials:
+            proposal = self.__propose(points, targets, length_scale, random)
+            trial["misc"]["vals"].update({name: [value] for name, value in self.__decode(proposal).items()
+                                          if trial["misc"]["vals"].get(name)})
+            points = numpy.vstack([points, proposal])
+            targets = numpy.append(targets, liar)
+        return new_trials
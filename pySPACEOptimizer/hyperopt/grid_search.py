@@ -0,0 +1,112 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import itertools
+import math
+
+from hyperopt import base
+
+from pySPACE.missions.nodes.decorators import ChoiceParameter, QUniformParameter, QLogUniformParameter, \
+    UniformParameter, NormalParameter
+from pySPACEOptimizer.framework.node_parameter_space import NodeParameterSpace
+
+
+def _quantized_values(parameter):
+    # All multiples of q between the minimum and the maximum, same as hyperopt's quantized distributions
+    first = int(math.ceil(parameter.min / float(parameter.q) - 1e-9))
+    last = int(math.floor(parameter.max / float(parameter.q) + 1e-9))
+    return [index * parameter.q for index in range(first, last + 1)]
+
+
+def parameter_grid(pipeline):
+    """
+    Returns every value of every parameter of the `pipeline` as used by hyperopt, i.e. the index of a choice
+    and the value of a quantized uniform distribution. Parameters drawn from continuous or unbounded
+    distributions can't be enumerated.
+
+    :param pipeline: The node chain to enumerate the parameter space of
+    :type pipeline: NodeChainParameterSpace
+    :return: The values of every parameter or None if the parameter space is not finite
+    :rtype: dict[str, list[object]] | None
+    """
+    grid = {}
+    for node in pipeline.nodes:
+        for name, parameter in NodeParameterSpace.parameter_space(node).items():
+            if isinstance(parameter, ChoiceParameter):
+                grid[name] = range(len(parameter.choices))
+            elif isinstance(parameter, (QUniformParameter, QLogUniformParameter)):
+                grid[name] = _quantized_values(parameter)
+            elif isinstance(parameter, (UniformParameter, NormalParameter)):
+                return None
+    return grid
+
+
+def cardinality(grid):
+    """
+    Returns the number of configurations of the parameter `grid`.
+
+    :param grid: The values of every parameter as returned by `parameter_grid`
+    :type grid: dict[str, list[object]] | None
+    :return: The number of configurations or infinity if the parameter space is not finite
+    :rtype: int | float
+    """
+    if grid is None:
+        return float("inf")
+    configurations = 1
+    for values in grid.values():
+        configurations *= len(values)
+    return configurations
+
+
+class GridSearch(object):
+    """
+    Suggestion algorithm evaluating every configuration of a finite parameter space exactly once.
+
+    The configurations not yet suggested are determined from the trials, so the grid search can
+    be resumed and suggests independent trials, which can be evaluated in parallel. As soon as
+    every configuration has been suggested, the experiment is stopped.
+    """
+
+    def __init__(self, grid):
+        """
+        :param grid: The values of every parameter as returned by `parameter_grid`
+        :type grid: dict[str, list[object]]
+        :return: A new grid search over all configurations of the grid
+        :rtype: GridSearch
+        """
+        self.__names = sorted(grid.keys())
+        self.__grid = grid
+
+    @staticmethod
+    def __key(vals):
+        return tuple(sorted((name, values[0]) for name, values in vals.items() if values))
+
+    def __configurations(self, names):
+        for values in itertools.product(*[self.__grid[name] for name in names]):
+            yield dict(zip(names, values))
+
+    # noinspection PyUnusedLocal
+    def suggest(self, new_ids, domain, trials, seed):
+        """
+        Suggests the next configurations of the grid, which haven't been suggested before.
+        Same signature as the suggestion algorithms of hyperopt.
+
+        :return: The documents of the new trials or `StopExperiment` if all configurations have been suggested
+        :rtype: list[dict] | object
+        """
+        names = [name for name in self.__names if name in domain.params]
+        suggested = set(self.__key(trial["misc"]["vals"]) for trial in trials.trials)
+        new_trials = []
+        new_ids = list(new_ids)
+        for configuration in self.__configurations(names):
+            if not new_ids:
+                break
+            if self.__key({name: [value] for name, value in configuration.items()}) in suggested:
+                continue
+            new_id = new_ids.pop(0)
+            misc = {"tid": new_id, "cmd": domain.cmd, "workdir": domain.workdir,
+                    "idxs": {name: [new_id] for name in names},
+                    "vals": {name: [value] for name, value in configuration.items()}}
+            new_trials.extend(trials.new_trial_docs([new_id], [None], [domain.new_result()], [misc]))
+        if not new_trials:
+            return base.StopExperiment
+        return new_trials
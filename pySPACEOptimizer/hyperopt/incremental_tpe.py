@@ -0,0 +1,213 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import math
+
+import numpy
+from hyperopt import base, rand, STATUS_OK, JOB_STATE_DONE
+
+from pySPACE.missions.nodes.decorators import ChoiceParameter, LogNormalParameter, NormalParameter, \
+    QLogNormalParameter, QNormalParameter, LogUniformParameter, QLogUniformParameter, QUniformParameter, \
+    UniformParameter
+from pySPACEOptimizer.framework.node_parameter_space import NodeParameterSpace
+
+
+class _Observations(object):
+    # Growing buffer of the observed values of a parameter, amortized O(1) per observation
+
+    def __init__(self):
+        self.__values = numpy.empty(64, dtype=numpy.float64)
+        self.__size = 0
+
+    def append(self, value):
+        if self.__size == len(self.__values):
+            self.__values = numpy.resize(self.__values, 2 * len(self.__values))
+        self.__values[self.__size] = value
+        self.__size += 1
+
+    @property
+    def values(self):
+        return self.__values[:self.__size]
+
+
+class _CategoricalModel(object):
+
+    def __init__(self, choices):
+        self.choices = choices
+
+    # noinspection PyUnusedLocal
+    def transform(self, value):
+        return value
+
+    def suggest(self, good, bad, prior_weight, candidates, random):
+        prior = prior_weight / float(self.choices)
+        good_probabilities = numpy.bincount(good.astype(numpy.int64), minlength=self.choices) + prior
+        bad_probabilities = numpy.bincount(bad.astype(numpy.int64), minlength=self.choices) + prior
+        good_probabilities /= good_probabilities.sum()
+        bad_probabilities /= bad_probabilities.sum()
+        samples = random.choice(self.choices, size=candidates, p=good_probabilities)
+        scores = numpy.log(good_probabilities[samples]) - numpy.log(bad_probabilities[samples])
+        return int(samples[numpy.argmax(scores)])
+
+
+class _NumericModel(object):
+
+    def __init__(self, mu, sigma, low=None, high=None, log=False, q=None):
+        # The prior and the bounds in the transformed (log) space
+        self.mu = mu
+        self.sigma = sigma
+        self.low = low
+        self.high = high
+        self.log = log
+        self.q = q
+
+    def transform(self, value):
+        return math.log(value) if self.log else value
+
+    def __parzen(self, observations, prior_weight):
+        # Gaussian kernels at the observations and the prior, same as the adaptive Parzen estimator of hyperopt,
+        # the bandwidth of a kernel is the larger distance to it's neighbours
+        mus = numpy.append(observations, self.mu)
+        weights = numpy.append(numpy.ones(len(observations)), prior_weight)
+        order = numpy.argsort(mus)
+        mus, weights = mus[order], weights[order]
+        if len(mus) > 1:
+            distances = numpy.diff(mus)
+            sigmas = numpy.maximum(numpy.append(distances[0], distances), numpy.append(distances, distances[-1]))
+        else:
+            sigmas = numpy.array([self.sigma])
+        sigmas = numpy.clip(sigmas, self.sigma / min(100.0, len(mus)), self.sigma)
+        # The prior keeps it's own width
+        sigmas[numpy.flatnonzero(order == len(observations))] = self.sigma
+        return mus, sigmas, weights / weights.sum()
+
+    @staticmethod
+    def __log_density(samples, mus, sigmas, weights):
+        densities = numpy.exp(-0.5 * ((samples[:, None] - mus[None, :]) / sigmas[None, :]) ** 2) / \
+            (math.sqrt(2 * math.pi) * sigmas[None, :])
+        return numpy.log(numpy.dot(densities, weights) + 1e-300)
+
+    def suggest(self, good, bad, prior_weight, candidates, random):
+        good_mus, good_sigmas, good_weights = self.__parzen(good, prior_weight)
+        bad_mus, bad_sigmas, bad_weights = self.__parzen(bad, prior_weight)
+        components = random.choice(len(good_mus), size=candidates, p=good_weights)
+        samples = random.normal(good_mus[components], good_sigmas[components])
+        if self.low is not None:
+            samples = numpy.clip(samples, self.low, self.high)
+        scores = self.__log_density(samples, good_mus, good_sigmas, good_weights) - \
+            self.__log_density(samples, bad_mus, bad_sigmas, bad_weights)
+        value = float(samples[numpy.argmax(scores)])
+        if self.log:
+            value = math.exp(value)
+        if self.q:
+            value = round(value / self.q) * self.q
+        return value
+
+
+def _model(parameter):
+    # Same distributions as created by the HyperoptNodeParameterSpace
+    q = getattr(parameter, "q", None)
+    if isinstance(parameter, ChoiceParameter):
+        return _CategoricalModel(len(parameter.choices))
+    elif isinstance(parameter, (LogNormalParameter, QLogNormalParameter)):
+        return _NumericModel(math.log(parameter.scale), parameter.shape, log=True, q=q)
+    elif isinstance(parameter, (NormalParameter, QNormalParameter)):
+        return _NumericModel(parameter.mu, parameter.sigma, q=q)
+    elif isinstance(parameter, QLogUniformParameter):
+        low, high = math.log(parameter.min - parameter.q / 2.0), math.log(parameter.max + parameter.q / 2.0)
+        return _NumericModel((low + high) / 2.0, high - low, low=low, high=high, log=True, q=q)
+    elif isinstance(parameter, LogUniformParameter):
+        low, high = math.log(parameter.min), math.log(parameter.max)
+        return _NumericModel((low + high) / 2.0, high - low, low=low, high=high, log=True)
+    elif isinstance(parameter, (UniformParameter, QUniformParameter)):
+        return _NumericModel((parameter.min + parameter.max) / 2.0, parameter.max - parameter.min,
+                             low=parameter.min, high=parameter.max, q=q)
+    return None
+
+
+class IncrementalTPE(object):
+    """
+    Tree-structured Parzen estimator keeping the observations of every parameter between suggestions.
+
+    `tpe.suggest` of hyperopt rebuilds it's estimators from the whole history of trials for every
+    suggestion. Instead, this algorithm adds only the trials evaluated since the last suggestion to
+    growing arrays of observed values and losses. The split into good and bad observations and the
+    Parzen estimators are computed vectorized on these arrays. The first trials are suggested randomly.
+    """
+
+    def __init__(self, pipeline, startup_trials=20, gamma=0.25, candidates=24, prior_weight=1.0):
+        """
+        :param pipeline: The node chain to suggest the parameters of
+        :type pipeline: NodeChainParameterSpace
+        :param startup_trials: The number of trials to suggest randomly before modelling the losses
+        :type startup_trials: int
+        :param gamma: The factor of the square root of the observations used as good observations
+        :type gamma: float
+        :param candidates: The number of candidates drawn from the good estimator for each parameter
+        :type candidates: int
+        :param prior_weight: The weight of the prior in the estimators
+        :type prior_weight: float
+        :rtype: IncrementalTPE
+        """
+        self.__models = {}
+        for node in pipeline.nodes:
+            for name, parameter in NodeParameterSpace.parameter_space(node).items():
+                model = _model(parameter)
+                if model is not None:
+                    self.__models[name] = model
+        self.__startup_trials = startup_trials
+        self.__gamma = gamma
+        self.__candidates = candidates
+        self.__prior_weight = prior_weight
+        self.__observed = set()
+        self.__losses = _Observations()
+        self.__values = {name: _Observations() for name in self.__models}
+
+    @property
+    def observations(self):
+        return len(self.__losses.values)
+
+    def observe(self, trials):
+        """
+        Adds the successful trials, which have not been observed before, to the observations.
+
+        :param trials: The trials documents of the node chain
+        :type trials: list[dict]
+        """
+        for trial in trials:
+            if trial["tid"] in self.__observed or trial["state"] != JOB_STATE_DONE:
+                continue
+            self.__observed.add(trial["tid"])
+            result = trial["result"]
+            if result.get("status", None) != STATUS_OK or not numpy.isfinite(result.get("loss", float("inf"))):
+                continue
+            self.__losses.append(result["loss"])
+            vals = trial["misc"]["vals"]
+            for name, model in self.__models.items():
+                values = vals.get(name, [])
+                # Parameters not used by a trial are marked as missing
+                self.__values[name].append(model.transform(values[0]) if len(values) == 1 else numpy.nan)
+
+    def suggest(self, new_ids, domain, trials, seed):
+        """
+        Suggests new trials. Same signature as the suggestion algorithms of hyperopt.
+        """
+        self.observe(trials.trials)
+        # The random suggestion creates valid documents for all parameters of the domain
+        new_trials = rand.suggest(new_ids, domain, trials, seed)
+        if new_trials is base.StopExperiment or self.observations < max(self.__startup_trials, 2):
+            return new_trials
+        random = numpy.random.RandomState(seed)
+        losses = self.__losses.values
+        below = int(math.ceil(self.__gamma * math.sqrt(len(losses))))
+        good = numpy.zeros(len(losses), dtype=bool)
+        good[numpy.argpartition(losses, below - 1)[:below]] = True
+        for trial in new_trials:
+            vals = trial["misc"]["vals"]
+            for name, model in self.__models.items():
+                if not vals.get(name):
+                    continue
+                values = self.__values[name].values
+                used = ~numpy.isnan(values)
+                vals[name] = [model.suggest(values[used & good], values[used & ~good], self.__prior_weight,
+                                            self.__candidates, random)]
+        return new_trials
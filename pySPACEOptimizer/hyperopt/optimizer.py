@@ -6,83 +6,466 @@ import os
 import shutil
 import time
 import warnings
+from multiprocessing.util import Finalize
 
 import pySPACE
-from hyperopt import STATUS_OK, tpe, STATUS_FAIL
-from pySPACE.resources.dataset_defs.performance_result import PerformanceResultSummary
+from hyperopt import STATUS_OK, tpe, rand, STATUS_FAIL
 from pySPACE.tools.progressbar import ProgressBar, Percentage, Bar
 
-from pySPACEOptimizer.core.optimizer_pool import OptimizerPool
+from pySPACEOptimizer.core.broker import BrokerPool, parse_address
+from pySPACEOptimizer.core.cv_splits import CrossValidationSplits
+from pySPACEOptimizer.core.in_process_evaluator import InProcessEvaluator, InProcessNotSupported
+from pySPACEOptimizer.core.parameter_memo import ParameterMemo
+from pySPACEOptimizer.core.racing import Race
+from pySPACEOptimizer.core.resources import MEGABYTE, current_rss, peak_rss
+from pySPACEOptimizer.core.result_cleaner import ResultCleaner
+from pySPACEOptimizer.core.result_reader import read_metrics
 from pySPACEOptimizer.framework.base_optimizer import PySPACEOptimizer
 from pySPACEOptimizer.framework.base_task import is_sink_node, is_source_node
+from pySPACEOptimizer.hyperopt.gaussian_process import GaussianProcess
+from pySPACEOptimizer.hyperopt.grid_search import GridSearch, cardinality, parameter_grid
 from pySPACEOptimizer.hyperopt.hyperopt_node_parameter_space import HyperoptNodeParameterSpace, \
     HyperoptSourceNodeParameterSpace, HyperoptSinkNodeParameterSpace
+from pySPACEOptimizer.hyperopt.incremental_tpe import IncrementalTPE
+from pySPACEOptimizer.hyperopt.parameter_freezing import ParameterFreezing
 from pySPACEOptimizer.hyperopt.persistent_trials import PersistentTrials
-from pySPACEOptimizer.utils import output_logger, FileLikeLogger
+from pySPACEOptimizer.utils import output_logger, FileLikeLogger, time_limit, TimeLimitExceeded
 
 BACKEND = None
+BACKEND_TYPE = None
+RACE = None
+EARLY_STOPPING = None
+TIME_BUDGET = None
+CLEANER = None
+EVALUATOR = None
+# The ids of the node chains, which can't be evaluated in process
+OPERATION_CHAINS = set()
 
+# Seconds to wait before asking the resource planner again to start a node chain
+ADMISSION_INTERVAL = 1
 
-# noinspection PyBroadException
-def __minimize(spec):
-    pipeline, parameter_setting = spec
+# The suggestion algorithms, which can be selected by name in the task
+SUGGESTION_ALGORITHMS = {
+    "tpe": tpe.suggest,
+    "random": rand.suggest,
+}
+# The suggestion algorithms keeping a model of every node chain, created for each node chain
+CHAIN_SUGGESTION_ALGORITHMS = {
+    "incremental_tpe": IncrementalTPE,
+    "gaussian_process": GaussianProcess,
+}
+
+
+def _time_objectives(task, summary, execution_time):
+    """
+    Calculates the time objectives of a multi-objective task from the result `summary`.
+    Every time metric is averaged over all data sets. If a time metric is not contained
+    in the summary, the measured wall clock time of the whole execution is used instead.
+    """
+    objectives = {}
+    for objective, metric in task["time_metrics"].items():
+        if summary is not None and metric in summary:
+            objectives[objective] = float(numpy.mean(numpy.asarray(summary[metric], dtype=numpy.float)))
+        else:
+            objectives[objective] = float(execution_time)
+    return objectives
+
+
+def _create_backend(backend, processes=None):
+    """
+    Creates the pySPACE `backend`, where a multicore backend uses the given number of `processes`.
+    """
+    if backend == "mcore" and processes is not None:
+        return pySPACE.create_backend(backend, pool_size=processes)
+    return pySPACE.create_backend(backend)
+
+
+def parameter_memo(task):
+    """
+    Returns a new memo answering the parameter settings of a node chain, which have already been evaluated,
+    or None if every suggested setting should be evaluated.
+
+    :rtype: ParameterMemo | None
+    """
+    if not task["memoize_trials"]:
+        return None
+    return ParameterMemo(resamples=task["memo_resamples"])
+
+
+def suggestion_algorithm(task, pipeline, default="tpe"):
+    """
+    Returns the algorithm suggesting the trials of the `pipeline`. If the parameter space of the node chain
+    has fewer configurations than evaluations, all configurations are evaluated instead. Otherwise
+    unimportant parameters may be frozen during the optimization.
+
+    :param default: The name of the algorithm to use if the task doesn't name one
+    :type default: str
+    :rtype: function
+    """
+    if task["grid_search"]:
+        grid = parameter_grid(pipeline)
+        configurations = cardinality(grid)
+        if configurations <= task["evaluations_per_pass"] * task["passes"]:
+            pipeline.logger.info("Parameter space has only %d configurations. Evaluating all of them" %
+                                 configurations)
+            return GridSearch(grid).suggest
+    algorithm = task["suggestion_algorithm"] if task["suggestion_algorithm"] else default
+    if algorithm in CHAIN_SUGGESTION_ALGORITHMS:
+        algorithm = CHAIN_SUGGESTION_ALGORITHMS[algorithm](pipeline).suggest
+    elif algorithm in SUGGESTION_ALGORITHMS:
+        algorithm = SUGGESTION_ALGORITHMS[algorithm]
+    elif not callable(algorithm):
+        raise ValueError("Unknown suggestion algorithm '{algorithm}'".format(algorithm=algorithm))
+    if task["freeze_parameters"]:
+        return ParameterFreezing(algorithm, logger=pipeline.logger, min_trials=task["freeze_min_trials"],
+                                 interval=task["freeze_interval"], threshold=task["freeze_threshold"]).suggest
+    return algorithm
+
+
+def _remove_scratch_dir(scratch_result_dir):
+    # Remove the scratch dir of this process and the scratch dir of the run as soon as it's empty
+    shutil.rmtree(scratch_result_dir, ignore_errors=True)
+    try:
+        os.rmdir(os.path.dirname(scratch_result_dir))
+    except OSError:
+        # Still used by other workers
+        pass
+
+
+def _result_cleaner(task):
+    """
+    Returns the cleaner removing the result dirs of this process, the background threads of a
+    cleaner created before forking the process don't exist in the forked process.
+    The trash of the cleaner is in the scratch dir, so moving a result dir to it stays on the same file system.
+
+    :rtype: ResultCleaner
+    """
+    global CLEANER
+    if CLEANER is None or CLEANER.pid != os.getpid():
+        CLEANER = ResultCleaner(task.scratch_result_dir, threads=task["cleanup_threads"])
+        if task["scratch_dir"] is not None:
+            # The optimizer only removes the scratch dir on it's own host, e.g. not the ones of the broker workers
+            Finalize(None, _remove_scratch_dir, args=(task.scratch_result_dir,), exitpriority=0)
+    return CLEANER
+
+
+def _loss(task, summary):
+    # Calculate the mean of all data sets using the given metric
+    values = numpy.asarray(summary[task["metric"]], dtype=numpy.float)
+    if not numpy.all(numpy.isfinite(values)):
+        # e.g. empty cells or text, the evaluation has failed
+        raise ValueError("Metric '{metric}' contains values, which aren't numbers: {values}".format(
+            metric=task["metric"], values=values))
+    mean = numpy.mean(values)
+    return float(-1 * mean if "is_performance_metric" in task and task["is_performance_metric"] else mean)
+
+
+def _evaluator(task):
+    """
+    Returns the evaluator of this process evaluating node chains in process.
+
+    :rtype: InProcessEvaluator
+    """
+    global EVALUATOR
+    if EVALUATOR is None:
+        splits = CrossValidationSplits(task.base_result_dir, splits=task["cv_splits"], seed=task["cv_seed"]) \
+            if task["cv_splits"] is not None else None
+        EVALUATOR = InProcessEvaluator(splits=splits)
+    return EVALUATOR
+
+
+def preload_data_sets(task):
+    """
+    Loads the data sets of the `task` into the evaluator of this process. Workers forked afterwards
+    inherit the loaded data sets copy-on-write, so the memory used by the data sets doesn't grow with
+    the number of workers.
+
+    :return: The number of data sets loaded
+    :rtype: int
+    """
+    return _evaluator(task).preload(task["data_set_path"])
+
+
+def _execute_in_process(pipeline, parameter_setting, input_path=None):
+    """
+    Evaluates the `pipeline` with the given `parameter_setting` inside of this process
+    and returns the values of all metrics without writing any results.
+
+    :return: A tuple of the values of all metrics, or None if no results have been created, and the execution time
+    :rtype: (dict[str, list[object]], float)
+    """
     task = pipeline.configuration
+    evaluator = _evaluator(task)
+    start_time = time.time()
     with output_logger(std_out_logger=None, std_err_logger=pipeline.error_logger):
-        operation = pipeline.create_operation(parameter_settings=[parameter_setting])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            summary = evaluator.evaluate(pipeline.node_chain(parameter_setting),
+                                         input_path if input_path is not None else task["data_set_path"])
+    execution_time = time.time() - start_time
+    if not summary:
+        return None, execution_time
+    if task["metric"] not in summary:
+        raise ValueError("Metric '{metric}' not found in result data set".format(metric=task["metric"]))
+    return summary, execution_time
+
+
+def _execute(pipeline, parameter_setting, input_path=None, result_paths=None):
+    """
+    Executes the `pipeline` with the given `parameter_setting` and returns the summary of the results.
+    The result dir of the execution is removed in the background afterwards.
+
+    :param pipeline: The node chain to execute
+    :type pipeline: NodeChainParameterSpace
+    :param parameter_setting: The values of the parameters to execute the node chain with
+    :type parameter_setting: dict[str, object]
+    :param input_path: The input path to process instead of the input path of the task
+    :type input_path: str
+    :param result_paths: A list to add the result dir to instead of removing it, the caller has to remove it
+    :type result_paths: list[str]
+    :return: A tuple of the values of the metrics needed by the task, or None if no results have been created,
+             and the execution time
+    :rtype: (dict[str, numpy.ndarray] | dict[str, list[object]], float)
+    """
+    task = pipeline.configuration
+    if task["in_process"] and pipeline.chain_id not in OPERATION_CHAINS:
+        try:
+            return _execute_in_process(pipeline, parameter_setting, input_path=input_path)
+        except InProcessNotSupported as e:
+            pipeline.logger.warn("Node chain can't be evaluated in process, executing it as operation: %s" % e)
+            OPERATION_CHAINS.add(pipeline.chain_id)
+    with output_logger(std_out_logger=None, std_err_logger=pipeline.error_logger):
+        operation = pipeline.create_operation(parameter_settings=[parameter_setting], input_path=input_path)
     result_path = operation.get_output_directory()
     try:
         # Execute the pipeline
         # Log errors from here with special logger
+        start_time = time.time()
         with output_logger(std_out_logger=None, std_err_logger=pipeline.error_logger):
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore")
                 pipeline.execute(backend=BACKEND, operation=operation)
+        execution_time = time.time() - start_time
         # Check the result
-        status = STATUS_OK
         result_file = os.path.join(result_path, "results.csv")
-        if os.path.isfile(result_file):
-            summary = PerformanceResultSummary.from_csv(result_file)
-            # Calculate the mean of all data sets using the given metric
-            if task["metric"] not in summary:
-                raise ValueError("Metric '{metric}' not found in result data set".format(metric=task["metric"]))
-            mean = numpy.mean(numpy.asarray(summary[task["metric"]], dtype=numpy.float))
-            loss = -1 * mean if "is_performance_metric" in task and task["is_performance_metric"] else mean
+        if not os.path.isfile(result_file):
+            return None, execution_time
+        # Read only the columns needed for the loss, instead of the whole result summary
+        metrics = [task["metric"]]
+        if task["multi_objective"]:
+            metrics.extend(task["time_metrics"].values())
+        summary = read_metrics(result_file, metrics)
+        if task["metric"] not in summary:
+            raise ValueError("Metric '{metric}' not found in result data set".format(metric=task["metric"]))
+        return summary, execution_time
+    finally:
+        if result_paths is not None:
+            result_paths.append(result_path)
         else:
+            # Remove the result dir
+            _result_cleaner(task).discard([result_path])
+
+
+def _evaluate(pipeline, parameter_setting, result, result_paths=None):
+    """
+    Evaluates the `pipeline` with the given `parameter_setting`.
+    Additional information about the evaluation is stored in the `result` dictionary,
+    the result dirs of all executions are added to `result_paths`.
+
+    :return: A tuple of the loss, the status and the time objectives of every evaluated fold
+    :rtype: (float, str, list[dict[str, float]])
+    """
+    task = pipeline.configuration
+    # When racing or stopping early, the node chain is executed data set by data set
+    # and stopped as soon as it can't beat the best configuration anymore
+    fold_wise = task["racing"] or task["median_stopping"]
+    input_paths = task.fold_input_paths if fold_wise else [None]
+    fold_losses = []
+    time_objectives = []
+    for input_path in input_paths:
+        summary, execution_time = _execute(pipeline, parameter_setting, input_path=input_path,
+                                           result_paths=result_paths)
+        if summary is None:
             pipeline.logger.info("No results found. Returning inf")
-            loss = float("inf")
-            status = STATUS_FAIL
+            return float("inf"), STATUS_FAIL, time_objectives
+        fold_losses.append(_loss(task, summary))
+        if task["multi_objective"]:
+            time_objectives.append(_time_objectives(task, summary, execution_time))
+        if task["racing"] and RACE is not None and RACE.eliminate(fold_losses):
+            pipeline.logger.debug("Configuration eliminated after %d of %d folds" % (len(fold_losses),
+                                                                                    len(input_paths)))
+            result["eliminated"] = True
+            break
+        if len(fold_losses) < len(input_paths) and EARLY_STOPPING is not None and \
+                EARLY_STOPPING.should_stop(pipeline.chain_id, fold_losses):
+            pipeline.logger.debug("Evaluation stopped after %d of %d folds" % (len(fold_losses),
+                                                                              len(input_paths)))
+            result["stopped"] = True
+            break
+    loss = float(numpy.mean(fold_losses))
+    if fold_wise:
+        result["fold_losses"] = fold_losses
+    if EARLY_STOPPING is not None and len(fold_losses) == len(input_paths):
+        EARLY_STOPPING.complete(pipeline.chain_id, fold_losses)
+    if result.get("eliminated", False):
+        # Report the estimated loss on all folds, which is always
+        # worse than the best loss of this node chain
+        result["partial_loss"] = loss
+        loss = RACE.estimated_loss(fold_losses)
+    elif result.get("stopped", False):
+        # Report the estimated loss on all folds, which is always worse than the median
+        # of this node chain, instead of the mean of the first folds
+        result["partial_loss"] = loss
+        loss = EARLY_STOPPING.estimated_loss(pipeline.chain_id, fold_losses)
+    return loss, STATUS_OK, time_objectives
+
+
+# noinspection PyBroadException
+def __minimize(spec):
+    global BACKEND, BACKEND_TYPE
+    pipeline, parameter_setting = spec
+    task = pipeline.configuration
+    result = {}
+    time_objectives = []
+    result_paths = []
+    # When the budget runs out, running evaluations are cancelled depending on the policy
+    if TIME_BUDGET is not None and task["time_budget_policy"] == "cancel":
+        seconds = TIME_BUDGET.remaining()
+    else:
+        seconds = None
+    try:
+        with time_limit(seconds):
+            loss, status, time_objectives = _evaluate(pipeline, parameter_setting, result, result_paths)
+    except TimeLimitExceeded:
+        pipeline.logger.info("Time budget expired. Evaluation cancelled")
+        # The interrupted backend may still be running the evaluation, so the next evaluation creates a new one
+        BACKEND = None
+        BACKEND_TYPE = None
+        result["cancelled"] = True
+        loss = float("inf")
+        status = STATUS_FAIL
     except Exception:
         pipeline.error_logger.exception("Error minimizing the pipeline:")
         loss = float("inf")
         status = STATUS_FAIL
-    finally:
-        # Remove the result dir
-        try:
-            shutil.rmtree(result_path)
-        except OSError as e:
-            pipeline.logger.warn("Error while trying to delete the result dir: {error}".format(error=e.message))
+    # Remove the result dirs in the background, the outputs of the best complete evaluations may be kept
+    complete = status == STATUS_OK and not result.get("stopped", False) and not result.get("eliminated", False)
+    _result_cleaner(task).discard(result_paths, archive_dir=os.path.join(pipeline.base_result_dir, "best_outputs"),
+                                  loss=loss if complete else None, keep=task["keep_best_outputs"])
 
-    # noinspection PyUnboundLocalVariable
-    return {
+    result.update({
         "loss": loss,
         "status": status,
-    }
+    })
+    if task["multi_objective"]:
+        if status == STATUS_OK:
+            result.update({objective: float(numpy.mean([objectives[objective] for objectives in time_objectives]))
+                           for objective in task["time_metrics"]})
+        else:
+            result.update({objective: float("inf") for objective in task["time_metrics"]})
+    return result
 
 
-def optimize_pipeline(task, pipeline, backend, queue):
-    # Create the pipeline that should be optimized
+def evaluate_parameters(pipeline, parameter_setting, backend, best_losses=None, early_stopping=None,
+                        time_budget=None):
+    """
+    Evaluates a single `parameter_setting` of the `pipeline` for the trial scheduler.
+    The worker doesn't keep any state of the node chain, instead the scheduler passes
+    the losses of the best configuration for racing and the shared services with every evaluation.
+
+    :param best_losses: The losses per fold of the best configuration of the node chain or None if not racing
+    :type best_losses: list[float] | None
+    :return: The result of the evaluation and it's wall clock duration
+    :rtype: (dict[str, object], float)
+    """
+    global BACKEND, BACKEND_TYPE, RACE, EARLY_STOPPING, TIME_BUDGET
+    task = pipeline.configuration
+    if BACKEND is None or BACKEND_TYPE != backend:
+        with output_logger(std_out_logger=None, std_err_logger=pipeline.error_logger):
+            BACKEND = _create_backend(backend)
+        BACKEND_TYPE = backend
+    EARLY_STOPPING = early_stopping
+    TIME_BUDGET = time_budget
+    if best_losses is not None:
+        RACE = Race(alpha=task["racing_alpha"], min_folds=task["racing_min_folds"])
+        RACE.observe({"status": STATUS_OK, "fold_losses": best_losses})
+    else:
+        RACE = None
+    start_time = time.time()
+    result = __minimize((pipeline, parameter_setting))
+    return result, time.time() - start_time
+
+
+# noinspection PyBroadException
+def smoke_test_pipeline(task, pipeline, backend):
+    """
+    Executes the `pipeline` once with it's default parameters on the first data set of the input.
+
+    :return: Whether the execution created results containing the metric of the task
+    :rtype: bool
+    """
     global BACKEND
-    with output_logger(std_out_logger=None, std_err_logger=pipeline.error_logger):
-        BACKEND = pySPACE.create_backend(backend)
+    try:
+        with output_logger(std_out_logger=None, std_err_logger=pipeline.error_logger):
+            BACKEND = pySPACE.create_backend(backend)
+        summary, _ = _execute(pipeline, pipeline.default_setting(), input_path=task.fold_input_paths[0])
+        if summary is None:
+            pipeline.logger.warn("Smoke test did not create any results")
+            return False
+        return True
+    except Exception:
+        pipeline.error_logger.exception("Error during the smoke test of the pipeline:")
+        return False
+
 
-    # Get the suggestion algorithm for the trials
-    suggestion_algorithm = task["suggestion_algorithm"] if task["suggestion_algorithm"] else tpe.suggest
+def _skip_evaluations(queue, pipeline, first_id, last_id):
+    # Put a skipped evaluation to the queue for every remaining evaluation
+    for id_ in range(first_id, last_id):
+        queue.put((id_, float("inf"), pipeline, None, None))
+
+
+def optimize_pipeline(task, pipeline, backend, queue, early_stopping=None, failure_registry=None, time_budget=None,
+                      resource_planner=None, cancelled=None, default_algorithm="tpe"):
+    # Create the pipeline that should be optimized
+    global BACKEND, RACE, EARLY_STOPPING, TIME_BUDGET
+    EARLY_STOPPING = early_stopping
+    TIME_BUDGET = time_budget
 
     # Get the number of evaluations to do in one pass
     evaluations = task["evaluations_per_pass"]
     passes = task["passes"]
     max_loss = task["max_loss"]
     check_after = task["check_after"]
+    max_memory = task["max_worker_memory"] * MEGABYTE if task["max_worker_memory"] else None
+    # The planner only controls the backend if the parallelism is sized automatically
+    sized_backend = resource_planner is not None and task["max_parallel_pipelines"] == "auto"
+
+    chain_id = pipeline.chain_id
+    node_names = [node.name for node in pipeline.nodes]
+    if failure_registry is not None and failure_registry.is_pruned(chain_id, node_names):
+        pipeline.logger.warn("Node chain contains blacklisted nodes %s. Skipping" %
+                             [node for node in node_names if node in failure_registry.blacklisted_nodes()])
+        _skip_evaluations(queue, pipeline, 0, evaluations * passes)
+        return
+    if cancelled is not None and cancelled.is_set():
+        pipeline.logger.warn("Optimization has been cancelled before the node chain has been started. Skipping")
+        _skip_evaluations(queue, pipeline, 0, evaluations * passes)
+        return
+    if resource_planner is not None:
+        # Wait until there are enough cores and memory left to start the node chain
+        while not resource_planner.start_chain(chain_id):
+            time.sleep(ADMISSION_INTERVAL)
+    processes = resource_planner.backend_processes(chain_id) if sized_backend else None
+    if time_budget is not None and not time_budget.start_chain(chain_id):
+        pipeline.logger.warn("Time budget expired before the node chain has been started. Skipping")
+        time_budget.finish_chain(chain_id)
+        if resource_planner is not None:
+            resource_planner.finish_chain(chain_id)
+        _skip_evaluations(queue, pipeline, 0, evaluations * passes)
+        return
+
+    with output_logger(std_out_logger=None, std_err_logger=pipeline.error_logger):
+        BACKEND = _create_backend(backend, processes)
 
     # noinspection PyBroadException
     try:
@@ -90,15 +473,25 @@ def optimize_pipeline(task, pipeline, backend, queue):
         trials = PersistentTrials(trials_dir=pipeline.base_result_dir, fn=__minimize,
                                   space=(pipeline, pipeline.pipeline_space),
                                   recreate=task.get("restart_evaluation", False),
-                                  rseed=int(time.time()))
+                                  rseed=int(time.time()), memo=parameter_memo(task))
         # Store the pipeline as an attachment to the trials
         trials.attachments["pipeline"] = pipeline
 
+        if task["racing"]:
+            # Restore the race from the already evaluated trials
+            RACE = Race(alpha=task["racing_alpha"], min_folds=task["racing_min_folds"])
+            for trial in trials:
+                RACE.observe(trial.result)
+
         # Log the pipeline
         pipeline.log_pipeline()
 
+        # Get the suggestion algorithm for the trials
+        algorithm = suggestion_algorithm(task, pipeline, default=default_algorithm)
+
         # Do the evaluation
         best_trial = None
+        durations = []
         for pass_ in range(1, passes + 1):
             pipeline.logger.info("-" * 10 + " Optimization pass: %d / %d " % (pass_, passes) + "-" * 10)
             # Create a progress bar
@@ -106,25 +499,91 @@ def optimize_pipeline(task, pipeline, backend, queue):
                                        maxval=evaluations,
                                        fd=FileLikeLogger(logger=pipeline.logger, log_level=logging.INFO))
             pipeline.logger.debug("Minimizing the pipeline")
-            for trial in trials.minimize(algo=suggestion_algorithm, evaluations=evaluations, pass_=pass_):
-                pipeline.logger.debug("Trial: {trial.id} / Loss: {trial.loss}".format(trial=trial))
-                # Put the result into the queue
-                queue.put((trial.id, trial.loss, pipeline, trial.parameters(pipeline)))
-                # Update the progress bar
-                progress_bar.update(progress_bar.currval + 1)
-                if best_trial is None or trial.loss <= best_trial.loss:
-                    best_trial = trial
-            if evaluations * pass_ >= check_after and best_trial.loss >= max_loss:
+            evaluated = 0
+            stop_reason = None
+            if cancelled is not None and cancelled.is_set():
+                stop_reason = "Optimization has been cancelled"
+            elif time_budget is not None and not time_budget.may_continue(chain_id, numpy.mean(durations or [0])):
+                stop_reason = "Time budget of the node chain expired"
+            else:
+                start_time = time.time()
+                for trial in trials.minimize(algo=algorithm, evaluations=evaluations, pass_=pass_):
+                    durations.append(time.time() - start_time)
+                    pipeline.logger.debug("Trial: {trial.id} / Loss: {trial.loss}".format(trial=trial))
+                    if RACE is not None:
+                        RACE.observe(trial.result)
+                    if resource_planner is not None:
+                        resource_planner.observe(peak_rss())
+                    if sized_backend:
+                        # Adjust the backend to the measured memory and the node chains left
+                        new_processes = resource_planner.backend_processes(chain_id)
+                        if new_processes != processes:
+                            processes = new_processes
+                            pipeline.logger.debug("Using %d backend processes" % processes)
+                            BACKEND = None
+                    if BACKEND is None:
+                        # The backend has been resized or the backend of a cancelled evaluation has been abandoned
+                        with output_logger(std_out_logger=None, std_err_logger=pipeline.error_logger):
+                            BACKEND = _create_backend(backend, processes)
+                    # Put the result into the queue
+                    queue.put((trial.id, trial.loss, pipeline, trial.parameters(pipeline), trial.result))
+                    # Update the progress bar
+                    progress_bar.update(progress_bar.currval + 1)
+                    evaluated += 1
+                    # The loss of an evaluation stopped by the median rule is only an intermediate loss
+                    if not trial.result.get("stopped", False) and \
+                            (best_trial is None or trial.loss <= best_trial.loss):
+                        best_trial = trial
+                    # Neither cancelled evaluations nor answers of the memo tell whether the node chain fails
+                    if failure_registry is not None and not trial.result.get("cancelled", False) and \
+                            not trial.result.get("duplicate", False):
+                        blacklisted = failure_registry.record(chain_id, node_names,
+                                                              trial.result.get("status", None) != STATUS_OK)
+                        if blacklisted:
+                            pipeline.logger.warn("Nodes %s failed too often. Blacklisting them" % blacklisted)
+                        if failure_registry.is_pruned(chain_id, node_names):
+                            stop_reason = "Node chain failed too often or contains blacklisted nodes"
+                            break
+                    if cancelled is not None and cancelled.is_set() and evaluated < evaluations:
+                        stop_reason = "Optimization has been cancelled"
+                        break
+                    if time_budget is not None and evaluated < evaluations and \
+                            not time_budget.may_continue(chain_id, numpy.mean(durations)):
+                        stop_reason = "Time budget of the node chain expired"
+                        break
+                    if max_memory is not None and current_rss() > max_memory:
+                        stop_reason = "Worker exceeded the memory limit of %d MB" % task["max_worker_memory"]
+                        break
+                    start_time = time.time()
+                if stop_reason is None and evaluated < evaluations:
+                    # e.g. all configurations of a small parameter space have been evaluated
+                    stop_reason = "Suggestion algorithm doesn't suggest any more trials"
+            if stop_reason is not None:
+                pipeline.logger.warn("%s. Giving up" % stop_reason)
+                # Persist the evaluated trials before giving up
+                trials.refresh()
+                _skip_evaluations(queue, pipeline, evaluations * (pass_ - 1) + evaluated, evaluations * passes)
+                return
+            # Node chains without any complete evaluation, e.g. because all have been stopped, give up as well
+            if evaluations * pass_ >= check_after and (best_trial is None or best_trial.loss >= max_loss):
                 pipeline.logger.warn("No pipeline found with loss better than %s after %s evaluations. Giving up" %
                                      (max_loss, check_after))
-                parameters = best_trial.parameters(pipeline)
+                if best_trial is not None:
+                    loss, parameters = best_trial.loss, best_trial.parameters(pipeline)
+                else:
+                    loss, parameters = float("inf"), None
                 for id_ in range(evaluations * pass_, evaluations * passes):
                     # Put inf loss to queue for every remaining evaluation
-                    queue.put((id_, best_trial.loss, pipeline, parameters))
+                    queue.put((id_, loss, pipeline, parameters, None))
                 # Then return to break the evaluation
                 return
     except:
         pipeline.logger.exception("Error optimizing NodeChainParameterSpace:")
+    finally:
+        if time_budget is not None:
+            time_budget.finish_chain(chain_id)
+        if resource_planner is not None:
+            resource_planner.finish_chain(chain_id)
 
 
 class HyperoptOptimizer(PySPACEOptimizer):
@@ -137,38 +596,121 @@ class HyperoptOptimizer(PySPACEOptimizer):
     samples hyperparamter settings for them and evaluates these to find the best
     performing processing pipeline.
     """
+    # Seconds to wait for a smoke test before checking whether the optimization has been cancelled
+    POLL_INTERVAL = 1
+    # The suggestion algorithm used if the task doesn't name one
+    SUGGESTION_ALGORITHM = "tpe"
+
     def __init__(self, task, backend="serial", best_result_file=None):
         super(HyperoptOptimizer, self).__init__(task, backend, best_result_file)
 
+    def _smoke_test(self, pool):
+        """
+        Executes every node chain once with it's default parameters on a small part of the data
+        and removes all node chains that crash or don't create any results.
+        If the optimization is cancelled, no node chain is removed.
+        """
+        self.logger.info("Smoke testing the node chains")
+        node_chains = list(self._generate_node_chain_parameter_spaces())
+        results = []
+        for node_chain in node_chains:
+            if self.cancelled.is_set():
+                return
+            results.append(pool.apply_async(func=smoke_test_pipeline, args=(self._task, node_chain, self._backend)))
+        failed = []
+        for node_chain, result in zip(node_chains, results):
+            # The results of terminated workers never get ready
+            while not result.ready():
+                if self.cancelled.is_set():
+                    return
+                result.wait(self.POLL_INTERVAL)
+            if not result.get():
+                failed.append(node_chain)
+        for node_chain in failed:
+            self.logger.warn("Node chain '%s' failed the smoke test. Dropping it" % node_chain)
+        self._drop_node_chain_parameter_spaces(failed)
+        self.logger.info("%d of %d node chains passed the smoke test" % (len(node_chains) - len(failed),
+                                                                         len(node_chains)))
+
     # noinspection PyBroadException
     def _do_optimization(self, pool):
         try:
-            results = []
-            self.logger.info("Starting processes")
-            for node_chain in self._generate_node_chain_parameter_spaces():
-                self.logger.debug("Enqueuing node chain '%s'" % node_chain)
-                # Enqueue the evaluations and save the results
-                results.append(pool.apply_async(func=optimize_pipeline,
-                                                args=(self._task, node_chain, self._backend, self.queue)))
-            self.logger.debug("Done starting processes")
-            # close the pool
-            pool.close()
-            # Wait for the pipelines to finish
-            self.logger.info("Waiting for the processes to finish")
-            pool.join()
-            # check the results
-            self.logger.info("Checking the results of the processes")
-            for result in results:
-                self.logger.debug("Successful: %s" % result.successful())
-                self.logger.debug("Result: %s" % result.get())
+            with self._cancellable(pool):
+                self.__optimize_node_chains(pool)
         except Exception:
             self.logger.exception("Error doing optimization. Giving up!")
             pool.terminate()
             pool.join()
 
+    def __optimize_node_chains(self, pool):
+        results = []
+        if self._task["smoke_test"]:
+            self._smoke_test(pool)
+            passed = list(self._generate_node_chain_parameter_spaces())
+            if not passed and not self.cancelled.is_set():
+                self.logger.warn("No node chain passed the smoke test. Giving up")
+            if not passed or self.cancelled.is_set():
+                pool.close()
+                pool.join()
+                return
+        self.logger.info("Starting processes")
+        if self._task["scheduling"] == "trial" or self._task["broker"] is not None:
+            # Imported here, because the scheduler uses the evaluation function of this module
+            from pySPACEOptimizer.hyperopt.scheduler import TrialScheduler
+            scheduler = TrialScheduler(task=self._task, backend=self._backend, pool=pool, queue=self.queue,
+                                       early_stopping=self.early_stopping,
+                                       failure_registry=self.failure_registry,
+                                       time_budget=self.time_budget, cancelled=self.cancelled,
+                                       default_algorithm=self.SUGGESTION_ALGORITHM)
+            scheduler.run(list(self._generate_node_chain_parameter_spaces()))
+        else:
+            for node_chain in self._generate_node_chain_parameter_spaces():
+                self.logger.debug("Enqueuing node chain '%s'" % node_chain)
+                if self.time_budget is not None:
+                    # Queued before the worker can start the node chain
+                    self.time_budget.add_chain()
+                # Enqueue the evaluations and save the results
+                results.append(pool.apply_async(func=optimize_pipeline,
+                                                args=(self._task, node_chain, self._backend, self.queue,
+                                                      self.early_stopping, self.failure_registry,
+                                                      self.time_budget, self.resource_planner, self.cancelled,
+                                                      self.SUGGESTION_ALGORITHM)))
+        self.logger.debug("Done starting processes")
+        # close the pool
+        pool.close()
+        # Wait for the pipelines to finish
+        self.logger.info("Waiting for the processes to finish")
+        pool.join()
+        # check the results
+        self.logger.info("Checking the results of the processes")
+        for result in results:
+            if not result.ready():
+                # The worker has been terminated after the optimization has been cancelled
+                continue
+            self.logger.debug("Successful: %s" % result.successful())
+            self.logger.debug("Result: %s" % result.get())
+        if self.failure_registry is not None and self.failure_registry.blacklisted_nodes():
+            self.logger.info("Nodes blacklisted during the optimization: %s" %
+                             ", ".join(self.failure_registry.blacklisted_nodes()))
+
+    # noinspection PyBroadException
     def optimize(self):
-        self.logger.debug("Creating optimization pool")
-        pool = OptimizerPool(processes=self._task["max_parallel_pipelines"])
+        if self._task["broker"] is not None:
+            # Distribute the trials to the workers connected to the broker
+            self.logger.debug("Starting broker")
+            pool = BrokerPool(address=parse_address(self._task["broker"]), authkey=self._task["broker_authkey"],
+                              processes=self._task["max_parallel_pipelines"]
+                              if self._task["max_parallel_pipelines"] != "auto" else None,
+                              lease_timeout=self._task["lease_timeout"])
+        else:
+            if self._task["in_process"]:
+                # Load the data sets before forking the workers to share them between all workers
+                try:
+                    self.logger.debug("Loaded %d data sets" % preload_data_sets(self._task))
+                except Exception:
+                    self.logger.exception("Error loading the data sets. Every worker loads them itself:")
+            self.logger.debug("Creating optimization pool")
+            pool = self._create_pool(processes=self.parallel_pipelines)
         return self._do_optimization(pool)
 
     def create_node(self, node_name):
@@ -185,5 +727,20 @@ class SerialHyperoptOptimizer(HyperoptOptimizer):
         self.logger.debug("Creating optimization pool")
         # Create a pool with just one process, so every job
         # needs to be processed in serial
-        pool = OptimizerPool(processes=1)
+        pool = self._create_pool(processes=1)
         return self._do_optimization(pool)
+
+
+class GaussianProcessOptimizer(HyperoptOptimizer):
+    """
+    Optimizer using Bayesian optimization with a Gaussian process instead of TPE to suggest the parameters.
+    Needs fewer trials for node chains with few continuous parameters, everything else is the same as
+    for the HyperoptOptimizer.
+    """
+    SUGGESTION_ALGORITHM = "gaussian_process"
+
+    def __init__(self, task, backend="serial", best_result_file=None):
+        if task["suggestion_algorithm"] and task["suggestion_algorithm"] != self.SUGGESTION_ALGORITHM:
+            raise ValueError("The GaussianProcessOptimizer can't use the suggestion algorithm '{algorithm}'".format(
+                algorithm=task["suggestion_algorithm"]))
+        super(GaussianProcessOptimizer, self).__init__(task, backend, best_result_file)
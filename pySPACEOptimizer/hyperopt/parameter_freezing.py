@@ -0,0 +1,89 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+from hyperopt import base, JOB_STATE_DONE
+
+from pySPACEOptimizer.core.parameter_importance import parameter_importance
+
+
+class ParameterFreezing(object):
+    """
+    Wraps a suggestion algorithm and freezes the parameters without any effect on the loss.
+
+    Periodically the importance of every parameter is estimated from the evaluated trials. Parameters
+    explaining less than `threshold` of the variance of the losses are frozen at their value of the best
+    trial, so the search concentrates on the parameters that matter. The estimate is recomputed from the
+    trials, so freezing continues after resuming an optimization.
+    """
+
+    def __init__(self, algorithm, logger=None, min_trials=20, interval=10, threshold=0.01):
+        """
+        :param algorithm: The suggestion algorithm to wrap, e.g. `tpe.suggest`
+        :type algorithm: function
+        :param logger: The logger to report frozen parameters to
+        :type logger: logging.Logger
+        :param min_trials: The number of evaluated trials before the first estimate, at least one
+        :type min_trials: int
+        :param interval: The number of evaluated trials between two estimates
+        :type interval: int
+        :param threshold: The importance below which a parameter is frozen
+        :type threshold: float
+        :return: A new suggestion algorithm without any frozen parameters
+        :rtype: ParameterFreezing
+        """
+        self.__algorithm = algorithm
+        self.__logger = logger
+        self.__min_trials = max(min_trials, 1)
+        self.__interval = max(interval, 1)
+        self.__threshold = threshold
+        self.__analyzed = None
+        self.__frozen = {}
+
+    @property
+    def frozen(self):
+        """
+        The frozen parameters and their values as used by hyperopt.
+
+        :rtype: dict[str, object]
+        """
+        return dict(self.__frozen)
+
+    def __analyze(self, evaluated):
+        self.__analyzed = len(evaluated)
+        # Only parameters used by every evaluation, i.e. not depending on other parameters, can be frozen
+        names = set.intersection(*[set(name for name, values in trial["misc"]["vals"].items() if len(values) == 1)
+                                   for trial in evaluated])
+        if len(names) < 2:
+            return
+        values = {name: [trial["misc"]["vals"][name][0] for trial in evaluated] for name in names}
+        losses = [trial["result"]["loss"] for trial in evaluated]
+        importance = parameter_importance(values, losses)
+        best_trial = min(evaluated, key=lambda trial: trial["result"]["loss"])
+        unimportant = [name for name in names if importance[name] < self.__threshold]
+        if len(unimportant) == len(names):
+            # Keep optimizing the most important parameter
+            unimportant.remove(max(names, key=lambda name: importance[name]))
+        frozen = {name: best_trial["misc"]["vals"][name][0] for name in unimportant}
+        if self.__logger is not None and sorted(frozen.keys()) != sorted(self.__frozen.keys()):
+            self.__logger.info("Freezing the parameters %s after %d trials" % (
+                ", ".join(["%s=%s" % (name, value) for name, value in sorted(frozen.items())]), len(evaluated)))
+        self.__frozen = frozen
+
+    def suggest(self, new_ids, domain, trials, seed):
+        """
+        Suggests new trials using the wrapped algorithm and replaces the values of the frozen parameters.
+        Same signature as the suggestion algorithms of hyperopt.
+        """
+        evaluated = [trial for trial in trials.trials
+                     if trial["state"] == JOB_STATE_DONE and "loss" in trial["result"]]
+        if len(evaluated) >= self.__min_trials and \
+                (self.__analyzed is None or len(evaluated) - self.__analyzed >= self.__interval):
+            self.__analyze(evaluated)
+        new_trials = self.__algorithm(new_ids=new_ids, domain=domain, trials=trials, seed=seed)
+        if new_trials is base.StopExperiment or not self.__frozen:
+            return new_trials
+        for trial in new_trials:
+            vals = trial["misc"]["vals"]
+            for name, value in self.__frozen.items():
+                if vals.get(name):
+                    vals[name] = [value]
+        return new_trials
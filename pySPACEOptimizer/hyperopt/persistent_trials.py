@@ -1,16 +1,17 @@
 import copy
 import os
 
-from hyperopt import Trials, Domain, base, JOB_STATE_DONE
+from hyperopt import Trials, Domain, base, pyll, JOB_STATE_DONE
 
 from pySPACE.missions.nodes.decorators import ChoiceParameter
 from pySPACEOptimizer.framework.node_parameter_space import NodeParameterSpace
+from pySPACEOptimizer.utils import atomic_write
 
 try:
     # noinspection PyCompatibility
-    from cPickle import load, dump, HIGHEST_PROTOCOL
+    from cPickle import load, dumps, HIGHEST_PROTOCOL
 except ImportError:
-    from pickle import load, dump, HIGHEST_PROTOCOL
+    from pickle import load, dumps, HIGHEST_PROTOCOL
 
 
 class Trial(object):
@@ -26,6 +27,10 @@ class Trial(object):
     def loss(self):
         return self.__trial["result"]["loss"]
 
+    @property
+    def result(self):
+        return self.__trial["result"]
+
     def parameters(self, pipeline):
         parameters = base.spec_from_misc(self.__trial["misc"])
         new_pipeline_space = {}
@@ -70,11 +75,50 @@ def evaluate_trial(domain, trials, trial):
 
 
 # noinspection PyAbstractClass
+class Attachments(dict):
+    """
+    The attachments of the trials, which remember whether they have been changed since they have been stored.
+    An attachment changed in place has to be assigned again to be stored.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(Attachments, self).__init__(*args, **kwargs)
+        self.dirty = True
+
+    def __setitem__(self, key, value):
+        super(Attachments, self).__setitem__(key, value)
+        self.dirty = True
+
+    def __delitem__(self, key):
+        super(Attachments, self).__delitem__(key)
+        self.dirty = True
+
+    def clear(self):
+        super(Attachments, self).clear()
+        self.dirty = True
+
+    def pop(self, *args):
+        self.dirty = True
+        return super(Attachments, self).pop(*args)
+
+    def popitem(self):
+        self.dirty = True
+        return super(Attachments, self).popitem()
+
+    def setdefault(self, key, default=None):
+        self.dirty = True
+        return super(Attachments, self).setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        super(Attachments, self).update(*args, **kwargs)
+        self.dirty = True
+
+
 class PersistentTrials(Trials):
     STORAGE_NAME = "trials.pickle"
     ATTACHMENTS_NAME = "attachments.pickle"
 
-    def __init__(self, trials_dir, fn, space, recreate=False, exp_key=None, refresh=True, rseed=None):
+    def __init__(self, trials_dir, fn, space, recreate=False, exp_key=None, refresh=True, rseed=None, memo=None):
         self._trials_file = os.path.join(trials_dir, self.STORAGE_NAME)
         self._attachments_file = os.path.join(trials_dir, self.ATTACHMENTS_NAME)
         if recreate and os.path.isfile(self._trials_file):
@@ -83,7 +127,17 @@ class PersistentTrials(Trials):
         super(PersistentTrials, self).__init__(exp_key=exp_key, refresh=False)
         # Load the last trials from the trials directory
         self._dynamic_trials = self._load_trials()
+        for trial in self._dynamic_trials:
+            if trial["state"] == base.JOB_STATE_RUNNING:
+                # The evaluation has been interrupted, evaluate the trial again
+                trial["state"] = base.JOB_STATE_NEW
         self.attachments = self._load_attachments()
+        # Answers the parameter settings, which have already been evaluated
+        self.__memo = memo
+        if memo is not None:
+            for trial in self._dynamic_trials:
+                if trial["state"] == base.JOB_STATE_DONE:
+                    memo.record(base.spec_from_misc(trial["misc"]), trial["result"])
         self.__rseed = rseed if rseed is not None else 123
         # Now create the domain to store the model
         if "domain" in self.attachments:
@@ -96,6 +150,15 @@ class PersistentTrials(Trials):
         if refresh:
             self.refresh()
 
+    @property
+    def attachments(self):
+        return self._attachments
+
+    @attachments.setter
+    def attachments(self, attachments):
+        # Assigning new attachments marks them as changed
+        self._attachments = Attachments(attachments)
+
     def _load_attachments(self):
         try:
             with open(self._attachments_file, "rb") as attachments_file:
@@ -105,8 +168,12 @@ class PersistentTrials(Trials):
             return self.attachments
 
     def _store_attachments(self):
-        with open(self._attachments_file, "wb") as attachments_file:
-            dump(self.attachments, attachments_file)
+        # The attachments, i.e. the domain and the node chain, rarely change,
+        # so they are only written again, if an attachment has been assigned since they have been stored
+        if not self.attachments.dirty:
+            return
+        atomic_write(self._attachments_file, dumps(dict(self.attachments), HIGHEST_PROTOCOL))
+        self.attachments.dirty = False
 
     def _load_trials(self):
         try:
@@ -117,8 +184,8 @@ class PersistentTrials(Trials):
             return self._dynamic_trials
 
     def _store_trials(self):
-        with open(self._trials_file, "wb") as trials_file:
-            dump(self._dynamic_trials, trials_file)
+        # Written atomically, so an interrupted optimization never leaves a broken trials file behind
+        atomic_write(self._trials_file, dumps(self._dynamic_trials, HIGHEST_PROTOCOL))
 
     def refresh(self):
         # Store the trials
@@ -135,6 +202,7 @@ class PersistentTrials(Trials):
             os.unlink(self._attachments_file)
         except (IOError, OSError):
             pass
+        self.attachments.dirty = True
         # and restore the state of the trials object
         return super(PersistentTrials, self).delete_all()
 
@@ -166,9 +234,32 @@ class PersistentTrials(Trials):
 
     def _do_evaluate(self, trials):
         for trial in trials:
-            evaluate_trial(domain=self.__domain, trials=self, trial=trial)
+            result = self.memoized_result(trial)
+            if result is not None:
+                trial["state"] = base.JOB_STATE_DONE
+                trial["result"] = result
+            else:
+                evaluate_trial(domain=self.__domain, trials=self, trial=trial)
+                self.__record(trial)
             yield trial
 
+    def __record(self, trial):
+        if self.__memo is not None and trial["state"] == base.JOB_STATE_DONE:
+            self.__memo.record(base.spec_from_misc(trial["misc"]), trial["result"])
+
+    def memoized_result(self, trial):
+        """
+        Returns the result of an earlier evaluation of the same parameters as the `trial`
+        or None if the trial has to be evaluated.
+
+        :param trial: The document of a suggested trial
+        :type trial: dict
+        :rtype: dict[str, object] | None
+        """
+        if self.__memo is None:
+            return None
+        return self.__memo.lookup(base.spec_from_misc(trial["misc"]))
+
     def _evaluate(self, evaluations, pass_):
         # Get the trials to evaluate
         trials_to_evaluate = []
@@ -181,6 +272,8 @@ class PersistentTrials(Trials):
         # evaluate the trials that have to be done and yield the result
         for trial in self._do_evaluate(trials_to_evaluate):
             self._update_doc(trial=trial)
+            # Persist every result, so an interrupted optimization only repeats the running trial
+            self._store_trials()
             yield trial
 
     def _enqueue_trials(self, algo, max_evals):
@@ -197,10 +290,78 @@ class PersistentTrials(Trials):
                 assert len(new_ids) >= len(new_trials)
                 if new_trials:
                     self.insert_trial_docs(new_trials)
+                    # Persist the suggested trials, so they are evaluated when resuming the optimization
+                    self.refresh()
                 else:
                     return False
         return True
 
+    def suggest(self, algo):
+        """
+        Suggests a single new trial using the suggestion algorithm `algo` without evaluating it.
+        Every trial is suggested using a different seed, so that trials suggested while others
+        are still being evaluated don't repeat the same parameters.
+
+        :return: The document of the new trial or None if the algorithm doesn't suggest any more trials
+        :rtype: dict | None
+        """
+        new_ids = self.new_trial_ids(1)
+        new_trials = algo(new_ids=new_ids,
+                          domain=self.__domain,
+                          trials=self,
+                          seed=self.__rseed + new_ids[0])
+        if new_trials is base.StopExperiment or not new_trials:
+            return None
+        self.insert_trial_docs(new_trials)
+        self.refresh()
+        return self._dynamic_trials[new_ids[0]]
+
+    def unfinished_trials(self):
+        """
+        Returns all trials that have been suggested but not been evaluated, e.g. because the optimization
+        has been interrupted. These trials are reset to be evaluated again.
+
+        :rtype: list[dict]
+        """
+        unfinished = []
+        for trial in self._dynamic_trials:
+            if trial["state"] in (base.JOB_STATE_NEW, base.JOB_STATE_RUNNING):
+                trial["state"] = base.JOB_STATE_NEW
+                unfinished.append(trial)
+        return unfinished
+
+    def start_trial(self, trial):
+        """
+        Marks the `trial` as running and returns the arguments to evaluate it with the objective function.
+
+        :param trial: The document of a suggested trial
+        :type trial: dict
+        :return: The arguments of the objective function
+        :rtype: tuple
+        """
+        trial["state"] = base.JOB_STATE_RUNNING
+        self._update_doc(trial=trial)
+        memo = self.__domain.memo_from_config(base.spec_from_misc(trial["misc"]))
+        return pyll.rec_eval(self.__domain.expr, memo=memo)
+
+    def complete_trial(self, trial, result):
+        """
+        Stores the `result` of the evaluation of a running `trial` and persists all trials.
+
+        :param trial: The document of the evaluated trial
+        :type trial: dict
+        :param result: The result of the objective function
+        :type result: dict[str, object]
+        :return: The evaluated trial
+        :rtype: Trial
+        """
+        trial["state"] = base.JOB_STATE_DONE
+        trial["result"] = result
+        self._update_doc(trial=trial)
+        self.__record(trial)
+        self.refresh()
+        return Trial(trial, self.trial_attachments(trial))
+
     def minimize(self, algo, evaluations, pass_):
         # Enqueue the trials
         if not self._enqueue_trials(algo=algo, max_evals=evaluations * pass_):
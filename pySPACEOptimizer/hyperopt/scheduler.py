@@ -0,0 +1,309 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+import threading
+from collections import deque
+import time
+
+import numpy
+from hyperopt import STATUS_OK, STATUS_FAIL, JOB_STATE_DONE
+
+from pySPACEOptimizer.core.racing import Race
+from pySPACEOptimizer.hyperopt.optimizer import evaluate_parameters, parameter_memo, suggestion_algorithm, \
+    __minimize as minimize
+from pySPACEOptimizer.hyperopt.persistent_trials import PersistentTrials
+
+
+class ChainState(object):
+
+    def __init__(self, pipeline, trials, total, algorithm):
+        """
+        The state of a single node chain optimized by the trial scheduler.
+
+        :param pipeline: The node chain to optimize
+        :type pipeline: NodeChainParameterSpace
+        :param trials: The persistent trials of the node chain
+        :type trials: PersistentTrials
+        :param total: The number of evaluations to do for this node chain
+        :type total: int
+        :param algorithm: The algorithm suggesting the trials of the node chain
+        :type algorithm: function
+        """
+        self.pipeline = pipeline
+        self.trials = trials
+        self.total = total
+        self.algorithm = algorithm
+        self.chain_id = pipeline.chain_id
+        self.node_names = [node.name for node in pipeline.nodes]
+        self.race = None
+        self.best_trial = None
+        self.durations = []
+        self.running = 0
+        self.reported = set()
+        self.pending = [trial for trial in trials.unfinished_trials() if trial["tid"] < total]
+        self.suggested = len([trial for trial in trials if trial.id < total])
+        self.stopped = False
+        # The loss and the parameters to report for the evaluations skipped after stopping
+        self.skipped = (float("inf"), None)
+
+    @property
+    def has_work(self):
+        return not self.stopped and (bool(self.pending) or self.suggested < self.total)
+
+
+class TrialScheduler(object):
+    """
+    Scheduler treating single trials as the unit of work instead of whole node chains.
+
+    The state of every node chain, i.e. it's trials and it's race, stays inside the scheduler,
+    while the workers of the pool are stateless evaluators. Whenever a worker is free, the
+    scheduler asks the node chain with the fewest running evaluations for it's next trial,
+    so all workers stay busy until the very last evaluation.
+    """
+    # Seconds to wait for a finished evaluation before checking all running evaluations again
+    POLL_INTERVAL = 1
+    # Number of node chains per worker, which are open, i.e. loaded and logging, at the same time
+    OPEN_CHAINS_PER_WORKER = 2
+
+    def __init__(self, task, backend, pool, queue, early_stopping=None, failure_registry=None, time_budget=None,
+                 cancelled=None, default_algorithm="tpe"):
+        """
+        :type task: Task
+        :type backend: str
+        :type pool: OptimizerPool
+        :param queue: The queue to put the results of the evaluations into
+        :type queue: Queue
+        :type early_stopping: MedianStoppingRule
+        :type failure_registry: FailureRegistry
+        :type time_budget: TimeBudget
+        :param cancelled: The event set as soon as the optimization has been cancelled
+        :type cancelled: threading.Event
+        :param default_algorithm: The name of the suggestion algorithm to use if the task doesn't name one
+        :type default_algorithm: str
+        """
+        self.__task = task
+        self.__backend = backend
+        self.__pool = pool
+        self.__queue = queue
+        self.__early_stopping = early_stopping
+        self.__failure_registry = failure_registry
+        self.__time_budget = time_budget
+        self.__cancelled = cancelled
+        self.__default_algorithm = default_algorithm
+        self.__finished = threading.Event()
+        self.__logger = logging.getLogger("%s.%s" % (self.__class__.__module__, self.__class__.__name__))
+
+    def __skip(self, chain):
+        # Put a skipped evaluation to the queue for every evaluation that has not been reported
+        loss, parameters = chain.skipped
+        for id_ in range(chain.total):
+            if id_ not in chain.reported:
+                self.__queue.put((id_, loss, chain.pipeline, parameters, None))
+                chain.reported.add(id_)
+
+    def __stop(self, chain, reason, skipped=None):
+        chain.pipeline.logger.warn("%s. Giving up" % reason)
+        chain.stopped = True
+        if skipped is not None:
+            chain.skipped = skipped
+        if not chain.running:
+            # Otherwise the evaluations are skipped as soon as the running evaluations are finished
+            self.__skip(chain)
+
+    def __report(self, chain, trial):
+        if chain.race is not None:
+            chain.race.observe(trial.result)
+        self.__queue.put((trial.id, trial.loss, chain.pipeline, trial.parameters(chain.pipeline), trial.result))
+        chain.reported.add(trial.id)
+        # The loss of an evaluation stopped by the median rule is only an intermediate loss
+        if not trial.result.get("stopped", False) and \
+                (chain.best_trial is None or trial.loss <= chain.best_trial.loss):
+            chain.best_trial = trial
+
+    def __skip_pipeline(self, pipeline):
+        # Put a skipped evaluation to the queue for every evaluation of a node chain, which has not been started
+        for id_ in range(self.__task["evaluations_per_pass"] * self.__task["passes"]):
+            self.__queue.put((id_, float("inf"), pipeline, None, None))
+
+    def __start_chain(self, pipeline):
+        task = self.__task
+        total = task["evaluations_per_pass"] * task["passes"]
+        chain_id = pipeline.chain_id
+        node_names = [node.name for node in pipeline.nodes]
+        if self.__failure_registry is not None and self.__failure_registry.is_pruned(chain_id, node_names):
+            pipeline.logger.warn("Node chain contains blacklisted nodes. Skipping")
+            pipeline.close_loggers()
+            self.__skip_pipeline(pipeline)
+            return None
+        trials = PersistentTrials(trials_dir=pipeline.base_result_dir, fn=minimize,
+                                  space=(pipeline, pipeline.pipeline_space),
+                                  recreate=task.get("restart_evaluation", False),
+                                  rseed=int(time.time()), memo=parameter_memo(task))
+        trials.attachments["pipeline"] = pipeline
+        chain = ChainState(pipeline=pipeline, trials=trials, total=total,
+                           algorithm=suggestion_algorithm(task, pipeline, default=self.__default_algorithm))
+        if task["racing"]:
+            chain.race = Race(alpha=task["racing_alpha"], min_folds=task["racing_min_folds"])
+        pipeline.log_pipeline()
+        # Report the trials evaluated by a previous run
+        for trial in trials:
+            if trial.id < total and trial["state"] == JOB_STATE_DONE:
+                self.__report(chain, trial)
+        if self.__time_budget is not None and not self.__time_budget.start_chain(chain_id):
+            self.__stop(chain, "Time budget expired before the node chain has been started")
+        return chain
+
+    def __close_chain(self, chain):
+        # Store the trials and report the evaluations of a node chain, which is done, and close it's log files
+        chain.trials.refresh()
+        self.__skip(chain)
+        if self.__time_budget is not None:
+            self.__time_budget.finish_chain(chain.chain_id)
+        chain.pipeline.close_loggers()
+
+    def __check(self, chain):
+        # Check whether the node chain should be stopped before evaluating another trial
+        task = self.__task
+        if self.__failure_registry is not None and \
+                self.__failure_registry.is_pruned(chain.chain_id, chain.node_names):
+            self.__stop(chain, "Node chain failed too often or contains blacklisted nodes")
+        elif self.__time_budget is not None and \
+                not self.__time_budget.may_continue(chain.chain_id, numpy.mean(chain.durations or [0])):
+            self.__stop(chain, "Time budget of the node chain expired")
+        elif len(chain.reported) >= task["check_after"] and \
+                (chain.best_trial is None or chain.best_trial.loss >= task["max_loss"]):
+            # Node chains without any complete evaluation, e.g. because all have been stopped, give up as well
+            if chain.best_trial is not None:
+                skipped = (chain.best_trial.loss, chain.best_trial.parameters(chain.pipeline))
+            else:
+                skipped = (float("inf"), None)
+            self.__stop(chain, "No pipeline found with loss better than %s after %s evaluations" % (
+                task["max_loss"], task["check_after"]), skipped=skipped)
+        return not chain.stopped
+
+    def __next_chain(self, chains):
+        # The node chain with the fewest running and the fewest finished evaluations gets the next worker
+        candidates = [chain for chain in chains if chain.has_work]
+        while candidates:
+            chain = min(candidates, key=lambda candidate: (candidate.running, len(candidate.reported)))
+            if self.__check(chain):
+                return chain
+            candidates.remove(chain)
+        return None
+
+    def __submit(self, chain):
+        # Suggest the next trial of the chain and let a free worker evaluate it
+        if chain.pending:
+            trial = chain.pending.pop(0)
+        else:
+            trial = chain.trials.suggest(algo=chain.algorithm)
+            if trial is None:
+                self.__stop(chain, "Suggestion algorithm doesn't suggest any more trials")
+                return None
+            chain.suggested += 1
+        result = chain.trials.memoized_result(trial)
+        if result is not None:
+            # The parameters have already been evaluated, no worker is needed
+            self.__finish(chain, trial, result)
+            return None
+        pipeline, parameter_setting = chain.trials.start_trial(trial)
+        best_losses = None
+        if chain.race is not None and chain.race.best_losses is not None:
+            best_losses = [float(loss) for loss in chain.race.best_losses]
+        chain.running += 1
+        result = self.__pool.apply_async(func=evaluate_parameters,
+                                         args=(pipeline, parameter_setting, self.__backend, best_losses,
+                                               self.__early_stopping, self.__time_budget),
+                                         callback=lambda _: self.__finished.set())
+        return result, chain, trial
+
+    # noinspection PyBroadException
+    def __complete(self, chain, trial, async_result):
+        # Store the result of a finished evaluation and report it
+        try:
+            result, duration = async_result.get()
+        except Exception:
+            chain.pipeline.error_logger.exception("Error evaluating the trial %d:" % trial["tid"])
+            result, duration = {"loss": float("inf"), "status": STATUS_FAIL}, 0.0
+        chain.running -= 1
+        chain.durations.append(duration)
+        self.__finish(chain, trial, result)
+
+    def __finish(self, chain, trial, result):
+        # Store the result of an evaluated trial and report it
+        trial = chain.trials.complete_trial(trial, result)
+        chain.pipeline.logger.debug("Trial: {trial.id} / Loss: {trial.loss}".format(trial=trial))
+        self.__report(chain, trial)
+        # Neither cancelled evaluations nor answers of the memo tell whether the node chain fails
+        if self.__failure_registry is not None and not result.get("cancelled", False) and \
+                not result.get("duplicate", False):
+            blacklisted = self.__failure_registry.record(chain.chain_id, chain.node_names,
+                                                         result.get("status", None) != STATUS_OK)
+            if blacklisted:
+                chain.pipeline.logger.warn("Nodes %s failed too often. Blacklisting them" % blacklisted)
+        if chain.stopped and not chain.running:
+            self.__skip(chain)
+
+    def run(self, pipelines):
+        """
+        Optimizes all `pipelines` and returns as soon as all evaluations are done.
+
+        :param pipelines: The node chains to optimize
+        :type pipelines: list[NodeChainParameterSpace]
+        """
+        # The node chains are started lazily, so only a few of them are loaded and logging at the same time
+        waiting = deque(pipelines)
+        if self.__time_budget is not None:
+            for _ in waiting:
+                self.__time_budget.add_chain()
+        open_chains = self.__pool.processes * self.OPEN_CHAINS_PER_WORKER
+        chains = []
+        closed = 0
+        evaluated = 0
+        running = []
+        cancel_deadline = None
+        while True:
+            if cancel_deadline is None and self.__cancelled is not None and self.__cancelled.is_set():
+                self.__logger.warn("Optimization has been cancelled. Waiting for %d running evaluations" %
+                                   len(running))
+                cancel_deadline = time.time() + self.__task["cancel_timeout"]
+            while cancel_deadline is None and waiting and len(chains) < open_chains:
+                chain = self.__start_chain(waiting.popleft())
+                if chain is not None:
+                    chains.append(chain)
+            # Give every free worker a trial to evaluate
+            while cancel_deadline is None and len(running) < self.__pool.processes:
+                chain = self.__next_chain(chains)
+                if chain is None:
+                    break
+                submitted = self.__submit(chain)
+                if submitted is not None:
+                    running.append(submitted)
+            for chain in [chain for chain in chains if not chain.has_work and not chain.running]:
+                chains.remove(chain)
+                self.__close_chain(chain)
+                closed += 1
+                evaluated += len(chain.trials)
+            if not running:
+                if cancel_deadline is None and waiting:
+                    # Start the next node chains
+                    continue
+                break
+            if cancel_deadline is not None and time.time() > cancel_deadline:
+                # The running trials are evaluated again when resuming the optimization
+                self.__logger.warn("Abandoning %d running evaluations" % len(running))
+                break
+            self.__finished.wait(self.POLL_INTERVAL)
+            self.__finished.clear()
+            for submitted in [submitted for submitted in running if submitted[0].ready()]:
+                running.remove(submitted)
+                async_result, chain, trial = submitted
+                self.__complete(chain, trial, async_result)
+        for chain in chains:
+            # Report the evaluations of all node chains left open by a cancellation
+            self.__close_chain(chain)
+            closed += 1
+            evaluated += len(chain.trials)
+        for pipeline in waiting:
+            self.__skip_pipeline(pipeline)
+        self.__logger.info("Evaluated %d trials of %d node chains" % (evaluated, closed))
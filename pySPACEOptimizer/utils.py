@@ -1,4 +1,6 @@
 import logging
+import os
+import signal
 import sys
 
 
@@ -60,3 +62,51 @@ class output_logger(object):
     def __exit__(self, exc_type, exc_val, exc_tb):
         sys.stdout = self.__old_std_out
         sys.stderr = self.__old_std_err
+
+
+def ignore_interrupts():
+    """
+    Lets the current process ignore SIGINT, e.g. a Ctrl-C in the terminal.
+    Used by all processes started by the optimizer, which handles the interrupt itself.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class TimeLimitExceeded(Exception):
+    pass
+
+
+class time_limit(object):
+
+    def __init__(self, seconds):
+        self.__seconds = seconds
+        self.__old_handler = None
+
+    # noinspection PyUnusedLocal
+    def _handle_alarm(self, *args):
+        raise TimeLimitExceeded("Time limit of %s seconds exceeded" % self.__seconds)
+
+    def __enter__(self):
+        if self.__seconds is not None:
+            self.__old_handler = signal.signal(signal.SIGALRM, self._handle_alarm)
+            # Alarm needs at least one second, otherwise it would be disabled
+            signal.alarm(max(int(self.__seconds), 1))
+
+    # noinspection PyUnusedLocal
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.__seconds is not None:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, self.__old_handler)
+
+
+def atomic_write(file_path, data):
+    """
+    Writes the string `data` to `file_path`, so that the file either contains the old or the new data,
+    even if the process is killed while writing.
+    """
+    temporary_path = "%s.%d.tmp" % (file_path, os.getpid())
+    with open(temporary_path, "wb") as temporary_file:
+        temporary_file.write(data)
+        temporary_file.flush()
+        os.fsync(temporary_file.fileno())
+    os.rename(temporary_path, file_path)
@@ -25,7 +25,8 @@ setup(
     },
     entry_points={
         "console_scripts": [
-            "pySPACEOptimizer = pySPACEOptimizer.core.__main__:main"
+            "pySPACEOptimizer = pySPACEOptimizer.core.__main__:main",
+            "pySPACEOptimizerWorker = pySPACEOptimizer.core.worker:main"
         ],
         "gui_scripts": [
             "optimizerPerformanceAnalysis = pySPACEOptimizer.hyperopt.tools.performance_analysis:main"
@@ -33,6 +34,7 @@ setup(
         OPTIMIZER_ENTRY_POINT: [
             "HyperoptOptimizer = pySPACEOptimizer.hyperopt.optimizer:HyperoptOptimizer",
             "SerialHyperoptOptimizer = pySPACEOptimizer.hyperopt.optimizer:SerialHyperoptOptimizer",
+            "GaussianProcessOptimizer = pySPACEOptimizer.hyperopt.optimizer:GaussianProcessOptimizer",
         ],
         TASK_ENTRY_POINT: [
             "classification = pySPACEOptimizer.hyperopt.classification_task:ClassificationTask",
@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from pySPACEOptimizer.core.broker import BrokerPool, WorkerLost, run_worker
+
+AUTHKEY = b"test"
+LEASE_TIMEOUT = 2
+
+
+def square(value):
+    return value * value
+
+
+def fail():
+    raise ValueError("failed")
+
+
+def die_once(marker):
+    # Kill the worker on the first attempt to simulate a lost host
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return os.getpid()
+
+
+def die():
+    os._exit(1)
+
+
+class Unpicklable(object):
+    # Pickled by the worker, but can't be unpickled by the pool
+    def __reduce__(self):
+        return fail, ()
+
+
+def unpicklable():
+    return Unpicklable()
+
+
+class BrokerPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.pool = BrokerPool(address=("127.0.0.1", 0), authkey=AUTHKEY, lease_timeout=LEASE_TIMEOUT,
+                               max_attempts=2)
+        self.workers = []
+
+    def tearDown(self):
+        self.pool.close()
+        self.pool.terminate()
+        for worker in self.workers:
+            worker.join(10)
+            if worker.is_alive():
+                worker.terminate()
+        shutil.rmtree(self.directory)
+
+    def start_workers(self, number):
+        for _ in range(number):
+            worker = multiprocessing.Process(target=run_worker, args=(self.pool.address, AUTHKEY),
+                                             kwargs={"poll_interval": 0.1})
+            worker.start()
+            self.workers.append(worker)
+
+    def test_evaluation(self):
+        self.start_workers(2)
+        results = [self.pool.apply_async(square, args=(value,)) for value in range(10)]
+        self.assertEqual([result.get(timeout=30) for result in results], [value * value for value in range(10)])
+
+    def test_callback(self):
+        self.start_workers(1)
+        values = []
+        self.pool.apply_async(square, args=(3,), callback=values.append).get(timeout=30)
+        self.assertEqual(values, [9])
+
+    def test_error(self):
+        self.start_workers(1)
+        result = self.pool.apply_async(fail)
+        self.assertRaises(ValueError, result.get, 30)
+        self.assertFalse(result.successful())
+
+    def test_worker_loss(self):
+        self.start_workers(2)
+        result = self.pool.apply_async(die_once, args=(os.path.join(self.directory, "marker"),))
+        # The job is handed out again after the lease of the lost worker expired
+        self.assertIsInstance(result.get(timeout=30), int)
+
+    def test_give_up(self):
+        self.start_workers(2)
+        result = self.pool.apply_async(die)
+        self.assertRaises(WorkerLost, result.get, 30)
+
+    def test_unpicklable_result(self):
+        self.start_workers(1)
+        result = self.pool.apply_async(unpicklable)
+        self.assertRaises(ValueError, result.get, 30)
+        # The results of other jobs are still collected
+        self.assertEqual(self.pool.apply_async(square, args=(3,)).get(timeout=30), 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
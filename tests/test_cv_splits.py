@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from pySPACEOptimizer.core.cv_splits import CrossValidationSplits
+
+
+class CrossValidationSplitsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.result_dir = tempfile.mkdtemp()
+        self.labels = ["Standard"] * 40 + ["Target"] * 10
+
+    def tearDown(self):
+        shutil.rmtree(self.result_dir)
+
+    def test_stratified_folds(self):
+        folds = CrossValidationSplits.stratified_folds(self.labels, splits=5, seed=1)
+        labels = numpy.asarray(self.labels)
+        for fold in range(5):
+            self.assertEqual(numpy.sum(labels[folds == fold] == "Standard"), 8)
+            self.assertEqual(numpy.sum(labels[folds == fold] == "Target"), 2)
+        numpy.testing.assert_array_equal(folds, CrossValidationSplits.stratified_folds(self.labels, 5, 1))
+        self.assertFalse(numpy.array_equal(folds, CrossValidationSplits.stratified_folds(self.labels, 5, 2)))
+
+    def test_cached_folds(self):
+        folds = CrossValidationSplits(self.result_dir, splits=5, seed=1).folds("data", self.labels)
+        file_path = os.path.join(self.result_dir, CrossValidationSplits.SPLIT_DIR, "data.npz")
+        self.assertTrue(os.path.isfile(file_path))
+        # Another worker loads the same folds
+        numpy.testing.assert_array_equal(CrossValidationSplits(self.result_dir, splits=5, seed=1).folds(
+            "data", self.labels), folds)
+        # Another number of splits doesn't use the stored folds
+        self.assertEqual(CrossValidationSplits(self.result_dir, splits=2, seed=1).folds("data", self.labels).max(),
+                         1)
+
+    def test_invalid_splits(self):
+        self.assertRaises(ValueError, CrossValidationSplits, self.result_dir, splits=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
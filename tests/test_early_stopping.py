@@ -0,0 +1,49 @@
+import unittest
+
+from pySPACEOptimizer.core.early_stopping import MedianStoppingRule
+
+CHAIN = "chain"
+
+
+class MedianStoppingRuleTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rule = MedianStoppingRule(min_trials=3)
+        for losses in [[0.2, 0.2, 0.2], [0.3, 0.3, 0.3], [0.4, 0.4, 0.4]]:
+            self.rule.complete(CHAIN, losses)
+
+    def test_no_stopping_without_enough_trials(self):
+        rule = MedianStoppingRule(min_trials=3)
+        rule.complete(CHAIN, [0.1, 0.1])
+        self.assertFalse(rule.should_stop(CHAIN, [0.9]))
+
+    def test_stop_worse_than_median(self):
+        self.assertTrue(self.rule.should_stop(CHAIN, [0.5]))
+        self.assertTrue(self.rule.should_stop(CHAIN, [0.2, 0.5]))
+
+    def test_keep_better_than_median(self):
+        self.assertFalse(self.rule.should_stop(CHAIN, [0.25]))
+        self.assertFalse(self.rule.should_stop(CHAIN, [0.2, 0.3]))
+
+    def test_completed(self):
+        self.assertEqual(self.rule.completed(CHAIN, step=1), 3)
+        self.assertEqual(self.rule.completed(CHAIN, step=4), 0)
+
+    def test_estimated_loss(self):
+        # Shifted from the median final loss by the distance to the median after the first fold
+        self.assertAlmostEqual(self.rule.estimated_loss(CHAIN, [0.5]), 0.5)
+        self.assertAlmostEqual(self.rule.estimated_loss(CHAIN, [0.2, 0.5]), 0.35)
+        self.assertGreater(self.rule.estimated_loss(CHAIN, [0.35]), 0.3)
+
+    def test_chains_are_independent(self):
+        # A weaker node chain isn't compared to the evaluations of another node chain
+        self.assertFalse(self.rule.should_stop("weaker", [0.9]))
+        for losses in [[0.8, 0.8], [0.9, 0.9], [1.0, 1.0]]:
+            self.rule.complete("weaker", losses)
+        self.assertFalse(self.rule.should_stop("weaker", [0.85]))
+        self.assertTrue(self.rule.should_stop("weaker", [0.95]))
+        self.assertEqual(self.rule.completed(CHAIN), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
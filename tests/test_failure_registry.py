@@ -0,0 +1,42 @@
+import unittest
+
+from pySPACEOptimizer.core.failure_registry import FailureRegistry
+
+
+class FailureRegistryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = FailureRegistry(min_evaluations=4, max_failure_rate=1.0,
+                                        protected_nodes={"Source", "Sink"})
+
+    def test_blacklist_node_failing_in_several_chains(self):
+        for _ in range(2):
+            self.registry.record("a", ["Source", "Broken", "Sink"], failed=True)
+        blacklisted = []
+        for _ in range(2):
+            blacklisted.extend(self.registry.record("b", ["Source", "Broken", "Other", "Sink"], failed=True))
+        self.assertListEqual(blacklisted, ["Broken"])
+        self.assertListEqual(self.registry.blacklisted_nodes(), ["Broken"])
+        self.assertTrue(self.registry.is_pruned("c", ["Source", "Broken", "Sink"]))
+
+    def test_never_blacklist_protected_nodes(self):
+        for chain in ["a", "b", "c", "d"]:
+            self.registry.record(chain, ["Source", "Sink"], failed=True)
+        self.assertListEqual(self.registry.blacklisted_nodes(), [])
+
+    def test_no_blacklist_from_single_chain(self):
+        for _ in range(10):
+            self.registry.record("a", ["Source", "Broken", "Sink"], failed=True)
+        self.assertListEqual(self.registry.blacklisted_nodes(), [])
+        # but the chain itself is pruned
+        self.assertTrue(self.registry.is_pruned("a", ["Source", "Broken", "Sink"]))
+
+    def test_keep_partially_failing_chain(self):
+        for failed in [True, False, True, True]:
+            self.registry.record("a", ["Source", "Node", "Sink"], failed=failed)
+        self.assertFalse(self.registry.is_pruned("a", ["Source", "Node", "Sink"]))
+        self.assertAlmostEqual(self.registry.failure_rate("Node"), 0.75)
+
+
+if __name__ == '__main__':
+    unittest.main()
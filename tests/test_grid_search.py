@@ -0,0 +1,39 @@
+import unittest
+
+from hyperopt import Domain, Trials, base, hp
+
+from pySPACEOptimizer.hyperopt.grid_search import GridSearch, cardinality
+
+
+class GridSearchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = {"kernel": range(2), "complexity": [1, 2, 3]}
+        space = {"kernel": hp.choice("kernel", ["LINEAR", "RBF"]),
+                 "complexity": hp.quniform("complexity", 1, 3, 1)}
+        self.domain = Domain(fn=lambda parameters: 0, expr=space)
+
+    def test_cardinality(self):
+        self.assertEqual(cardinality(self.grid), 6)
+        self.assertEqual(cardinality({}), 1)
+        self.assertEqual(cardinality(None), float("inf"))
+
+    def test_exhaustion(self):
+        trials = Trials()
+        grid_search = GridSearch(self.grid)
+        configurations = set()
+        while True:
+            new_trials = grid_search.suggest(trials.new_trial_ids(4), self.domain, trials, seed=0)
+            if new_trials is base.StopExperiment:
+                break
+            trials.insert_trial_docs(new_trials)
+            trials.refresh()
+            for trial in new_trials:
+                configurations.add((trial["misc"]["vals"]["kernel"][0], trial["misc"]["vals"]["complexity"][0]))
+        # Every configuration has been suggested exactly once
+        self.assertEqual(len(trials.trials), 6)
+        self.assertEqual(len(configurations), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
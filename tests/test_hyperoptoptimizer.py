@@ -1,11 +1,27 @@
+import numpy
+
+from pySPACEOptimizer.framework.base_task import data_set_dirs
+from pySPACEOptimizer.hyperopt import optimizer as hyperopt_optimizer
 from pySPACEOptimizer.optimizer import optimizer_factory
 from pySPACEOptimizer.tasks import task_factory
 from pyspace_test import PySPACETestCase
 
+# A continuous parameter space for the suggestion algorithms
+CONTINUOUS_RANGES = {"SorSvmNode": {
+                         "complexity": {"type": "LogUniform", "min": 0.01, "max": 10},
+                         "max_iterations": 10
+                    }}
+
 
 class HyperoptOptimizerTestCase(PySPACETestCase):
 
-    def test_optimization(self):
+    def tearDown(self):
+        # The evaluator of this process keeps the data sets loaded by a test
+        hyperopt_optimizer.EVALUATOR = None
+        super(HyperoptOptimizerTestCase, self).tearDown()
+
+    @staticmethod
+    def _task(**overrides):
         task_spec = dict(type="classification",
                          input_path="example_summary_split",
                          optimizer="HyperoptOptimizer",
@@ -19,7 +35,65 @@ class HyperoptOptimizerTestCase(PySPACETestCase):
                                                 "complexity": 1,
                                                 "max_iterations": 10
                                            }})
-        task = task_factory(task_spec)
+        task_spec.update(overrides)
+        return task_factory(task_spec)
+
+    def test_optimization(self):
+        task = self._task()
         optimizer = optimizer_factory(task, backend="mcore")
         best_params = optimizer.optimize()
         self.assertIsNotNone(best_params)
+
+    def test_trial_scheduling(self):
+        task = self._task(evaluations_per_pass=2, scheduling="trial")
+        optimizer = optimizer_factory(task, backend="serial")
+        best = optimizer.do_optimization()
+        self.assertLess(best[0], float("inf"))
+
+    def test_in_process_evaluation(self):
+        task = self._task(in_process=True)
+        optimizer = optimizer_factory(task, backend="serial")
+        best = optimizer.do_optimization()
+        self.assertLess(best[0], float("inf"))
+        # The workers may have fallen back to operations, so evaluate the best setting in process again,
+        # which raises InProcessNotSupported instead of falling back
+        summary, _ = hyperopt_optimizer._execute_in_process(best[1], best[2])
+        self.assertTrue(numpy.isfinite(hyperopt_optimizer._loss(task, summary)))
+
+    def test_preload_data_sets(self):
+        task = self._task()
+        self.assertGreater(hyperopt_optimizer.preload_data_sets(task), 0)
+        evaluator = hyperopt_optimizer.EVALUATOR
+        # The folds link to the already loaded data sets
+        fold_dirs = data_set_dirs(task.fold_input_paths[0])
+        self.assertTrue(any(evaluator.data_set(fold_dirs[0]) is evaluator.data_set(data_set_dir)
+                            for data_set_dir in task.data_sets))
+
+    def test_incremental_tpe(self):
+        task = self._task(evaluations_per_pass=25, suggestion_algorithm="incremental_tpe", grid_search=False,
+                          scheduling="trial", parameter_ranges=CONTINUOUS_RANGES)
+        optimizer = optimizer_factory(task, backend="serial")
+        best = optimizer.do_optimization()
+        self.assertLess(best[0], float("inf"))
+
+    def test_gaussian_process_optimizer(self):
+        task = self._task(optimizer="GaussianProcessOptimizer", evaluations_per_pass=15, grid_search=False,
+                          scheduling="trial", parameter_ranges=CONTINUOUS_RANGES)
+        optimizer = optimizer_factory(task, backend="serial")
+        self.assertIsInstance(optimizer, hyperopt_optimizer.GaussianProcessOptimizer)
+        # The task itself isn't changed
+        self.assertIsNone(task["suggestion_algorithm"])
+        best = optimizer.do_optimization()
+        self.assertLess(best[0], float("inf"))
+
+    def test_gaussian_process_optimizer_with_other_algorithm(self):
+        task = self._task(optimizer="GaussianProcessOptimizer", suggestion_algorithm="tpe")
+        with self.assertRaises(ValueError):
+            optimizer_factory(task, backend="serial")
+
+    def test_loss_of_invalid_metric(self):
+        task = {"metric": "Balanced_accuracy", "is_performance_metric": True}
+        self.assertAlmostEqual(hyperopt_optimizer._loss(task, {"Balanced_accuracy": numpy.array([0.5, 0.7])}), -0.6)
+        # Cells, which aren't numbers, fail the evaluation instead of returning NaN
+        with self.assertRaises(ValueError):
+            hyperopt_optimizer._loss(task, {"Balanced_accuracy": numpy.array([0.5, float("nan")])})
@@ -0,0 +1,39 @@
+import yaml
+
+from pySPACEOptimizer.core.node_chain_parameter_space import NodeChainParameterSpace
+from pySPACEOptimizer.framework.base_task import Task
+from pySPACEOptimizer.framework.node_parameter_space import NodeParameterSpace
+from pyspace_test import PySPACETestCase
+
+
+class NodeChainParameterSpaceTestCase(PySPACETestCase):
+
+    def setUp(self):
+        super(NodeChainParameterSpaceTestCase, self).setUp()
+        self.task = Task(name="NodeChainParameterSpaceTest", input_path="example_summary_split",
+                         evaluations_per_pass=10)
+        nodes = [NodeParameterSpace(node_name=node_name, task=self.task)
+                 for node_name in ["FeatureVectorSourceNode", "GaussianFeatureNormalizationNode"]]
+        self.node_chain = NodeChainParameterSpace(name="Test", configuration=self.task, node_list=nodes)
+
+    def test_operation_spec(self):
+        parameter_settings = [{"store": True}]
+        first = self.node_chain.operation_spec(parameter_settings=parameter_settings)
+        second = self.node_chain.operation_spec(parameter_settings=[{"store": False}])
+        # The rendered file contains the same specification as the dictionary
+        spec = yaml.safe_load(first["base_file"])
+        self.assertEqual(spec["parameter_settings"], parameter_settings)
+        self.assertEqual(spec["node_chain"], first["node_chain"])
+        self.assertEqual(yaml.safe_load(second["base_file"])["parameter_settings"], [{"store": False}])
+        # Changing one specification doesn't change the cached node chain
+        first["node_chain"].append({"node": "Changed"})
+        self.assertNotEqual(self.node_chain.operation_spec()["node_chain"], first["node_chain"])
+
+    def test_close_loggers(self):
+        logger = self.node_chain.logger
+        self.node_chain.error_logger.warn("Opening the error log")
+        self.node_chain.close_loggers()
+        self.assertEqual([handler for handler in logger.handlers if handler.get_name() == logger.name], [])
+        # The loggers are opened again when they are used
+        self.assertEqual(len(self.node_chain.logger.handlers), 1)
+        self.node_chain.close_loggers()
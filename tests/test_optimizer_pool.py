@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+import unittest
+
+from pySPACEOptimizer.core.optimizer_pool import OptimizerPool, RecyclingQueue
+from pySPACEOptimizer.core.resources import current_rss
+
+
+class FakeQueue(object):
+    _writer = "writer"
+
+    def get(self):
+        return "task"
+
+
+def _start_child(file_path):
+    child = multiprocessing.Process(target=time.sleep, args=(60,))
+    child.start()
+    with open(file_path, "w") as pid_file:
+        pid_file.write("%d %d" % (os.getpid(), child.pid))
+    time.sleep(60)
+
+
+def _pid_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+class RecyclingQueueTestCase(unittest.TestCase):
+
+    def test_no_limits(self):
+        queue = RecyclingQueue(FakeQueue())
+        self.assertEqual(queue.get(), "task")
+        self.assertEqual(queue.get(), "task")
+        # Attributes of the wrapped queue are still accessible
+        self.assertEqual(queue._writer, "writer")
+
+    def test_memory_growth(self):
+        queue = RecyclingQueue(FakeQueue(), max_memory_growth=10 * 1024 * 1024)
+        self.assertEqual(queue.get(), "task")
+        self.assertEqual(queue.get(), "task")
+        memory = bytearray(50 * 1024 * 1024)
+        memory[::4096] = b"x" * len(memory[::4096])
+        # The worker grew too much and should exit
+        self.assertIsNone(queue.get())
+
+    def test_memory_ceiling(self):
+        queue = RecyclingQueue(FakeQueue(), max_memory=current_rss() // 2)
+        # The first task is always taken
+        self.assertEqual(queue.get(), "task")
+        self.assertIsNone(queue.get())
+
+
+class OptimizerPoolTestCase(unittest.TestCase):
+
+    def test_signals(self):
+        pool = OptimizerPool(processes=1)
+        file_path = tempfile.mktemp()
+        try:
+            pool.apply_async(_start_child, args=(file_path,))
+            while not os.path.isfile(file_path) or not open(file_path).read():
+                time.sleep(0.1)
+            worker, child = [int(pid) for pid in open(file_path).read().split()]
+            # Interrupts are handled by the optimizer, not by the workers
+            os.kill(worker, signal.SIGINT)
+            time.sleep(0.5)
+            self.assertTrue(_pid_exists(child))
+            # Terminating the worker terminates the processes it started
+            os.kill(worker, signal.SIGTERM)
+            time.sleep(0.5)
+            self.assertFalse(_pid_exists(child))
+        finally:
+            pool.terminate()
+            pool.join()
+            os.unlink(file_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import numpy
+from hyperopt import JOB_STATE_DONE, STATUS_OK
+
+from pySPACEOptimizer.hyperopt.parameter_freezing import ParameterFreezing
+
+
+class FakeTrials(object):
+
+    def __init__(self):
+        self.trials = []
+
+    def add(self, important, unimportant):
+        self.trials.append({"state": JOB_STATE_DONE,
+                            "result": {"loss": important, "status": STATUS_OK},
+                            "misc": {"vals": {"important": [important], "unimportant": [unimportant]}}})
+
+
+# noinspection PyUnusedLocal
+def random_suggest(new_ids, domain, trials, seed):
+    random = numpy.random.RandomState(seed)
+    return [{"tid": new_id, "misc": {"vals": {"important": [random.uniform()], "unimportant": [random.uniform()]}}}
+            for new_id in new_ids]
+
+
+class ParameterFreezingTestCase(unittest.TestCase):
+
+    def test_freeze_unimportant(self):
+        random = numpy.random.RandomState(0)
+        trials = FakeTrials()
+        freezing = ParameterFreezing(random_suggest, min_trials=30, interval=10, threshold=0.05)
+        for _ in range(29):
+            trials.add(random.uniform(), random.uniform())
+        freezing.suggest([29], None, trials, seed=0)
+        self.assertEqual(freezing.frozen, {})
+        trials.add(0.0, 0.25)
+        new_trials = freezing.suggest([30, 31], None, trials, seed=1)
+        # Frozen at the value of the best trial
+        self.assertEqual(freezing.frozen, {"unimportant": 0.25})
+        self.assertEqual([trial["misc"]["vals"]["unimportant"] for trial in new_trials], [[0.25], [0.25]])
+        self.assertNotEqual(new_trials[0]["misc"]["vals"]["important"], new_trials[1]["misc"]["vals"]["important"])
+
+    def test_no_evaluated_trials(self):
+        freezing = ParameterFreezing(random_suggest, min_trials=0)
+        self.assertEqual(len(freezing.suggest([0], None, FakeTrials(), seed=0)), 1)
+        self.assertEqual(freezing.frozen, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+import numpy
+
+from pySPACEOptimizer.core.parameter_importance import parameter_importance
+
+
+class ParameterImportanceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        random = numpy.random.RandomState(0)
+        self.values = {"important": random.uniform(0, 1, 200),
+                       "unimportant": random.uniform(0, 1, 200),
+                       "choice": random.randint(0, 3, 200)}
+        self.losses = self.values["important"] + 0.01 * random.normal(size=200)
+
+    def test_importance(self):
+        importance = parameter_importance(self.values, self.losses)
+        self.assertGreater(importance["important"], 0.9)
+        self.assertLess(importance["unimportant"], 0.1)
+        self.assertLess(importance["choice"], 0.1)
+
+    def test_failures(self):
+        losses = numpy.where(self.values["choice"] == 0, float("inf"), 0.5)
+        importance = parameter_importance(self.values, losses)
+        self.assertAlmostEqual(importance["choice"], 1.0)
+        self.assertEqual(parameter_importance(self.values, [float("inf")] * 200)["choice"], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
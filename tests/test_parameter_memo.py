@@ -0,0 +1,38 @@
+import unittest
+
+from pySPACEOptimizer.core.parameter_memo import ParameterMemo
+
+
+class ParameterMemoTestCase(unittest.TestCase):
+
+    def test_duplicate(self):
+        memo = ParameterMemo()
+        setting = {"complexity": 1, "kernel": 0}
+        self.assertIsNone(memo.lookup(setting))
+        memo.record(setting, {"loss": 0.5, "status": "ok"})
+        result = memo.lookup({"kernel": 0, "complexity": 1})
+        self.assertEqual(result["loss"], 0.5)
+        self.assertTrue(result["duplicate"])
+        self.assertIsNone(memo.lookup({"complexity": 2, "kernel": 0}))
+        self.assertEqual(memo.duplicates, 1)
+        self.assertAlmostEqual(memo.duplicate_rate, 1 / 3.0)
+
+    def test_resamples(self):
+        memo = ParameterMemo(resamples=1)
+        setting = {"complexity": 1}
+        memo.record(setting, {"loss": 0.5, "status": "ok"})
+        # Evaluated once more before it's answered with the mean loss
+        self.assertIsNone(memo.lookup(setting))
+        memo.record(setting, {"loss": 0.3, "status": "ok"})
+        self.assertAlmostEqual(memo.lookup(setting)["loss"], 0.4)
+
+    def test_incomplete(self):
+        memo = ParameterMemo()
+        setting = {"complexity": 1}
+        memo.record(setting, {"loss": float("inf"), "status": "fail"})
+        memo.record(setting, {"loss": 0.2, "status": "ok", "stopped": True})
+        self.assertIsNone(memo.lookup(setting))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from pySPACEOptimizer.core.pareto_front import ParetoFront
+
+
+class ParetoFrontTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.front = ParetoFront(["loss", "inference_time"])
+
+    def test_dominates(self):
+        self.assertTrue(ParetoFront.dominates((0.1, 1.0), (0.2, 1.0)))
+        self.assertFalse(ParetoFront.dominates((0.1, 1.0), (0.1, 1.0)))
+        self.assertFalse(ParetoFront.dominates((0.1, 2.0), (0.2, 1.0)))
+
+    def test_add_non_dominated(self):
+        self.assertTrue(self.front.add((0.1, 2.0), "pipeline_a", {}))
+        self.assertTrue(self.front.add((0.2, 1.0), "pipeline_b", {}))
+        self.assertEqual(len(self.front), 2)
+
+    def test_add_dominated(self):
+        self.front.add((0.1, 1.0), "pipeline_a", {})
+        self.assertFalse(self.front.add((0.2, 2.0), "pipeline_b", {}))
+        self.assertEqual(len(self.front), 1)
+
+    def test_remove_dominated_members(self):
+        self.front.add((0.2, 2.0), "pipeline_a", {})
+        self.front.add((0.3, 1.0), "pipeline_b", {})
+        self.assertTrue(self.front.add((0.1, 0.5), "pipeline_c", {}))
+        self.assertEqual([pipeline for _, pipeline, _ in self.front], ["pipeline_c"])
+
+    def test_ignore_failed_evaluations(self):
+        self.assertFalse(self.front.add({"loss": float("inf"), "inference_time": 0.0}, "pipeline_a", {}))
+        self.assertEqual(len(self.front), 0)
+
+    def test_as_dictionaries(self):
+        self.front.add({"loss": 0.1, "inference_time": 2.0}, "pipeline_a", {"a": 1})
+        self.assertListEqual(self.front.as_dictionaries(),
+                             [{"loss": 0.1, "inference_time": 2.0, "pipeline": "pipeline_a", "parameters": {"a": 1}}])
+
+
+if __name__ == '__main__':
+    unittest.main()
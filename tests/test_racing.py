@@ -0,0 +1,37 @@
+import unittest
+
+from pySPACEOptimizer.core.racing import Race
+
+
+class RaceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.race = Race(alpha=0.05, min_folds=2)
+        self.race.observe({"status": "ok", "loss": 0.2, "fold_losses": [0.2, 0.21, 0.19, 0.2, 0.2]})
+
+    def test_no_elimination_without_best(self):
+        self.assertFalse(Race().eliminate([1.0, 1.0, 1.0]))
+
+    def test_no_elimination_before_min_folds(self):
+        self.assertFalse(self.race.eliminate([0.9]))
+
+    def test_eliminate_worse_configuration(self):
+        self.assertTrue(self.race.eliminate([0.5, 0.52, 0.49]))
+
+    def test_keep_better_configuration(self):
+        self.assertFalse(self.race.eliminate([0.1, 0.12]))
+
+    def test_observe_ignores_eliminated(self):
+        self.race.observe({"status": "ok", "loss": 0.1, "fold_losses": [0.1, 0.1], "eliminated": True})
+        self.assertAlmostEqual(self.race.best_loss, 0.2)
+
+    def test_observe_better_configuration(self):
+        self.race.observe({"status": "ok", "loss": 0.1, "fold_losses": [0.1, 0.1, 0.1, 0.1, 0.1]})
+        self.assertAlmostEqual(self.race.best_loss, 0.1)
+
+    def test_estimated_loss_is_worse_than_best(self):
+        self.assertGreater(self.race.estimated_loss([0.5, 0.52]), self.race.best_loss)
+
+
+if __name__ == '__main__':
+    unittest.main()
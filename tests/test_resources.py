@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import unittest
+
+from pySPACEOptimizer.core.resources import ResourcePlanner, cpu_sets, init_worker, parse_cpu_list, peak_rss, \
+    worker_resources
+
+
+class ResourcePlannerTestCase(unittest.TestCase):
+
+    def test_peak_rss(self):
+        self.assertGreater(peak_rss(), 0)
+
+    def test_share_cores(self):
+        planner = ResourcePlanner(cores=8, memory=None, max_backend_processes=10)
+        self.assertEqual(planner.max_chains(), 8)
+        self.assertTrue(planner.start_chain("a"))
+        self.assertEqual(planner.backend_processes("a"), 8)
+        # The second chain has to wait until the first one releases it's cores
+        self.assertFalse(planner.start_chain("b"))
+        self.assertEqual(planner.backend_processes("a"), 4)
+        self.assertTrue(planner.start_chain("b"))
+        self.assertEqual(planner.backend_processes("b"), 4)
+        # The remaining chain gets all cores again
+        planner.finish_chain("a")
+        self.assertEqual(planner.backend_processes("b"), 8)
+
+    def test_max_backend_processes(self):
+        planner = ResourcePlanner(cores=8, memory=None, max_backend_processes=2)
+        self.assertTrue(planner.start_chain("a"))
+        self.assertEqual(planner.backend_processes("a"), 2)
+        self.assertTrue(planner.start_chain("b"))
+
+    def test_memory_limit(self):
+        planner = ResourcePlanner(cores=8, memory=4 * 1024, max_backend_processes=8, memory_fraction=1.0)
+        self.assertTrue(planner.start_chain("a"))
+        self.assertEqual(planner.backend_processes("a"), 8)
+        # Heavy trials reduce the parallelism
+        planner.observe(2 * 1024)
+        self.assertEqual(planner.max_chains(), 2)
+        self.assertEqual(planner.backend_processes("a"), 2)
+        self.assertFalse(planner.start_chain("b"))
+        self.assertEqual(planner.backend_processes("a"), 1)
+        self.assertTrue(planner.start_chain("b"))
+
+    def test_first_chain_always_starts(self):
+        planner = ResourcePlanner(cores=2, memory=1024, memory_fraction=1.0)
+        planner.observe(4 * 1024)
+        self.assertEqual(planner.max_chains(), 1)
+        self.assertTrue(planner.start_chain("a"))
+        self.assertEqual(planner.backend_processes("a"), 1)
+
+    def test_min_free_memory(self):
+        planner = ResourcePlanner(cores=8, min_free_memory=1024 ** 5)
+        self.assertTrue(planner.start_chain("a"))
+        # Not enough free memory left for a second chain
+        self.assertFalse(planner.start_chain("b"))
+        planner.finish_chain("a")
+        self.assertTrue(planner.start_chain("b"))
+
+
+class WorkerResourcesTestCase(unittest.TestCase):
+
+    def test_parse_cpu_list(self):
+        self.assertEqual(parse_cpu_list("0-3,8,10-11\n"), [0, 1, 2, 3, 8, 10, 11])
+
+    def test_cpu_sets(self):
+        self.assertEqual(cpu_sets(2, cpus=list(range(8))), [[0, 1, 2, 3], [4, 5, 6, 7]])
+        self.assertEqual(cpu_sets(3, cpus=list(range(8))), [[0, 1], [2, 3, 4], [5, 6, 7]])
+        # More workers than cpus share the cpus
+        self.assertEqual(cpu_sets(3, cpus=[0, 1]), [[0], [1], [0]])
+
+    def test_numa_cpu_sets(self):
+        nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+        self.assertEqual(cpu_sets(4, cpus=list(range(8)), nodes=nodes), [[0, 1], [4, 5], [2, 3], [6, 7]])
+        # Unavailable cpus and nodes are ignored
+        self.assertEqual(cpu_sets(2, cpus=[0, 1], nodes=nodes), [[0], [1]])
+
+    def test_worker_resources(self):
+        self.assertIsNone(worker_resources(2))
+        self.assertEqual(worker_resources(2, threads=1), [(None, 1), (None, 1)])
+        resources = worker_resources(1, threads="auto", pin=True)
+        self.assertEqual(resources[0][1], len(resources[0][0]))
+
+    def test_worker_slots(self):
+        finished = multiprocessing.Process(target=os.getpid)
+        finished.start()
+        finished.join()
+        slots = multiprocessing.Array("i", 2)
+        # A running worker keeps it's slot, while the slot of a finished worker is reused
+        slots[0] = os.getppid()
+        slots[1] = finished.pid
+        init_worker(slots, [(None, None), (None, None)])
+        self.assertEqual(list(slots), [os.getppid(), os.getpid()])
+
+
+if __name__ == '__main__':
+    unittest.main()
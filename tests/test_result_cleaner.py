@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from pySPACEOptimizer.core.result_cleaner import ResultCleaner
+
+
+def _discard_and_exit(result_dir, result_path, archive_dir):
+    cleaner = ResultCleaner(result_dir, threads=1)
+    cleaner.discard([result_path], archive_dir=archive_dir, loss=0.5, keep=1)
+
+
+class ResultCleanerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.result_dir = tempfile.mkdtemp()
+        self.archive_dir = os.path.join(self.result_dir, "best_outputs")
+
+    def tearDown(self):
+        shutil.rmtree(self.result_dir)
+
+    def _create_result(self, name):
+        result_path = os.path.join(self.result_dir, name)
+        os.makedirs(result_path)
+        with open(os.path.join(result_path, "results.csv"), "w") as result_file:
+            result_file.write(name)
+        return result_path
+
+    def test_discard(self):
+        cleaner = ResultCleaner(self.result_dir, threads=2)
+        result_paths = [self._create_result("result_%d" % index) for index in range(10)]
+        for result_path in result_paths:
+            cleaner.discard([result_path])
+            # The result dir is gone immediately
+            self.assertFalse(os.path.exists(result_path))
+        cleaner.wait()
+        self.assertEqual(os.listdir(os.path.join(self.result_dir, ResultCleaner.TRASH_DIR)), [])
+
+    def test_keep_best(self):
+        cleaner = ResultCleaner(self.result_dir, threads=1)
+        for index, loss in enumerate([0.5, 0.3, 0.9, 0.1, float("inf")]):
+            cleaner.discard([self._create_result("result_%d" % index)], archive_dir=self.archive_dir, loss=loss,
+                            keep=2)
+            cleaner.wait()
+        archives = ResultCleaner.archived_losses(self.archive_dir)
+        self.assertEqual([loss for loss, _ in archives], [0.1, 0.3])
+        with tarfile.open(archives[0][1]) as archive:
+            self.assertIn("0/results.csv", archive.getnames())
+        self.assertFalse(ResultCleaner.should_archive(self.archive_dir, 0.4, keep=2))
+        self.assertTrue(ResultCleaner.should_archive(self.archive_dir, 0.2, keep=2))
+
+    def test_finish_before_exit(self):
+        # A worker exiting right after discarding the results still archives and deletes them
+        result_path = self._create_result("result")
+        process = multiprocessing.Process(target=_discard_and_exit, args=(self.result_dir, result_path,
+                                                                          self.archive_dir))
+        process.start()
+        process.join()
+        self.assertEqual([loss for loss, _ in ResultCleaner.archived_losses(self.archive_dir)], [0.5])
+        self.assertEqual(os.listdir(os.path.join(self.result_dir, ResultCleaner.TRASH_DIR)), [])
+
+    def test_sweep(self):
+        cleaner = ResultCleaner(self.result_dir, threads=1)
+        self.assertEqual(cleaner.pid, os.getpid())
+        trash_dir = os.path.join(self.result_dir, ResultCleaner.TRASH_DIR)
+        os.makedirs(os.path.join(trash_dir, "left_over"))
+        ResultCleaner.sweep(self.result_dir)
+        self.assertFalse(os.path.exists(trash_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
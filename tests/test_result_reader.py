@@ -0,0 +1,40 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from pySPACEOptimizer.core.result_reader import read_metrics
+
+
+class ResultReaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.result_dir = tempfile.mkdtemp()
+        self.result_file = os.path.join(self.result_dir, "results.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.result_dir)
+
+    def _write(self, content):
+        with open(self.result_file, "w") as result_file:
+            result_file.write(content)
+
+    def test_read_metrics(self):
+        self._write('Balanced_accuracy,__Dataset__,"Time (Training)",Key_Split\n'
+                    '0.75,"data, set",1.5,0\n'
+                    '0.25,data,,1\n')
+        metrics = read_metrics(self.result_file, ["Balanced_accuracy", "Time (Training)", "Missing"])
+        self.assertEqual(sorted(metrics.keys()), ["Balanced_accuracy", "Time (Training)"])
+        numpy.testing.assert_array_equal(metrics["Balanced_accuracy"], [0.75, 0.25])
+        self.assertEqual(metrics["Time (Training)"][0], 1.5)
+        self.assertTrue(numpy.isnan(metrics["Time (Training)"][1]))
+
+    def test_empty_file(self):
+        self._write("")
+        self.assertEqual(read_metrics(self.result_file, ["Balanced_accuracy"]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pySPACEOptimizer.core.run_manifest import RunManifest
+
+
+class RunManifestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.result_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.result_dir)
+
+    def test_complete_chain(self):
+        manifest = RunManifest(self.result_dir)
+        manifest.register_chain("a", name="Chain A", evaluations=2)
+        self.assertFalse(manifest.is_complete("a"))
+        self.assertFalse(manifest.record("a", 0))
+        # Reporting an evaluation twice doesn't complete the node chain
+        self.assertFalse(manifest.record("a", 0))
+        self.assertFalse(manifest.is_complete("a"))
+        self.assertTrue(manifest.record("a", 1))
+        self.assertTrue(manifest.is_complete("a"))
+        self.assertFalse(manifest.is_complete("b"))
+
+    def test_best(self):
+        manifest = RunManifest(self.result_dir)
+        manifest.register_chain("a", name="Chain A", evaluations=10)
+        manifest.register_chain("b", name="Chain B", evaluations=10)
+        self.assertTrue(manifest.record("a", 0, loss=0.5, parameters={"x": 1}))
+        self.assertFalse(manifest.record("b", 0, loss=0.7, parameters={"x": 2}))
+        self.assertTrue(manifest.record("b", 1, loss=0.2, parameters={"x": 3}))
+        self.assertEqual(manifest.best, {"loss": 0.2, "chain": "b", "parameters": {"x": 3}})
+
+    def test_resume(self):
+        manifest = RunManifest(self.result_dir)
+        manifest.register_chain("a", name="Chain A", evaluations=1)
+        manifest.register_chain("b", name="Chain B", evaluations=2)
+        manifest.record("a", 0, loss=0.5, parameters={"x": 1})
+        manifest.record("b", 0, loss=0.7, parameters={"x": 2})
+        manifest.store()
+        self.assertTrue(os.path.isfile(manifest.file_path))
+        self.assertEqual(os.listdir(self.result_dir), [RunManifest.FILE_NAME])
+
+        resumed = RunManifest(self.result_dir)
+        self.assertTrue(resumed.is_complete("a"))
+        self.assertFalse(resumed.is_complete("b"))
+        self.assertEqual(resumed.best["chain"], "a")
+        self.assertEqual(resumed.best["loss"], 0.5)
+        resumed.record("b", 1)
+        self.assertTrue(resumed.is_complete("b"))
+
+        # A new run starts with an empty manifest
+        restarted = RunManifest(self.result_dir, load=False)
+        self.assertIsNone(restarted.best)
+        self.assertFalse(restarted.is_complete("a"))
+
+    def test_duplicates(self):
+        manifest = RunManifest(self.result_dir)
+        manifest.register_chain("a", name="Chain A", evaluations=4)
+        manifest.record("a", 0, loss=0.5, parameters={"x": 1})
+        manifest.record("a", 1, loss=0.5, parameters={"x": 1}, duplicate=True)
+        self.assertEqual(manifest.duplicate_rate, 0.5)
+        manifest.store()
+        self.assertEqual(RunManifest(self.result_dir).duplicate_rate, 0.5)
@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 import unittest
 
 from pySPACEOptimizer.pipelines import PipelineNode
@@ -96,6 +99,16 @@ class TaskTestCase(PySPACETestCase):
              whitelist=white_list,
              evaluations_per_pass=1)
 
+    def test_cv_splits_without_in_process(self):
+        # The splits are only used by the in process evaluation
+        with self.assertRaises(ValueError):
+            ClassificationTask("example_summary",
+                               optimizer="PySPACEOptimizer",
+                               class_labels=["Standard", "Target"],
+                               main_class="Target",
+                               cv_splits=5,
+                               evaluations_per_pass=1)
+
     def test_minimal_config_from_yaml(self):
         task = task_from_yaml(MINIMAL_CONFIG)
         self.assertIsNotNone(task)
@@ -111,3 +124,24 @@ class TaskTestCase(PySPACETestCase):
                                   main_class="Target",
                                   evaluations_per_pass=1)
         self.assertGreater(len(task.nodes.keys()), 0)
+
+    def test_scratch_result_dir(self):
+        task = ClassificationTask("example_summary",
+                                  optimizer="PySPACEOptimizer",
+                                  class_labels=["Standard", "Target"],
+                                  main_class="Target",
+                                  evaluations_per_pass=1)
+        self.assertEqual(task.scratch_result_dir, task.base_result_dir)
+        scratch_dir = tempfile.mkdtemp()
+        try:
+            task = ClassificationTask("example_summary",
+                                      optimizer="PySPACEOptimizer",
+                                      class_labels=["Standard", "Target"],
+                                      main_class="Target",
+                                      evaluations_per_pass=1,
+                                      scratch_dir=scratch_dir)
+            # Every worker writes the outputs of it's trials into it's own dir
+            self.assertTrue(task.scratch_result_dir.startswith(scratch_dir))
+            self.assertTrue(task.scratch_result_dir.endswith("worker_%d" % os.getpid()))
+        finally:
+            shutil.rmtree(scratch_dir)
@@ -0,0 +1,48 @@
+import time
+import unittest
+
+from pySPACEOptimizer.core.time_budget import TimeBudget
+
+
+class TimeBudgetTestCase(unittest.TestCase):
+
+    def test_not_started(self):
+        budget = TimeBudget(budget=10)
+        self.assertFalse(budget.expired())
+        self.assertEqual(budget.chain_deadline("a"), float("inf"))
+
+    def test_expired(self):
+        budget = TimeBudget(budget=0)
+        budget.start()
+        self.assertTrue(budget.expired())
+        budget.add_chain()
+        self.assertFalse(budget.start_chain("a"))
+
+    def test_share_between_waves(self):
+        budget = TimeBudget(budget=100, parallel_chains=2)
+        budget.start()
+        for _ in range(6):
+            budget.add_chain()
+        now = time.time()
+        budget.start_chain("a")
+        budget.start_chain("b")
+        # Two running chains and four queued chains make three waves
+        self.assertAlmostEqual(budget.chain_deadline("a") - now, 100 / 3.0, delta=1)
+        self.assertTrue(budget.may_continue("a", expected_time=10))
+        self.assertFalse(budget.may_continue("a", expected_time=40))
+
+    def test_reallocate_time_of_skipped_chains(self):
+        budget = TimeBudget(budget=100, parallel_chains=1)
+        budget.start()
+        for _ in range(2):
+            budget.add_chain()
+        budget.start_chain("a")
+        deadline = budget.chain_deadline("a")
+        # The second chain is started and skipped, the first chain gets the whole remaining time
+        budget.start_chain("b")
+        budget.finish_chain("b")
+        self.assertGreater(budget.chain_deadline("a"), deadline)
+
+
+if __name__ == '__main__':
+    unittest.main()